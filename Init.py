@@ -22,3 +22,6 @@
 # init of yet another rebar implementation
 
 FreeCAD.addImportType("IFC parametric rebar import (*.ifc)", "importIFCrebar")
+FreeCAD.addExportType("Rebar data (*.csv *.parquet)", "exportRebarData")
+FreeCAD.addExportType("IFC rebar export (*.ifc)", "exportIFCrebar")
+FreeCAD.addExportType("glTF rebar export (*.glb *.gltf)", "exportGLTFrebar")
@@ -26,6 +26,11 @@ __url__ = "http://www.freecadweb.org"
 from archmake.make_base_rebar import make_base_rebar as BaseRebar
 from archmake.make_reinforcement_custom import make_reinforcement_custom as ReinforcementCustom
 from archmake.make_reinforcement_generic import make_reinforcement_generic as ReinforcementGeneric
+from archmake.make_reinforcement_grid import make_reinforcement_grid as ReinforcementGrid
 from archmake.make_reinforcement_lattice import make_reinforcement_lattice as ReinforcementLattice
 from archmake.make_reinforcement_linear import make_reinforcement_linear as ReinforcementLinear
+from archmake.make_reinforcement_path import make_reinforcement_path as ReinforcementPath
+from archmake.make_reinforcement_polar import make_reinforcement_polar as ReinforcementPolar
+from archmake.make_reinforcement_variable import make_reinforcement_variable as ReinforcementVariable
 from archmake.make_reinforcement_individual import make_reinforcement_individual as ReinforcementIndividual
+from archmake.make_placement_array import make_placement_array as PlacementArray
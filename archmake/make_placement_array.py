@@ -0,0 +1,60 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD arch make lattice placement array"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import FreeCAD
+
+from archobjects.placement_array import PlacementArray
+
+# TODO guard as it is an AddOn
+import lattice2BaseFeature as lattice2BF
+
+
+def make_placement_array(
+    placements,
+    marker_size=None,
+    name="PlacementArray"
+):
+    """
+    make_placement_array(
+        placements,
+        [marker_size],
+        [name]
+    )
+    Adds a lattice2 placement array object holding all placements.
+    """
+    if not FreeCAD.ActiveDocument:
+        FreeCAD.Console.PrintError("No active document. Aborting\n")
+        return
+
+    obj = lattice2BF.makeLatticeFeature(
+        name,
+        PlacementArray,
+        lattice2BF.ViewProviderLatticeFeature
+    )
+    obj.Placements = placements
+    if marker_size:
+        obj.MarkerSize = marker_size
+
+    return obj
@@ -0,0 +1,78 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD arch make grid reinforcement"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import FreeCAD
+from FreeCAD import Vector as vec
+
+from archobjects.reinforcement_grid import ReinforcementGrid
+from draftutils.translate import translate
+
+if FreeCAD.GuiUp:
+    import archviewproviders.view_reinforcement_grid as view_grid
+
+
+def make_reinforcement_grid(
+    base_rebar,
+    boundary,
+    direction=vec(1, 0, 0),
+    spacing=150,
+    cover=30,
+    name="ReinforcementGrid"
+):
+    """
+    make_reinforcement_grid(
+        base_rebar,
+        boundary,
+        [direction],
+        [spacing],
+        [cover],
+        [name]
+    )
+    Adds a grid reinforcement object, one mat layer of bars in direction
+    clipped to the closed wire boundary. Two of them make a mat.
+    """
+    if not FreeCAD.ActiveDocument:
+        FreeCAD.Console.PrintError("No active document. Aborting\n")
+        return
+    obj = FreeCAD.ActiveDocument.addObject(
+        "Part::FeaturePython",
+        "ReinforcementGrid"
+    )
+    obj.Label = translate("Arch", name)
+
+    ReinforcementGrid(obj)
+    if FreeCAD.GuiUp:
+        view_grid.ViewProviderReinforcementGrid(obj.ViewObject)
+
+    obj.BaseRebar = base_rebar
+    obj.Boundary = boundary
+    obj.Direction = direction
+    obj.Spacing = spacing
+    obj.Cover = cover
+
+    # mark base_rebar obj to make it collect its new child
+    # TODO is touche really needed
+    base_rebar.touch()
+    return obj
@@ -122,20 +122,30 @@ def make_reinforcement_linear(
     obj.BasePlacement = base_placement
     obj.Direction = direction
 
+    # the distribution is solved once for both values
     if distance is None:
-        obj.FixedAttribut = "Amount"
-        obj.Amount = amount
-        obj.Spacing = spacing
+        obj.Proxy.set_parameters(
+            obj,
+            FixedAttribut="Amount",
+            Amount=amount,
+            Spacing=spacing
+        )
 
     if amount is None:
-        obj.FixedAttribut = "Distance"
-        obj.Distance = distance
-        obj.Spacing = spacing
+        obj.Proxy.set_parameters(
+            obj,
+            FixedAttribut="Distance",
+            Distance=distance,
+            Spacing=spacing
+        )
 
     if spacing is None:
-        obj.FixedAttribut = "Spacing"
-        obj.Distance = distance
-        obj.Amount = amount
+        obj.Proxy.set_parameters(
+            obj,
+            FixedAttribut="Spacing",
+            Distance=distance,
+            Amount=amount
+        )
 
     # mark base_rebar obj to make it collect its new child
     base_rebar.touch()
@@ -0,0 +1,80 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD arch make path reinforcement"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import FreeCAD
+
+from archobjects.reinforcement_path import ReinforcementPath
+from draftutils.translate import translate
+
+if FreeCAD.GuiUp:
+    import archviewproviders.view_reinforcement_path as view_path
+
+
+def make_reinforcement_path(
+    base_rebar,
+    path_object,
+    amount=5,
+    offset_start=0,
+    offset_end=0,
+    align=True,
+    name="ReinforcementPath"
+):
+    """
+    make_reinforcement_path(
+        base_rebar,
+        path_object,
+        [amount],
+        [offset_start],
+        [offset_end],
+        [align],
+        [name]
+    )
+    Adds a path reinforcement object, amount bars evenly spaced along
+    the wire of path_object. The base rebar is at the path start.
+    """
+    if not FreeCAD.ActiveDocument:
+        FreeCAD.Console.PrintError("No active document. Aborting\n")
+        return
+    obj = FreeCAD.ActiveDocument.addObject(
+        "Part::FeaturePython",
+        "ReinforcementPath"
+    )
+    obj.Label = translate("Arch", name)
+
+    ReinforcementPath(obj)
+    if FreeCAD.GuiUp:
+        view_path.ViewProviderReinforcementPath(obj.ViewObject)
+
+    obj.BaseRebar = base_rebar
+    obj.PathObject = path_object
+    obj.Amount = amount
+    obj.OffsetStart = offset_start
+    obj.OffsetEnd = offset_end
+    obj.AlignToPath = align
+
+    # mark base_rebar obj to make it collect its new child
+    # TODO is touche really needed
+    base_rebar.touch()
+    return obj
@@ -0,0 +1,81 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD arch make polar reinforcement"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import FreeCAD
+from FreeCAD import Vector as vec
+
+from archobjects.reinforcement_polar import ReinforcementPolar
+from draftutils.translate import translate
+
+if FreeCAD.GuiUp:
+    import archviewproviders.view_reinforcement_polar as view_polar
+
+
+def make_reinforcement_polar(
+    base_rebar,
+    amount=8,
+    center=vec(0, 0, 0),
+    axis=vec(0, 0, 1),
+    start_angle=0,
+    end_angle=360,
+    name="ReinforcementPolar"
+):
+    """
+    make_reinforcement_polar(
+        base_rebar,
+        [amount],
+        [center],
+        [axis],
+        [start_angle],
+        [end_angle],
+        [name]
+    )
+    Adds a polar reinforcement object, amount bars rotated around
+    axis through center from start_angle to end_angle in degree.
+    """
+    if not FreeCAD.ActiveDocument:
+        FreeCAD.Console.PrintError("No active document. Aborting\n")
+        return
+    obj = FreeCAD.ActiveDocument.addObject(
+        "Part::FeaturePython",
+        "ReinforcementPolar"
+    )
+    obj.Label = translate("Arch", name)
+
+    ReinforcementPolar(obj)
+    if FreeCAD.GuiUp:
+        view_polar.ViewProviderReinforcementPolar(obj.ViewObject)
+
+    obj.BaseRebar = base_rebar
+    obj.Amount = amount
+    obj.Center = center
+    obj.Axis = axis
+    obj.StartAngle = start_angle
+    obj.EndAngle = end_angle
+
+    # mark base_rebar obj to make it collect its new child
+    # TODO is touche really needed
+    base_rebar.touch()
+    return obj
@@ -0,0 +1,82 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD arch make variable reinforcement"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import FreeCAD
+from FreeCAD import Vector as vec
+
+from archobjects.reinforcement_variable import ReinforcementVariable
+from draftutils.translate import translate
+
+if FreeCAD.GuiUp:
+    import archviewproviders.view_reinforcement_variable as view_variable
+
+
+def make_reinforcement_variable(
+    base_rebar,
+    end_rebar,
+    amount=5,
+    spacing=200,
+    direction=vec(0, 0, 1),
+    tolerance=1,
+    name="ReinforcementVariable"
+):
+    """
+    make_reinforcement_variable(
+        base_rebar,
+        end_rebar,
+        [amount],
+        [spacing],
+        [direction],
+        [tolerance],
+        [name]
+    )
+    Adds a variable reinforcement object, amount bars spaced in
+    direction, their shape changes from the shape of base_rebar
+    to the shape of end_rebar.
+    """
+    if not FreeCAD.ActiveDocument:
+        FreeCAD.Console.PrintError("No active document. Aborting\n")
+        return
+    obj = FreeCAD.ActiveDocument.addObject(
+        "Part::FeaturePython",
+        "ReinforcementVariable"
+    )
+    obj.Label = translate("Arch", name)
+
+    ReinforcementVariable(obj)
+    if FreeCAD.GuiUp:
+        view_variable.ViewProviderReinforcementVariable(obj.ViewObject)
+
+    obj.BaseRebar = base_rebar
+    obj.EndRebar = end_rebar
+    obj.Amount = amount
+    obj.Spacing = spacing
+    obj.Direction = direction
+    obj.Tolerance = tolerance
+
+    # mark base_rebar obj to make it collect its new child
+    # TODO is touche really needed
+    base_rebar.touch()
+    return obj
@@ -222,34 +222,62 @@ class BaseRebar(ArchComponent.Component):
         #    compound without Wires but with multiple Edges
         # Does they make sense? If yes handle them.
         # Does it makes sense to handle Shapes with Faces or even Solids?
-        if not obj.Base.Shape.Wires and len(obj.Base.Shape.Edges) == 1:
-            wire = Part.Wire(obj.Base.Shape.Edges[0])
-        else:
-            wire = obj.Base.Shape.Wires[0]
-        edge = wire.Edges[0]
-        bpoint = edge.Vertexes[0].Point
-        bvec = edge.tangentAt(edge.FirstParameter)
-        if not bpoint:
-            return
+        wire = get_rebar_wire(obj.Base.Shape)
         # all tests ok!
 
-        if hasattr(obj, "Rounding"):
-            if obj.Rounding:
-                radius = obj.Rounding * obj.Diameter.Value
-                wire = filletWire(wire, radius)
-
         # is length allong the rounding or not?
         # in the users head and in material bill without rounding
         # but with sharp edges instead
         if hasattr(obj, "Length"):
-            length = getLengthOfRebar(obj)
+            length = get_rebar_length(obj)
             if length:
                 obj.Length = length
 
-        circle = Part.makeCircle(obj.Diameter.Value / 2, bpoint, bvec)
-        circle = Part.Wire(circle)
-        try:
-            obj.Shape = wire.makePipeShell([circle], True, False, 2)
-        except Part.OCCError:
-            print("Arch: error sweeping rebar profile along the base geometry")
-            return
+        rounding = 0.0
+        if hasattr(obj, "Rounding"):
+            rounding = obj.Rounding
+        shape = make_rebar_shape(wire, obj.Diameter.Value, rounding)
+        if shape is not None:
+            obj.Shape = shape
+
+
+def get_rebar_wire(base_shape):
+    """returns the wire of the shape of the Base of a base rebar"""
+    if not base_shape.Wires and len(base_shape.Edges) == 1:
+        return Part.Wire(base_shape.Edges[0])
+    return base_shape.Wires[0]
+
+
+def get_rebar_length(obj):
+    """returns the length of the base rebar obj, getLengthOfRebar
+    only knows a Draft Wire or a Sketch as Base, for any other Base,
+    for example an imported wire with arcs, the wire length is used"""
+    base = obj.Base
+    if hasattr(base, "Length") or base.isDerivedFrom(
+        "Sketcher::SketchObject"
+    ):
+        return getLengthOfRebar(obj)
+    return get_rebar_wire(base.Shape).Length
+
+
+def make_rebar_shape(wire, diameter, rounding=0.0):
+    """returns the rebar shape, a circle of diameter swept along wire,
+    the corners are filleted with rounding times diameter.
+    Used by BaseRebar.execute and by the parallel recompute workers."""
+    edge = wire.Edges[0]
+    bpoint = edge.Vertexes[0].Point
+    bvec = edge.tangentAt(edge.FirstParameter)
+    if not bpoint:
+        return None
+
+    if rounding:
+        radius = rounding * diameter
+        wire = filletWire(wire, radius)
+
+    circle = Part.makeCircle(diameter / 2, bpoint, bvec)
+    circle = Part.Wire(circle)
+    try:
+        return wire.makePipeShell([circle], True, False, 2)
+    except Part.OCCError:
+        print("Arch: error sweeping rebar profile along the base geometry")
+        return None
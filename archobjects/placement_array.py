@@ -0,0 +1,74 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD lattice placement array object"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+from PySide.QtCore import QT_TRANSLATE_NOOP
+
+# TODO guard as it is an AddOn
+import lattice2BaseFeature as lattice2BF
+
+
+class PlacementArray(lattice2BF.LatticeFeature):
+
+    """
+    A lattice2 array of arbitrary placements held in one property
+
+    Information
+    -----------
+    For a reinforcement with irregular distributed rebars
+    lattice2 only offers one lattice2Placement object per rebar
+    joined by a lattice2JoinArrays. This object holds all placements
+    in one property, thus one document object for the whole array.
+    It is a lattice2 object, thus it can be used in ReinforcementLattice
+    and read by lattice2BaseFeature.getPlacementsList.
+
+    Additional Attributes
+    ---------------------
+    Placements : App::PropertyPlacementList
+        The placements of the array relative to the Placement of the obj.
+    """
+
+    def derivedInit(
+        self,
+        obj
+    ):
+        # do not override __init__, lattice2 calls derivedInit
+        self.Type = "PlacementArray"
+        if "Placements" not in obj.PropertiesList:
+            obj.addProperty(
+                "App::PropertyPlacementList",
+                "Placements",
+                "Lattice Array",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "Placements of the array"
+                )
+            )
+
+    def derivedExecute(
+        self,
+        obj
+    ):
+        # lattice2 builds the marker compound out of the returned list
+        return list(obj.Placements)
@@ -33,6 +33,7 @@ from ArchRebar import CustomSpacingPlacement
 from ArchRebar import strprocessOfCustomSpacing
 
 from .reinforcement_generic import ReinforcementGeneric
+from .reinforcement_generic import get_active_bars
 
 
 class ReinforcementCustom(ReinforcementGeneric):
@@ -205,7 +206,7 @@ class ReinforcementCustom(ReinforcementGeneric):
 
         self.build_shape(obj)
         obj.Amount = len(obj.RebarPlacements)
-        obj.TotalLength = obj.Amount * obj.BaseRebar.Length
+        obj.TotalLength = len(get_active_bars(obj)) * obj.BaseRebar.Length
 
         # set Visibility of BaseRebar
         # this should be done in the Gui Command,
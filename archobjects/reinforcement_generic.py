@@ -23,6 +23,10 @@ __title__ = "FreeCAD generic reinforcement object"
 __author__ = "Bernd Hahnebach"
 __url__ = "http://www.freecadweb.org"
 
+import base64
+import struct
+import zlib
+
 from PySide.QtCore import QT_TRANSLATE_NOOP
 
 import FreeCAD
@@ -31,6 +35,20 @@ import ArchComponent
 import Part
 
 
+# Draft types of all reinforcement objects
+REINFORCEMENT_TYPES = [
+    "ReinforcementGeneric",
+    "ReinforcementLinear",
+    "ReinforcementLattice",
+    "ReinforcementIndividual",
+    "ReinforcementCustom",
+    "ReinforcementGrid",
+    "ReinforcementPolar",
+    "ReinforcementPath",
+    "ReinforcementVariable",
+]
+
+
 class ReinforcementGeneric(ArchComponent.Component):
 
     """
@@ -75,6 +93,17 @@ class ReinforcementGeneric(ArchComponent.Component):
         for rotations only, because each rebar is rotatated instead of the
         whole reinforcement if applied in Placement attribute. A translation
         could be applied eitheron BasePlacement or Placement attribute.
+    CompactPersistence : App::PropertyBool
+        Shape and RebarPlacements are not saved in the document. The
+        placements are saved compressed in RebarPlacementsData and
+        the shape is rebuilt out of the base rebar on load.
+    RebarPlacementsData : App::PropertyString
+        RebarPlacements packed as binary, see encode_placements
+    SuppressedBars : App::PropertyString
+        bars left out, index ranges into RebarPlacements like "0-4, 17".
+        The placements are kept, thus the indices stay valid if the
+        distribution does not change. Shape, TotalLength and the
+        exporters use the other bars only, see get_active_bars
     """
 
     def __init__(
@@ -184,12 +213,102 @@ class ReinforcementGeneric(ArchComponent.Component):
             )
             obj.setEditorMode("TotalLength", 1)
 
+        # SuppressedBars
+        if "SuppressedBars" not in pl:
+            obj.addProperty(
+                "App::PropertyString",
+                "SuppressedBars",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    (
+                        "Bars left out, index ranges of the "
+                        "rebar placements like 0-4, 17"
+                    )
+                )
+            )
+
+        # RebarPlacementsData
+        if "RebarPlacementsData" not in pl:
+            obj.addProperty(
+                "App::PropertyString",
+                "RebarPlacementsData",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The rebar placements packed for CompactPersistence"
+                )
+            )
+            obj.setEditorMode("RebarPlacementsData", 2)
+
+        # CompactPersistence
+        if "CompactPersistence" not in pl:
+            obj.addProperty(
+                "App::PropertyBool",
+                "CompactPersistence",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    (
+                        "Save only the inputs of the reinforcement, "
+                        "the shape is rebuilt on load"
+                    )
+                )
+            )
+            p = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Arch")
+            obj.CompactPersistence = p.GetBool(
+                "RebarCompactPersistence",
+                False
+            )
+
     def onDocumentRestored(
         self,
         obj
     ):
         ArchComponent.Component.onDocumentRestored(self, obj)
         self.setProperties(obj)
+        if obj.CompactPersistence is True:
+            # the transient status is not saved with the document
+            self.set_persistence(obj)
+            if obj.RebarPlacementsData:
+                obj.RebarPlacements = decode_placements(
+                    obj.RebarPlacementsData
+                )
+            # the shape was not saved, no recompute is needed
+            if obj.BaseRebar and obj.RebarPlacements:
+                self.build_shape(obj)
+
+    def onChanged(
+        self,
+        obj,
+        prop
+    ):
+        ArchComponent.Component.onChanged(self, obj, prop)
+        if not hasattr(obj, "CompactPersistence"):
+            return
+        if prop == "CompactPersistence":
+            self.set_persistence(obj)
+        if (
+            prop in ("CompactPersistence", "RebarPlacements")
+            and obj.CompactPersistence is True
+        ):
+            data = encode_placements(obj.RebarPlacements)
+            if obj.RebarPlacementsData != data:
+                obj.RebarPlacementsData = data
+        elif prop == "CompactPersistence" and obj.RebarPlacementsData:
+            obj.RebarPlacementsData = ""
+
+    def set_persistence(
+        self,
+        obj
+    ):
+        # transient properties are not written into the document
+        # setPropertyStatus is available since FreeCAD 0.19
+        if not hasattr(obj, "setPropertyStatus"):
+            return
+        status = "Transient" if obj.CompactPersistence else "-Transient"
+        obj.setPropertyStatus("Shape", status)
+        obj.setPropertyStatus("RebarPlacements", status)
 
     def execute(
         self,
@@ -208,7 +327,7 @@ class ReinforcementGeneric(ArchComponent.Component):
             return
         self.build_shape(obj)
         obj.Amount = len(obj.RebarPlacements)
-        obj.TotalLength = obj.Amount * obj.BaseRebar.Length
+        obj.TotalLength = len(get_active_bars(obj)) * obj.BaseRebar.Length
 
         # set Visibility of BaseRebar
         # this should be done in the Gui Command,
@@ -243,12 +362,133 @@ class ReinforcementGeneric(ArchComponent.Component):
 
         # build compound shape with base rebar
         # and reinforcement placements and BasePlacement
+        # located shapes share the geometry of the base rebar shape,
+        # thus it is only written once if the compound is saved
+        base_shape = obj.BaseRebar.Shape
+        placements = obj.RebarPlacements
         shapes = []
-        for pl in obj.RebarPlacements:
-            bar = obj.BaseRebar.Shape.copy()
+        for pl in (placements[i] for i in get_active_bars(obj)):
             # ATM there is no check
             # if translation vector of BasePlacement is 0, 0, 0
-            bar.Placement = pl.multiply(obj.BasePlacement)
+            if hasattr(base_shape, "located"):
+                bar = base_shape.located(pl.multiply(obj.BasePlacement))
+            else:
+                bar = base_shape.copy()
+                bar.Placement = pl.multiply(obj.BasePlacement)
             shapes.append(bar)
         if shapes:
             obj.Shape = Part.makeCompound(shapes)
+        else:
+            obj.Shape = Part.Shape()
+
+
+def get_active_bars(obj):
+    """returns the indices of the bars in RebarPlacements of the
+    reinforcement obj which are not suppressed"""
+    count = len(obj.RebarPlacements)
+    suppressed = parse_index_ranges(
+        getattr(obj, "SuppressedBars", ""),
+        count
+    )
+    if suppressed is None:
+        FreeCAD.Console.PrintError(
+            "SuppressedBars of {} could not be read, "
+            "no bar is suppressed.\n".format(obj.Label)
+        )
+        suppressed = set()
+    if not suppressed:
+        return range(count)
+    return [i for i in range(count) if i not in suppressed]
+
+
+def suppress_bars(obj, indices, suppress=True):
+    """adds the indices to the SuppressedBars of the reinforcement obj,
+    with suppress False they are removed. If SuppressedBars can not be
+    read it is not changed, it would be overwritten otherwise."""
+    suppressed = parse_index_ranges(
+        obj.SuppressedBars,
+        len(obj.RebarPlacements)
+    )
+    if suppressed is None:
+        FreeCAD.Console.PrintError(
+            "SuppressedBars of {} could not be read, "
+            "it is not changed.\n".format(obj.Label)
+        )
+        return
+    if suppress is True:
+        suppressed.update(indices)
+    else:
+        suppressed.difference_update(indices)
+    text = format_index_ranges(suppressed)
+    if obj.SuppressedBars != text:
+        obj.SuppressedBars = text
+
+
+def parse_index_ranges(text, count=None):
+    """returns the set of indices out of index ranges like "0-4, 17"
+    or None if the text can not be read, with count the indices of
+    count and above are left out, a range is not built beyond count"""
+    indices = set()
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                first, last = (int(v) for v in part.split("-", 1))
+                if last < first:
+                    return None
+                if count is not None:
+                    last = min(last, count - 1)
+                indices.update(range(first, last + 1))
+            else:
+                index = int(part)
+                if count is None or index < count:
+                    indices.add(index)
+        except ValueError:
+            return None
+    return indices
+
+
+def format_index_ranges(indices):
+    """returns index ranges like "0-4, 17" out of the indices"""
+    ranges = []
+    for i in sorted(set(indices)):
+        if ranges and i == ranges[-1][1] + 1:
+            ranges[-1][1] = i
+        else:
+            ranges.append([i, i])
+    return ", ".join(
+        str(first) if first == last else "{}-{}".format(first, last)
+        for first, last in ranges
+    )
+
+
+# placements packed as binary, seven doubles each,
+# translation and rotation quaternion, zlib compressed, base64 encoded
+PLACEMENT_FORMAT = "<7d"
+
+
+def encode_placements(placements):
+    """returns the placements list packed into a string"""
+    raw = b"".join(
+        struct.pack(
+            PLACEMENT_FORMAT,
+            pl.Base.x, pl.Base.y, pl.Base.z,
+            *pl.Rotation.Q
+        )
+        for pl in placements
+    )
+    return base64.b64encode(zlib.compress(raw)).decode("ascii")
+
+
+def decode_placements(data):
+    """returns the placements list out of a string of encode_placements"""
+    raw = zlib.decompress(base64.b64decode(data))
+    placements = []
+    for values in struct.iter_unpack(PLACEMENT_FORMAT, raw):
+        placements.append(FreeCAD.Placement(
+            FreeCAD.Vector(*values[:3]),
+            FreeCAD.Rotation(*values[3:])
+        ))
+    return placements
@@ -0,0 +1,320 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD grid reinforcement object"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import math
+
+import numpy as np
+from PySide.QtCore import QT_TRANSLATE_NOOP
+
+import FreeCAD
+
+import Part
+
+from .reinforcement_generic import ReinforcementGeneric
+from .reinforcement_generic import get_active_bars
+
+
+class ReinforcementGrid(ReinforcementGeneric):
+
+    """
+    A mat layer of straight bars inside a boundary polygon
+
+    The bars run in Direction and are spaced by Spacing across it. They
+    are clipped to the Boundary shrunk by Cover and the bar radius. The
+    base rebar gives the diameter and the mark number, its wire is not
+    used. All bars of the same length share one cylinder shape, the
+    family of base shapes, which is placed for each bar.
+    BasePlacement is not used, the layer is moved with Placement.
+
+    Additional Attributes
+    ---------------------
+    Boundary : App::PropertyLink
+        closed planar wire, inner wires of a face are openings
+    Direction : App::PropertyVector
+        direction of the bars, projected into the boundary plane
+    Spacing : App::PropertyLength
+        distance between the bars
+    Cover : App::PropertyLength
+        concrete cover to the boundary
+    BarLengths : App::PropertyFloatList
+        clipped length of each bar, same order as RebarPlacements
+    """
+
+    def __init__(
+        self,
+        obj
+    ):
+        super(ReinforcementGrid, self).__init__(obj)
+        self.Type = "ReinforcementGrid"
+
+        pl = obj.PropertiesList
+
+        # the bars are placed by the grid, BasePlacement is not used
+        obj.setEditorMode("BasePlacement", 2)
+
+        # New properties
+
+        # Boundary
+        if "Boundary" not in pl:
+            obj.addProperty(
+                "App::PropertyLink",
+                "Boundary",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The closed planar wire the bars are clipped to"
+                )
+            )
+
+        # Direction
+        if "Direction" not in pl:
+            obj.addProperty(
+                "App::PropertyVector",
+                "Direction",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The direction of the bars in the boundary plane"
+                )
+            )
+        obj.Direction = FreeCAD.Vector(1, 0, 0)
+
+        # Spacing
+        if "Spacing" not in pl:
+            obj.addProperty(
+                "App::PropertyLength",
+                "Spacing",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The spacing between the bars"
+                )
+            )
+        obj.Spacing = 150
+
+        # Cover
+        if "Cover" not in pl:
+            obj.addProperty(
+                "App::PropertyLength",
+                "Cover",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The concrete cover between boundary and bars"
+                )
+            )
+        obj.Cover = 30
+
+        # BarLengths
+        if "BarLengths" not in pl:
+            obj.addProperty(
+                "App::PropertyFloatList",
+                "BarLengths",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The clipped length of each bar"
+                )
+            )
+            obj.setEditorMode("BarLengths", 1)
+
+    def execute(
+        self,
+        obj
+    ):
+
+        if self.clone(obj):
+            return
+        if not obj.BaseRebar or not obj.Boundary:
+            return
+
+        layout = get_grid_layout(
+            obj.Boundary.Shape,
+            obj.Direction,
+            obj.Spacing.Value,
+            obj.Cover.Value + obj.BaseRebar.Diameter.Value / 2.0
+        )
+        if layout is None:
+            return
+        rotation, starts, lengths = layout
+        obj.RebarPlacements = [
+            FreeCAD.Placement(FreeCAD.Vector(*start), rotation)
+            for start in starts.tolist()
+        ]
+        obj.BarLengths = lengths.tolist()
+        obj.Amount = len(lengths)
+        active = list(get_active_bars(obj))
+        obj.TotalLength = float(lengths[active].sum())
+
+        self.build_shape(obj)
+
+        # set Visibility of BaseRebar
+        # this should be done in the Gui Command,
+        # but this dos not yet exist TODO
+        if FreeCAD.GuiUp:
+            if obj.Shape.isNull() is not True:
+                obj.BaseRebar.ViewObject.Visibility = False
+
+    def build_shape(
+        self,
+        obj
+    ):
+        # one cylinder along x for each distinct length
+        radius = obj.BaseRebar.Diameter.Value / 2.0
+        family = {}
+        shapes = []
+        placements = obj.RebarPlacements
+        lengths = obj.BarLengths
+        for i in get_active_bars(obj):
+            pl = placements[i]
+            length = lengths[i]
+            key = round(length, 3)
+            if key not in family:
+                family[key] = Part.makeCylinder(
+                    radius,
+                    key,
+                    FreeCAD.Vector(0, 0, 0),
+                    FreeCAD.Vector(1, 0, 0)
+                )
+            base_shape = family[key]
+            if hasattr(base_shape, "located"):
+                bar = base_shape.located(pl)
+            else:
+                bar = base_shape.copy()
+                bar.Placement = pl
+            shapes.append(bar)
+        if shapes:
+            obj.Shape = Part.makeCompound(shapes)
+        else:
+            obj.Shape = Part.Shape()
+
+
+def get_grid_layout(boundary, direction, spacing, inset, min_length=1.0):
+    """
+    returns (rotation, starts (n, 3), lengths (n,)) of the bars of a
+    grid layer inside the boundary shape or None. The bars run in
+    direction, the boundary is shrunk by inset. The rotation turns
+    the x axis into the bar direction.
+    """
+    if spacing <= 0:
+        FreeCAD.Console.PrintError("Spacing needs to be positive.\n")
+        return None
+    if boundary.Faces:
+        face = boundary.Faces[0]
+    else:
+        wires = [w for w in boundary.Wires if w.isClosed()]
+        if not wires:
+            FreeCAD.Console.PrintError("The boundary is not closed.\n")
+            return None
+        face = Part.Face(wires[0])
+    normal = face.normalAt(0, 0)
+    e_u = FreeCAD.Vector(direction)
+    e_u = e_u - normal * e_u.dot(normal)
+    if e_u.Length < 1e-9:
+        FreeCAD.Console.PrintError(
+            "The direction is perpendicular to the boundary plane.\n"
+        )
+        return None
+    e_u.normalize()
+    e_v = normal.cross(e_u)
+    rotation = FreeCAD.Rotation(e_u, e_v, normal, "ZXY")
+
+    if inset > 0:
+        try:
+            # intersection join keeps the corners sharp
+            face = face.makeOffset2D(-inset, 2)
+        except Part.OCCError:
+            FreeCAD.Console.PrintError("The boundary is too small.\n")
+            return None
+        if not face.Faces:
+            return None
+
+    # the polygon edges in plane coordinates, outer and inner wires,
+    # the even-odd rule makes the inner wires openings
+    origin = face.Faces[0].OuterWire.Vertexes[0].Point
+    axes = np.array([tuple(e_u), tuple(e_v), tuple(normal)])
+    edges = []
+    for wire in face.Wires:
+        pts = get_polygon(wire)
+        if len(pts) > 2:
+            uv = (pts - np.array(tuple(origin))) @ axes[:2].T
+            edges.append(np.stack([uv, np.roll(uv, -1, axis=0)], axis=1))
+    if not edges:
+        return None
+    edges = np.concatenate(edges)  # (m, 2 points, 2 coordinates)
+
+    # bar lines, the rest is split to both sides
+    vmin = edges[:, :, 1].min()
+    vmax = edges[:, :, 1].max()
+    count = int(math.floor((vmax - vmin) / spacing + 1e-9)) + 1
+    v0 = vmin + 0.5 * ((vmax - vmin) - (count - 1) * spacing)
+    v = v0 + spacing * np.arange(count)
+
+    u_in, u_out, v_bar = clip_lines(edges, v)
+    lengths = u_out - u_in
+    keep = lengths >= min_length
+    u_in, lengths, v_bar = u_in[keep], lengths[keep], v_bar[keep]
+    starts = (
+        np.array(tuple(origin))
+        + u_in[:, None] * axes[0]
+        + v_bar[:, None] * axes[1]
+    )
+    return rotation, starts, lengths
+
+
+def get_polygon(wire):
+    """returns the points (n, 3) of a closed wire, curved edges are
+    discretized, the first point is not repeated"""
+    if all(e.Curve.TypeId == "Part::GeomLine" for e in wire.Edges):
+        pts = [v.Point for v in wire.OrderedVertexes]
+    else:
+        pts = wire.discretize(Deflection=0.5)[:-1]
+    return np.array([tuple(p) for p in pts])
+
+
+def clip_lines(edges, v):
+    """
+    clips the lines v = const (k,) with the polygon edges (m, 2, 2),
+    all lines and edges at once, returns u_in, u_out and v of each
+    segment inside the polygon
+    """
+    p0 = edges[None, :, 0, :]
+    p1 = edges[None, :, 1, :]
+    vv = v[:, None]
+    # half open rule, a vertex on a line is counted once
+    crossing = (p0[..., 1] <= vv) != (p1[..., 1] <= vv)
+    dv = p1[..., 1] - p0[..., 1]
+    dv = np.where(crossing, dv, 1.0)
+    t = (vv - p0[..., 1]) / dv
+    u = p0[..., 0] + t * (p1[..., 0] - p0[..., 0])
+    u = np.where(crossing, u, np.inf)
+    u.sort(axis=1)
+    # even-odd pairs, inf marks no more crossings
+    u_in = u[:, 0::2]
+    u_out = u[:, 1::2][:, :u_in.shape[1]]
+    u_in = u_in[:, :u_out.shape[1]]
+    inside = np.isfinite(u_in) & np.isfinite(u_out)
+    v_bar = np.broadcast_to(vv, u_in.shape)
+    return u_in[inside], u_out[inside], v_bar[inside]
@@ -29,6 +29,7 @@ import FreeCAD
 from FreeCAD import Vector as vec
 
 from .reinforcement_generic import ReinforcementGeneric
+from .reinforcement_generic import get_active_bars
 
 
 class ReinforcementIndividual(ReinforcementGeneric):
@@ -86,7 +87,7 @@ class ReinforcementIndividual(ReinforcementGeneric):
 
         self.build_shape(obj)
         obj.Amount = len(obj.RebarPlacements)
-        obj.TotalLength = obj.Amount * obj.BaseRebar.Length
+        obj.TotalLength = len(get_active_bars(obj)) * obj.BaseRebar.Length
 
         # set Visibility of BaseRebar
         # this should be done in the Gui Command,
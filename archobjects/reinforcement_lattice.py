@@ -31,6 +31,7 @@ import FreeCAD
 import lattice2BaseFeature as lattice2BF
 
 from . reinforcement_generic import ReinforcementGeneric
+from . reinforcement_generic import get_active_bars
 
 
 class ReinforcementLattice(ReinforcementGeneric):
@@ -96,7 +97,7 @@ class ReinforcementLattice(ReinforcementGeneric):
             obj.RebarPlacements = pls
             self.build_shape(obj)
             obj.Amount = len(obj.RebarPlacements)
-            obj.TotalLength = obj.Amount * obj.BaseRebar.Length
+            obj.TotalLength = len(get_active_bars(obj)) * obj.BaseRebar.Length
 
             # set Visibility of BaseRebar
             # this should be done in the Gui Command,
@@ -23,12 +23,15 @@ __title__ = "FreeCAD linear reinforcement object"
 __author__ = "Bernd Hahnebach"
 __url__ = "http://www.freecadweb.org"
 
+import math
+
 from PySide.QtCore import QT_TRANSLATE_NOOP
 
 import FreeCAD
 
 import DraftVecUtils
 from .reinforcement_generic import ReinforcementGeneric
+from .reinforcement_generic import get_active_bars
 
 
 class ReinforcementLinear(ReinforcementGeneric):
@@ -197,29 +200,55 @@ class ReinforcementLinear(ReinforcementGeneric):
         # https://forum.freecadweb.org/viewtopic.php?f=22&t=37157
         # https://forum.freecadweb.org/viewtopic.php?f=22&t=39106
 
+        # the values set by the solver do not start a new solve
+        if getattr(self, "solving", False):
+            return
+        if (
+            prop in DISTRIBUTION_PROPERTIES
+            and hasattr(obj, "FixedAttribut")
+            and all(hasattr(obj, p) for p in DISTRIBUTION_PROPERTIES)
+        ):
+            self.solve(obj, [prop])
+
+    def set_parameters(
+        self,
+        obj,
+        **parameters
+    ):
         """
-                    # some circle, bang, crash
-                    #if obj.AddRestTo == "OffsetStart_and_OffsetEnd":
-                    #    new_offsetstart = obj.OffsetStart.Value + 0.5 * rest
-                    #    new_offsetend = obj.OffsetEnd.Value + 0.5 * rest
-                    #    if obj.OffsetStart.Value != new_offsetstart:
-                    #        obj.OffsetStart.Value = new_offsetstart
-                    #    if obj.OffsetEnd.Value != new_offsetend:
-                    #        obj.OffsetEnd.Value = new_offsetend
-                    #elif obj.AddRestTo == "OffsetStart":
-                    #    new_offsetstart = obj.OffsetStart.Value + rest
-                    #    if obj.OffsetStart.Value != new_offsetstart:
-                    #        obj.OffsetStart.Value = new_offsetstart
-                    #elif obj.AddRestTo == "OffsetEnd":
-                    #    new_offsetend = obj.OffsetEnd.Value + rest
-                    #    if obj.OffsetEnd.Value != new_offsetend:
-                    #        obj.OffsetEnd.Value = new_offsetend
-                    #elif obj.AddRestTo == "Adapt_Distance":
-                    #    new_distance = obj.Distance.Value - con_cover - rest
-                    #    if obj.Distance.Value != new_distance:
-                    #        obj.Distance.Value = new_distance
+        Sets Amount, Distance, Spacing, OffsetStart, OffsetEnd and
+        FixedAttribut at once and solves the distribution once.
+        The given values are kept, only properties whose value
+        changes are set.
+        obj.Proxy.set_parameters(obj, Amount=10, OffsetStart=50)
         """
-
+        given = []
+        self.solving = True
+        try:
+            if "FixedAttribut" in parameters:
+                obj.FixedAttribut = parameters.pop("FixedAttribut")
+            for prop, value in parameters.items():
+                if prop not in DISTRIBUTION_PROPERTIES:
+                    FreeCAD.Console.PrintError(
+                        "{} is not a distribution parameter.\n".format(prop)
+                    )
+                    continue
+                given.append(prop)
+                old = getattr(obj, prop)
+                if hasattr(old, "Value"):
+                    old = old.Value
+                if old != value:
+                    setattr(obj, prop, value)
+        finally:
+            self.solving = False
+        if given:
+            self.solve(obj, given)
+
+    def solve(
+        self,
+        obj,
+        changed
+    ):
         # fixed: Distance, changed: Spacing, calculated: Amount, rest: printed
         # fixed: Spacing, changed: Distance, calculated: Amount, rest: printed
 
@@ -229,74 +258,33 @@ class ReinforcementLinear(ReinforcementGeneric):
         # fixed: Amount, changed: Spacing, calculated: Distance, no rest
         # fixed: Spacing, changed: Amount, calculated: Distance, no rest
 
-        if (
-            (
-                prop == "Amount"
-                or prop == "Distance"
-                or prop == "OffsetEnd"
-                or prop == "OffsetStart"
-                or prop == "Spacing"
-            )
-            and hasattr(obj, "Amount")
-            and hasattr(obj, "Distance")
-            and hasattr(obj, "OffsetEnd")
-            and hasattr(obj, "OffsetStart")
-            and hasattr(obj, "Spacing")
-            and hasattr(obj, "FixedAttribut")
-        ):
-
-            # TODO: concrete cover changed
-            # if there was some rest this will be deleted
-            # TODO treat the rest first, there should never be some
-            # con cover changed Amount is fixed, fix Distance, change Spacing
-            # con cover changed Distance is fixed, fix Amount, change Spacing
-            # con cover changed Spacing is fixed, fix Amount, change Distance
-            # work around, print message
-            if prop == "OffsetStart" or prop == "OffsetEnd":
-                print("onChanged() not yet implemented")
-
-            con_cover = obj.OffsetEnd.Value + obj.OffsetStart.Value
-
-            if (
-                obj.FixedAttribut == "Amount" and prop == "Distance"
-                or obj.FixedAttribut == "Distance" and prop == "Amount"
-            ):
-                # Attribute to recalculate is Spacing
-                dist_rebars = obj.Distance.Value - con_cover
-                if obj.Amount > 1:
-                    spaceing = dist_rebars / (obj.Amount - 1)
-                    if obj.Spacing.Value != spaceing:
-                        obj.Spacing = spaceing
-                else:
-                    print("Use more than 1 as Amount, 1 is on TODO")
-            elif (
-                obj.FixedAttribut == "Distance" and prop == "Spacing"
-                or obj.FixedAttribut == "Spacing" and prop == "Distance"
-            ):
-                # Attribute to recalculate is Amount
-                dist_rebars = obj.Distance.Value - con_cover
-                amount = int(dist_rebars // obj.Spacing.Value) + 1
-                if obj.Amount != amount:
-                    obj.Amount = amount
-                new_dist_rebars = (obj.Amount - 1) * obj.Spacing.Value
-                rest = dist_rebars - new_dist_rebars
-                if rest == 0:
-                    pass
-                elif rest < 0:
-                    print("Rest negative, should not happen.")
-                elif rest >= obj.Spacing.Value:
-                    print("Rest >= Spacing, should not happen.")
-                else:
-                    print("Rest {}".format(rest))
-            elif (
-                obj.FixedAttribut == "Amount" and prop == "Spacing"
-                or obj.FixedAttribut == "Spacing" and prop == "Amount"
-            ):
-                # Attribute to recalculate is Distance
-                dist_rebars = (obj.Amount - 1) * obj.Spacing.Value
-                distance = dist_rebars + con_cover
-                if obj.Distance.Value != distance:
-                    obj.Distance.Value = distance
+        # offsets changed or fixed value changed:
+        # fixed: Amount or Distance, calculated: Spacing
+        # fixed: Spacing, calculated: Distance
+        result = solve_distribution(
+            obj.FixedAttribut,
+            changed,
+            obj.Amount,
+            obj.Spacing.Value,
+            obj.Distance.Value,
+            obj.OffsetStart.Value,
+            obj.OffsetEnd.Value
+        )
+        if result is None:
+            return
+        amount, spacing, distance, rest = result
+        if rest:
+            print("Rest {}".format(rest))
+        self.solving = True
+        try:
+            if obj.Amount != amount:
+                obj.Amount = amount
+            if obj.Spacing.Value != spacing:
+                obj.Spacing = spacing
+            if obj.Distance.Value != distance:
+                obj.Distance = distance
+        finally:
+            self.solving = False
 
     def execute(
         self,
@@ -323,7 +311,7 @@ class ReinforcementLinear(ReinforcementGeneric):
         obj.RebarPlacements = pl_list
 
         self.build_shape(obj)
-        obj.TotalLength = obj.Amount * obj.BaseRebar.Length
+        obj.TotalLength = len(get_active_bars(obj)) * obj.BaseRebar.Length
 
         # set Visibility of BaseRebar
         # this should be done in the Gui Command,
@@ -334,3 +322,87 @@ class ReinforcementLinear(ReinforcementGeneric):
         if FreeCAD.GuiUp:
             if obj.Shape.isNull() is not True:
                 obj.BaseRebar.ViewObject.Visibility = False
+
+
+DISTRIBUTION_PROPERTIES = [
+    "Amount",
+    "Distance",
+    "OffsetEnd",
+    "OffsetStart",
+    "Spacing",
+]
+
+# the attribute calculated if only the fixed one or an offset changed
+CALCULATED_ATTRIBUTE = {
+    "Amount": "Spacing",
+    "Distance": "Spacing",
+    "Spacing": "Distance",
+}
+
+
+def solve_distribution(
+    fixed,
+    changed,
+    amount,
+    spacing,
+    distance,
+    offset_start,
+    offset_end
+):
+    """
+    returns (amount, spacing, distance, rest) of a linear distribution
+    or None if the values do not make a distribution. The fixed and the
+    changed attributes are kept, the third one is calculated. If all
+    three are given none is calculated, the rest shows the misfit.
+    """
+    kept = set([fixed]) | set(changed)
+    free = [a for a in ("Amount", "Spacing", "Distance") if a not in kept]
+    if len(free) == 1:
+        calculated = free[0]
+    elif len(free) == 2:
+        calculated = CALCULATED_ATTRIBUTE[fixed]
+    else:
+        calculated = None
+
+    con_cover = offset_start + offset_end
+    if calculated == "Spacing":
+        if amount > 1:
+            spacing = (distance - con_cover) / (amount - 1)
+        else:
+            print("Use more than 1 as Amount, 1 is on TODO")
+    elif calculated == "Amount":
+        if spacing <= 0:
+            FreeCAD.Console.PrintError("Spacing needs to be positive.\n")
+            return None
+        # small tolerance, a division should not loose a bar
+        amount = int(math.floor((distance - con_cover) / spacing + 1e-9)) + 1
+    elif calculated == "Distance":
+        distance = (amount - 1) * spacing + con_cover
+
+    if distance - con_cover < 0 or spacing < 0 or amount < 1:
+        FreeCAD.Console.PrintError(
+            "Amount {}, Spacing {}, Distance {} with the offsets do not "
+            "make a distribution.\n".format(amount, spacing, distance)
+        )
+        return None
+    rest = (distance - con_cover) - (amount - 1) * spacing
+    if abs(rest) < 1e-9:
+        rest = 0.0
+    return amount, spacing, distance, rest
+
+
+def set_linear_parameters(objects, recompute=True, **parameters):
+    """
+    set_linear_parameters(objects, [recompute], **parameters)
+    sets the distribution parameters of many linear reinforcements,
+    each one is solved once and the document is recomputed once.
+    """
+    docs = set()
+    for obj in objects:
+        if not isinstance(getattr(obj, "Proxy", None), ReinforcementLinear):
+            continue
+        obj.Proxy.set_parameters(obj, **dict(parameters))
+        docs.add(obj.Document)
+    if recompute:
+        for doc in docs:
+            doc.recompute()
@@ -0,0 +1,274 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD path reinforcement object"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import numpy as np
+from PySide.QtCore import QT_TRANSLATE_NOOP
+
+import FreeCAD
+
+import Part
+
+from .reinforcement_generic import ReinforcementGeneric
+from .reinforcement_generic import get_active_bars
+from .reinforcement_polar import rotate
+from .reinforcement_polar import to_placements
+
+
+class ReinforcementPath(ReinforcementGeneric):
+
+    """
+    A reinforcement object with the bars distributed along a curve
+
+    The base rebar is expected at the start of the path. The bars are
+    evenly spaced by arc length between OffsetStart and OffsetEnd. With
+    AlignToPath each bar is rotated like the tangent of the path, thus
+    the bars of a curved wall keep perpendicular to the wall. The arc
+    length table of the path is computed once and reused as long as the
+    path shape does not change.
+
+    Additional Attributes
+    ---------------------
+    PathObject : App::PropertyLink
+        object with a wire or an edge the bars are distributed along
+    OffsetStart : App::PropertyLength
+        arc length between the start of the path and the first bar
+    OffsetEnd : App::PropertyLength
+        arc length between the last bar and the end of the path
+    Spacing : App::PropertyLength
+        arc length between two bars, calculated out of Amount
+    AlignToPath : App::PropertyBool
+        rotate the bars with the tangent of the path
+    """
+
+    def __init__(
+        self,
+        obj
+    ):
+        super(ReinforcementPath, self).__init__(obj)
+        self.Type = "ReinforcementPath"
+
+        pl = obj.PropertiesList
+
+        # user needs be able to change Amount in PropertyEditor
+        obj.setEditorMode("Amount", 0)
+        obj.Amount = 5
+
+        # New properties
+
+        # PathObject
+        if "PathObject" not in pl:
+            obj.addProperty(
+                "App::PropertyLink",
+                "PathObject",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The wire or edge the bars are distributed along"
+                )
+            )
+
+        # OffsetStart
+        if "OffsetStart" not in pl:
+            obj.addProperty(
+                "App::PropertyLength",
+                "OffsetStart",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The arc length between path start and the first bar"
+                )
+            )
+        obj.OffsetStart = 0
+
+        # OffsetEnd
+        if "OffsetEnd" not in pl:
+            obj.addProperty(
+                "App::PropertyLength",
+                "OffsetEnd",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The arc length between the last bar and path end"
+                )
+            )
+        obj.OffsetEnd = 0
+
+        # Spacing
+        if "Spacing" not in pl:
+            obj.addProperty(
+                "App::PropertyLength",
+                "Spacing",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The arc length between two bars"
+                )
+            )
+            obj.setEditorMode("Spacing", 1)
+
+        # AlignToPath
+        if "AlignToPath" not in pl:
+            obj.addProperty(
+                "App::PropertyBool",
+                "AlignToPath",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "Rotate the bars with the tangent of the path"
+                )
+            )
+        obj.AlignToPath = True
+
+    def execute(
+        self,
+        obj
+    ):
+
+        if self.clone(obj):
+            return
+        if not obj.BaseRebar or not obj.PathObject:
+            return
+
+        table = self.get_arc_length_table(obj.PathObject.Shape)
+        if table is None:
+            FreeCAD.Console.PrintError(
+                "The path of {} has no edges.\n".format(obj.Label)
+            )
+            return
+        points, lengths = table
+        total = lengths[-1]
+        start = obj.OffsetStart.Value
+        end = total - obj.OffsetEnd.Value
+        if end < start:
+            FreeCAD.Console.PrintError(
+                "The offsets of {} are longer than the path.\n"
+                .format(obj.Label)
+            )
+            return
+        if obj.Amount > 1:
+            spacing = (end - start) / (obj.Amount - 1)
+        else:
+            spacing = 0.0
+        if abs(obj.Spacing.Value - spacing) > 1e-9:
+            obj.Spacing = spacing
+        stations = start + spacing * np.arange(obj.Amount)
+
+        translations, quaternions = get_path_placements(
+            points,
+            lengths,
+            stations,
+            obj.AlignToPath
+        )
+        obj.RebarPlacements = to_placements(translations, quaternions)
+
+        self.build_shape(obj)
+        obj.TotalLength = len(get_active_bars(obj)) * obj.BaseRebar.Length
+
+        # set Visibility of BaseRebar
+        # this should be done in the Gui Command,
+        # but this dos not yet exist TODO
+        if FreeCAD.GuiUp:
+            if obj.Shape.isNull() is not True:
+                obj.BaseRebar.ViewObject.Visibility = False
+
+    def get_arc_length_table(
+        self,
+        shape
+    ):
+        # not saved with the document, only the Type of the proxy is saved
+        key = (shape.hashCode(), str(shape.Placement))
+        cache = getattr(self, "arc_length_table", None)
+        if cache is None or cache[0] != key:
+            cache = (key, get_arc_length_table(shape))
+            self.arc_length_table = cache
+        return cache[1]
+
+
+def get_arc_length_table(shape, deflection=0.01):
+    """returns points (n, 3) along the first wire or edge of shape and
+    the arc length (n,) at each point or None"""
+    if shape.Wires:
+        wire = shape.Wires[0]
+    elif shape.Edges:
+        wire = Part.Wire(shape.Edges[0])
+    else:
+        return None
+    points = np.array([
+        tuple(p) for p in wire.discretize(Deflection=deflection)
+    ])
+    # no zero length segments, np.interp needs increasing lengths
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.linalg.norm(np.diff(points, axis=0), axis=1) > 1e-9
+    points = points[keep]
+    if len(points) < 2:
+        return None
+    lengths = np.concatenate([
+        [0.0],
+        np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))
+    ])
+    return points, lengths
+
+
+def get_path_placements(points, lengths, stations, align=True):
+    """returns translations (n, 3) and quaternions (n, 4) xyzw which
+    move the start of the path to the arc lengths stations (n,),
+    with align the tangent at the start is rotated into the
+    tangent at the stations"""
+    stations = np.clip(stations, 0.0, lengths[-1])
+    # segment of each station
+    segment = np.clip(
+        np.searchsorted(lengths, stations, side="right") - 1,
+        0,
+        len(points) - 2
+    )
+    seg_start = points[segment]
+    seg_vector = points[segment + 1] - seg_start
+    seg_length = lengths[segment + 1] - lengths[segment]
+    t = (stations - lengths[segment]) / seg_length
+    positions = seg_start + t[:, None] * seg_vector
+    origin = points[0]
+    count = len(stations)
+    if not align:
+        quaternions = np.tile([0.0, 0.0, 0.0, 1.0], (count, 1))
+        return positions - origin[None, :], quaternions
+
+    # shortest rotation of the start tangent into the tangents
+    tangents = seg_vector / seg_length[:, None]
+    first = (points[1] - points[0]) / lengths[1]
+    cross = np.cross(first, tangents)
+    dot = tangents @ first
+    quaternions = np.concatenate([cross, (1.0 + dot)[:, None]], axis=1)
+    # opposite tangents, half turn around any perpendicular axis
+    opposite = dot < -1.0 + 1e-9
+    if np.any(opposite):
+        perpendicular = np.cross(first, [0.0, 0.0, 1.0])
+        if np.linalg.norm(perpendicular) < 1e-6:
+            perpendicular = np.cross(first, [1.0, 0.0, 0.0])
+        perpendicular /= np.linalg.norm(perpendicular)
+        quaternions[opposite] = np.append(perpendicular, 0.0)
+    quaternions /= np.linalg.norm(quaternions, axis=1)[:, None]
+    # the start point moves onto the path: base = position - R * origin
+    translations = positions - rotate(quaternions, origin)
+    return translations, quaternions
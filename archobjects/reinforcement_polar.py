@@ -0,0 +1,213 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD polar reinforcement object"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import math
+
+import numpy as np
+from PySide.QtCore import QT_TRANSLATE_NOOP
+
+import FreeCAD
+
+from .reinforcement_generic import ReinforcementGeneric
+from .reinforcement_generic import get_active_bars
+
+
+class ReinforcementPolar(ReinforcementGeneric):
+
+    """
+    A polar reinforcement object based on a rebar object
+
+    The base rebar is rotated around Axis through Center, the first bar
+    at StartAngle, the last one at EndAngle. If the range is a full
+    circle the last bar is not on top of the first one. Same as a
+    lattice2 polar array, but without the lattice2 objects.
+
+    Additional Attributes
+    ---------------------
+    Center : App::PropertyVector
+        a point on the rotation axis
+    Axis : App::PropertyVector
+        direction of the rotation axis
+    StartAngle : App::PropertyAngle
+        rotation of the first bar
+    EndAngle : App::PropertyAngle
+        rotation of the last bar
+    """
+
+    def __init__(
+        self,
+        obj
+    ):
+        super(ReinforcementPolar, self).__init__(obj)
+        self.Type = "ReinforcementPolar"
+
+        pl = obj.PropertiesList
+
+        # user needs be able to change Amount in PropertyEditor
+        obj.setEditorMode("Amount", 0)
+        obj.Amount = 8
+
+        # New properties
+
+        # Center
+        if "Center" not in pl:
+            obj.addProperty(
+                "App::PropertyVector",
+                "Center",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "A point on the rotation axis"
+                )
+            )
+
+        # Axis
+        if "Axis" not in pl:
+            obj.addProperty(
+                "App::PropertyVector",
+                "Axis",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The direction of the rotation axis"
+                )
+            )
+        obj.Axis = FreeCAD.Vector(0, 0, 1)
+
+        # StartAngle
+        if "StartAngle" not in pl:
+            obj.addProperty(
+                "App::PropertyAngle",
+                "StartAngle",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The rotation of the first bar"
+                )
+            )
+        obj.StartAngle = 0
+
+        # EndAngle
+        if "EndAngle" not in pl:
+            obj.addProperty(
+                "App::PropertyAngle",
+                "EndAngle",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The rotation of the last bar"
+                )
+            )
+        obj.EndAngle = 360
+
+    def execute(
+        self,
+        obj
+    ):
+
+        if self.clone(obj):
+            return
+        if not obj.BaseRebar:
+            return
+        if obj.Axis.Length == 0:
+            FreeCAD.Console.PrintError(
+                "The axis of {} has no length.\n".format(obj.Label)
+            )
+            return
+
+        angles = get_polar_angles(
+            obj.StartAngle.Value,
+            obj.EndAngle.Value,
+            obj.Amount
+        )
+        translations, quaternions = get_polar_placements(
+            tuple(obj.Center),
+            tuple(obj.Axis),
+            angles
+        )
+        obj.RebarPlacements = to_placements(translations, quaternions)
+
+        self.build_shape(obj)
+        obj.TotalLength = len(get_active_bars(obj)) * obj.BaseRebar.Length
+
+        # set Visibility of BaseRebar
+        # this should be done in the Gui Command,
+        # but this dos not yet exist TODO
+        if FreeCAD.GuiUp:
+            if obj.Shape.isNull() is not True:
+                obj.BaseRebar.ViewObject.Visibility = False
+
+
+def get_polar_angles(start, end, amount):
+    """returns the angles (amount,) in radian out of start and end in
+    degree, a full circle does not repeat the first angle"""
+    if amount < 1:
+        return np.zeros(0)
+    if amount == 1:
+        return np.radians([start])
+    full_circle = math.isclose(abs(end - start) % 360.0, 0.0, abs_tol=1e-9)
+    return np.radians(np.linspace(
+        start,
+        end,
+        amount,
+        endpoint=not full_circle or end == start
+    ))
+
+
+def get_polar_placements(center, axis, angles):
+    """returns translations (n, 3) and quaternions (n, 4) xyzw of the
+    rotations by angles (n,) around axis through center"""
+    center = np.asarray(center, dtype=float)
+    axis = np.asarray(axis, dtype=float)
+    axis = axis / np.linalg.norm(axis)
+    half = 0.5 * np.asarray(angles, dtype=float)
+    quaternions = np.concatenate([
+        np.sin(half)[:, None] * axis[None, :],
+        np.cos(half)[:, None]
+    ], axis=1)
+    # the center stays where it is: base = center - rotated center
+    translations = center[None, :] - rotate(quaternions, center)
+    return translations, quaternions
+
+
+def rotate(quaternions, vectors):
+    """returns the vectors (3,) or (n, 3) rotated by the
+    quaternions (n, 4) xyzw"""
+    q = quaternions[:, :3]
+    w = quaternions[:, 3:]
+    t = 2.0 * np.cross(q, vectors)
+    return vectors + w * t + np.cross(q, t)
+
+
+def to_placements(translations, quaternions):
+    """returns a placement list out of translations (n, 3)
+    and quaternions (n, 4) xyzw"""
+    return [
+        FreeCAD.Placement(
+            FreeCAD.Vector(*base),
+            FreeCAD.Rotation(*q)
+        )
+        for base, q in zip(translations.tolist(), quaternions.tolist())
+    ]
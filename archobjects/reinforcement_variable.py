@@ -0,0 +1,297 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+__title__ = "FreeCAD variable reinforcement object"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import numpy as np
+from PySide.QtCore import QT_TRANSLATE_NOOP
+
+import FreeCAD
+
+import Part
+
+from .base_rebar import get_rebar_wire
+from .base_rebar import make_rebar_shape
+from .reinforcement_generic import ReinforcementGeneric
+from .reinforcement_generic import get_active_bars
+
+
+class ReinforcementVariable(ReinforcementGeneric):
+
+    """
+    A linear reinforcement with bars changing their shape
+
+    The first bar has the shape of BaseRebar, the last one the shape of
+    EndRebar. Both wires need the same count of straight edges. The
+    vertices of the bars in between are interpolated linearly, thus the
+    segments which differ between both wires are stretched, the other
+    ones are kept. The bars are spaced by Spacing along Direction like
+    in a linear reinforcement.
+
+    The interpolated vertices are rounded to Tolerance. Bars with the
+    same rounded vertices share one wire and one swept shape, thus a
+    tapered wall with dozens of bar lengths is one object and only the
+    distinct bars are swept.
+
+    Additional Attributes
+    ---------------------
+    EndRebar : App::PropertyLink
+        base rebar with the shape of the last bar, the diameter and the
+        mark number are taken from BaseRebar
+    Direction : App::PropertyVector
+        direction the bars are spread in
+    Spacing : App::PropertyLength
+        distance between two bars
+    Tolerance : App::PropertyLength
+        the interpolated vertices are rounded to multiples of it
+    BarLengths : App::PropertyFloatList
+        length of each bar without rounding, like Length of a base rebar
+    """
+
+    def __init__(
+        self,
+        obj
+    ):
+        super(ReinforcementVariable, self).__init__(obj)
+        self.Type = "ReinforcementVariable"
+
+        pl = obj.PropertiesList
+
+        # user needs be able to change Amount in PropertyEditor
+        obj.setEditorMode("Amount", 0)
+        obj.Amount = 5
+        # the bars are placed by Direction and Spacing
+        obj.setEditorMode("BasePlacement", 2)
+
+        # New properties
+
+        # EndRebar
+        if "EndRebar" not in pl:
+            obj.addProperty(
+                "App::PropertyLink",
+                "EndRebar",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "Base rebar with the shape of the last bar"
+                )
+            )
+
+        # Direction
+        if "Direction" not in pl:
+            obj.addProperty(
+                "App::PropertyVector",
+                "Direction",
+                "Reinforcement",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The direction to use to spread the bars"
+                )
+            )
+        obj.Direction = FreeCAD.Vector(0, 0, 1)
+
+        # Spacing
+        if "Spacing" not in pl:
+            obj.addProperty(
+                "App::PropertyLength",
+                "Spacing",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The spacing between the bars"
+                )
+            )
+        obj.Spacing = 200
+
+        # Tolerance
+        if "Tolerance" not in pl:
+            obj.addProperty(
+                "App::PropertyLength",
+                "Tolerance",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The bar vertices are rounded to multiples of it"
+                )
+            )
+        obj.Tolerance = 1
+
+        # BarLengths
+        if "BarLengths" not in pl:
+            obj.addProperty(
+                "App::PropertyFloatList",
+                "BarLengths",
+                "ArrayOfRebars",
+                QT_TRANSLATE_NOOP(
+                    "App::Property",
+                    "The length of each bar"
+                )
+            )
+            obj.setEditorMode("BarLengths", 1)
+
+    def execute(
+        self,
+        obj
+    ):
+
+        if self.clone(obj):
+            return
+        if not obj.BaseRebar or not obj.EndRebar:
+            return
+        if not obj.BaseRebar.Base or not obj.EndRebar.Base:
+            return
+        if obj.Direction.Length == 0:
+            FreeCAD.Console.PrintError(
+                "The direction of {} has no length.\n".format(obj.Label)
+            )
+            return
+
+        vertexes = interpolate_wires(
+            get_rebar_wire(obj.BaseRebar.Base.Shape),
+            get_rebar_wire(obj.EndRebar.Base.Shape),
+            obj.Amount,
+            obj.Tolerance.Value
+        )
+        if vertexes is None:
+            FreeCAD.Console.PrintError(
+                "The wires of {} and {} need the same count of "
+                "straight edges.\n"
+                .format(obj.BaseRebar.Label, obj.EndRebar.Label)
+            )
+            return
+
+        direction = FreeCAD.Vector(obj.Direction)
+        direction.normalize()
+        obj.RebarPlacements = [
+            FreeCAD.Placement(direction * (i * obj.Spacing.Value),
+                              FreeCAD.Rotation())
+            for i in range(obj.Amount)
+        ]
+        lengths = np.linalg.norm(np.diff(vertexes, axis=1), axis=2).sum(axis=1)
+        obj.BarLengths = lengths.tolist()
+        active = list(get_active_bars(obj))
+        obj.TotalLength = float(lengths[active].sum())
+
+        self.build_shape(obj)
+
+        # set Visibility of BaseRebar
+        # this should be done in the Gui Command,
+        # but this dos not yet exist TODO
+        if FreeCAD.GuiUp:
+            if obj.Shape.isNull() is not True:
+                obj.BaseRebar.ViewObject.Visibility = False
+                obj.EndRebar.ViewObject.Visibility = False
+
+    def build_shape(
+        self,
+        obj
+    ):
+        if not obj.BaseRebar or not obj.EndRebar:
+            obj.Shape = Part.Shape()
+            return
+        diameter = obj.BaseRebar.Diameter.Value
+        rounding = getattr(obj.BaseRebar, "Rounding", 0.0)
+        # one swept shape for each distinct wire
+        swept = {}
+        shapes = []
+        placements = obj.RebarPlacements
+        wires = self.get_bar_wires(obj)
+        for i in get_active_bars(obj):
+            pl = placements[i]
+            wire = wires[i]
+            if wire.hashCode() not in swept:
+                swept[wire.hashCode()] = make_rebar_shape(
+                    wire,
+                    diameter,
+                    rounding
+                )
+            base_shape = swept[wire.hashCode()]
+            if base_shape is None:
+                continue
+            if hasattr(base_shape, "located"):
+                shapes.append(base_shape.located(pl))
+            else:
+                bar = base_shape.copy()
+                bar.Placement = pl
+                shapes.append(bar)
+        if shapes:
+            obj.Shape = Part.makeCompound(shapes)
+        else:
+            obj.Shape = Part.Shape()
+
+    def get_bar_wires(
+        self,
+        obj
+    ):
+        """returns the wire of each bar in the coordinates of the base
+        rebar wire, bars with the same vertices share the wire"""
+        vertexes = interpolate_wires(
+            get_rebar_wire(obj.BaseRebar.Base.Shape),
+            get_rebar_wire(obj.EndRebar.Base.Shape),
+            len(obj.RebarPlacements),
+            obj.Tolerance.Value
+        )
+        if vertexes is None:
+            return []
+        wires = {}
+        bar_wires = []
+        for points in vertexes:
+            key = points.tobytes()
+            if key not in wires:
+                wires[key] = Part.makePolygon(
+                    [FreeCAD.Vector(*p) for p in points.tolist()]
+                )
+            bar_wires.append(wires[key])
+        return bar_wires
+
+
+def interpolate_wires(start, end, amount, tolerance=0.0):
+    """returns the vertices (amount, k, 3) of amount wires interpolated
+    from the wire start to the wire end or None if the wires are not
+    made of the same count of straight edges, the vertices are rounded
+    to multiples of tolerance"""
+    for wire in (start, end):
+        if any(e.Curve.TypeId != "Part::GeomLine" for e in wire.Edges):
+            return None
+    first = get_polyline(start)
+    last = get_polyline(end)
+    if first.shape != last.shape or amount < 1:
+        return None
+    if amount == 1:
+        t = np.zeros(1)
+    else:
+        t = np.linspace(0.0, 1.0, amount)
+    vertexes = first[None, :, :] + t[:, None, None] * (last - first)[None, :, :]
+    if tolerance > 0:
+        vertexes = np.round(vertexes / tolerance) * tolerance
+    # no negative zero, the bytes are used as key of identical bars
+    return vertexes + 0.0
+
+
+def get_polyline(wire):
+    """returns the ordered vertices (k, 3) of a wire,
+    the first one is repeated for closed wires"""
+    points = [tuple(v.Point) for v in wire.OrderedVertexes]
+    if wire.isClosed():
+        points.append(points[0])
+    return np.array(points, dtype=float)
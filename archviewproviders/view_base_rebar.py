@@ -29,6 +29,7 @@ import ArchComponent
 import Draft
 
 from .view_rebar_generic import ViewProviderRebarCommon
+from archobjects.reinforcement_generic import REINFORCEMENT_TYPES
 
 
 class ViewProviderBaseRebar(ViewProviderRebarCommon):
@@ -61,13 +62,7 @@ class ViewProviderBaseRebar(ViewProviderRebarCommon):
             # claim reinforcements for this rebar
             for o in self.Object.Document.Objects:
                 # print(Draft.getType(o))
-                if (
-                    Draft.getType(o) == "ReinforcementGeneric"
-                    or Draft.getType(o) == "ReinforcementLinear"
-                    or Draft.getType(o) == "ReinforcementLattice"
-                    or Draft.getType(o) == "ReinforcementIndividual"
-                    or Draft.getType(o) == "ReinforcementCustom"
-                ):
+                if Draft.getType(o) in REINFORCEMENT_TYPES:
                     if o.BaseRebar == self.Object:
                         children.append(o)
 
@@ -93,13 +88,7 @@ class ViewProviderBaseRebar(ViewProviderRebarCommon):
         return True
 
     def canDragObject(self, dragged_object):
-        if (
-            Draft.getType(dragged_object) == "ReinforcementGeneric"
-            or Draft.getType(dragged_object) == "ReinforcementLinear"
-            or Draft.getType(dragged_object) == "ReinforcementLattice"
-            or Draft.getType(dragged_object) == "ReinforcementIndividual"
-            or Draft.getType(dragged_object) == "ReinforcementCustom"
-        ):
+        if Draft.getType(dragged_object) in REINFORCEMENT_TYPES:
             return True
         else:
             return False
@@ -108,26 +97,14 @@ class ViewProviderBaseRebar(ViewProviderRebarCommon):
         return True
 
     def dragObject(self, selfvp, dragged_object):
-        if (
-            Draft.getType(dragged_object) == "ReinforcementGeneric"
-            or Draft.getType(dragged_object) == "ReinforcementLinear"
-            or Draft.getType(dragged_object) == "ReinforcementLattice"
-            or Draft.getType(dragged_object) == "ReinforcementIndividual"
-            or Draft.getType(dragged_object) == "ReinforcementCustom"
-        ):
+        if Draft.getType(dragged_object) in REINFORCEMENT_TYPES:
             dragged_object.BaseRebar = None
             # mark the object we move out to recompute
             # TODO is the touch() needed?
             selfvp.Object.touch()
 
     def dropObject(self, selfvp, incoming_object):
-        if (
-            Draft.getType(incoming_object) == "ReinforcementGeneric"
-            or Draft.getType(incoming_object) == "ReinforcementLinear"
-            or Draft.getType(incoming_object) == "ReinforcementLattice"
-            or Draft.getType(incoming_object) == "ReinforcementIndividual"
-            or Draft.getType(incoming_object) == "ReinforcementCustom"
-        ):
+        if Draft.getType(incoming_object) in REINFORCEMENT_TYPES:
             incoming_object.BaseRebar = selfvp.Object
             # mark the object we move in to recompute
             # TODO is the touch() needed?
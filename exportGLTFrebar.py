@@ -0,0 +1,385 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+glTF export of reinforcements with GPU instancing for web viewers.
+
+Each base rebar shape is tessellated once into one glTF mesh. Each
+reinforcement is one node which uses the mesh of its base rebar and
+holds the placements of its rebars (RebarPlacements x BasePlacement) in
+the EXT_mesh_gpu_instancing extension. Per instance the mark number and
+the diameter are written as the custom attributes _MARK and _DIAMETER.
+Suppressed bars, see SuppressedBars, are not written.
+
+FreeCAD is z up in mm, glTF is y up in m, the root node converts.
+The format is taken from the file extension, .glb binary or .gltf
+with the buffer embedded.
+
+"""
+
+__title__ = "FreeCAD rebar glTF exporter"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import base64
+import json
+import math
+import struct
+
+import numpy as np
+
+import FreeCAD
+
+import Draft
+
+import rebarmesh
+from archobjects.reinforcement_generic import REINFORCEMENT_TYPES
+from archobjects.reinforcement_generic import get_active_bars
+
+# glTF constants
+FLOAT = 5126
+UNSIGNED_INT = 5125
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+
+def export(exportList, filename, tolerance=0.5, tube_mesh=False):
+    """export(exportList, filename, [tolerance], [tube_mesh]):
+    exports the reinforcements in exportList,
+    tolerance is the tessellation tolerance in mm,
+    with tube_mesh the analytic tube mesh of rebarmesh is used
+    instead of the tessellation of the base rebar shape"""
+    reinforcements = [
+        o for o in exportList
+        if Draft.getType(o) in REINFORCEMENT_TYPES
+        and o.BaseRebar is not None
+        and get_active_bars(o)
+    ]
+    if not reinforcements:
+        FreeCAD.Console.PrintWarning("No reinforcement to export.\n")
+        return
+
+    writer = GltfWriter()
+    # {base rebar name, (diameter, length) of a straight bar
+    # or (reinforcement name, wire hash): mesh index}
+    meshes = {}
+    nodes = []
+    for obj in reinforcements:
+        base = obj.BaseRebar
+        if hasattr(obj.Proxy, "get_bar_wires"):
+            nodes.extend(add_variable_nodes(writer, meshes, obj))
+            continue
+        if getattr(obj, "BarLengths", None):
+            nodes.extend(add_grid_nodes(writer, meshes, obj))
+            continue
+        if base.Name not in meshes:
+            if tube_mesh is True:
+                points, triangles = rebarmesh.base_rebar_mesh(base)
+                points = points.astype(np.float32)
+                triangles = triangles.astype(np.uint32)
+            else:
+                points, triangles = tessellate_base_rebar(base, tolerance)
+            meshes[base.Name] = writer.add_mesh(base.Label, points, triangles)
+        nodes.append(writer.add_instanced_node(
+            obj.Label,
+            meshes[base.Name],
+            obj.Placement,
+            get_instance_placements(obj),
+            base.MarkNumber,
+            base.Diameter.Value
+        ))
+    writer.add_root(nodes)
+
+    if filename.lower().endswith(".gltf"):
+        writer.write_gltf(filename)
+    else:
+        writer.write_glb(filename)
+    print(
+        "{} reinforcements with {} meshes written to {}"
+        .format(len(nodes), len(meshes), filename)
+    )
+
+
+def add_grid_nodes(writer, meshes, obj):
+    """adds one instanced node per bar length of the grid reinforcement
+    obj, the straight bars share one tube mesh per diameter and length,
+    returns the node indices"""
+    base = obj.BaseRebar
+    diameter = base.Diameter.Value
+    # the index of the instance is the index in the active bars
+    groups = {}  # {length: [instance index]}
+    lengths = obj.BarLengths
+    for k, i in enumerate(get_active_bars(obj)):
+        groups.setdefault(round(lengths[i], 3), []).append(k)
+    nodes = []
+    translations, rotations = get_instance_placements(obj)
+    for length, indices in sorted(groups.items()):
+        key = (round(diameter, 3), length)
+        if key not in meshes:
+            points, triangles = rebarmesh.tube_mesh(
+                np.array([[0.0, 0.0, 0.0], [length, 0.0, 0.0]]),
+                diameter / 2.0
+            )
+            meshes[key] = writer.add_mesh(
+                "Bar_{}_{}".format(key[0], key[1]),
+                points.astype(np.float32),
+                triangles.astype(np.uint32)
+            )
+        nodes.append(writer.add_instanced_node(
+            "{}_{}".format(obj.Label, length),
+            meshes[key],
+            obj.Placement,
+            (translations[indices], rotations[indices]),
+            base.MarkNumber,
+            diameter
+        ))
+    return nodes
+
+
+def add_variable_nodes(writer, meshes, obj):
+    """adds one instanced node per distinct bar wire of the variable
+    reinforcement obj, returns the node indices"""
+    base = obj.BaseRebar
+    diameter = base.Diameter.Value
+    fillet_radius = getattr(base, "Rounding", 0.0) * diameter
+    # the index of the instance is the index in the active bars
+    groups = {}  # {wire hash: (wire, [instance index])}
+    wires = obj.Proxy.get_bar_wires(obj)
+    for k, i in enumerate(get_active_bars(obj)):
+        groups.setdefault(wires[i].hashCode(), (wires[i], []))[1].append(k)
+    nodes = []
+    translations, rotations = get_instance_placements(obj)
+    for number, (key, (wire, indices)) in enumerate(groups.items()):
+        key = (obj.Name, key)
+        if key not in meshes:
+            points, triangles = rebarmesh.tube_mesh(
+                rebarmesh.wire_center_line(wire, fillet_radius),
+                diameter / 2.0
+            )
+            meshes[key] = writer.add_mesh(
+                "{}_{}".format(obj.Label, number),
+                points.astype(np.float32),
+                triangles.astype(np.uint32)
+            )
+        nodes.append(writer.add_instanced_node(
+            "{}_{}".format(obj.Label, number),
+            meshes[key],
+            obj.Placement,
+            (translations[indices], rotations[indices]),
+            base.MarkNumber,
+            diameter
+        ))
+    return nodes
+
+
+def tessellate_base_rebar(base, tolerance):
+    """returns points (n, 3) float32 and triangles (m, 3) uint32 of the
+    shape of the base rebar obj base, in the coordinates the
+    reinforcements place it, see ReinforcementGeneric.build_shape"""
+    shape = base.Shape.copy()
+    shape.Placement = FreeCAD.Placement()
+    points, triangles = shape.tessellate(tolerance)
+    points = np.array([[p.x, p.y, p.z] for p in points], dtype=np.float32)
+    triangles = np.array(triangles, dtype=np.uint32).reshape(-1, 3)
+    return points, triangles
+
+
+def get_instance_placements(obj):
+    """returns translations (n, 3) and rotations (n, 4) as xyzw
+    quaternions of the not suppressed rebars of the reinforcement obj"""
+    translations = []
+    rotations = []
+    # grid and variable reinforcements place their bars without
+    # the BasePlacement, see their build_shape
+    if Draft.getType(obj) in ("ReinforcementGrid", "ReinforcementVariable"):
+        base_placement = FreeCAD.Placement()
+    else:
+        base_placement = obj.BasePlacement
+    placements = obj.RebarPlacements
+    for pl in (placements[i] for i in get_active_bars(obj)):
+        pl = pl.multiply(base_placement)
+        translations.append(tuple(pl.Base))
+        rotations.append(pl.Rotation.Q)
+    return (
+        np.array(translations, dtype=np.float32),
+        np.array(rotations, dtype=np.float32),
+    )
+
+
+def get_normals(points, triangles):
+    """returns the normalized vertex normals, the sum of the
+    area weighted normals of the triangles of each vertex"""
+    p0 = points[triangles[:, 0]]
+    face_normals = np.cross(
+        points[triangles[:, 1]] - p0,
+        points[triangles[:, 2]] - p0
+    )
+    normals = np.zeros_like(points)
+    for i in range(3):
+        np.add.at(normals, triangles[:, i], face_normals)
+    length = np.linalg.norm(normals, axis=1)
+    length[length == 0] = 1.0
+    return (normals / length[:, None]).astype(np.float32)
+
+
+class GltfWriter(object):
+
+    """collects the glTF json and the binary buffer"""
+
+    def __init__(self):
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "FreeCAD rebar2"},
+            "extensionsUsed": ["EXT_mesh_gpu_instancing"],
+            "scene": 0,
+            "scenes": [{"nodes": []}],
+            "nodes": [],
+            "meshes": [],
+            "materials": [{
+                "name": "Rebar",
+                "pbrMetallicRoughness": {
+                    "baseColorFactor": [0.5, 0.25, 0.15, 1.0],
+                    "metallicFactor": 0.6,
+                    "roughnessFactor": 0.5,
+                },
+            }],
+            "accessors": [],
+            "bufferViews": [],
+            "buffers": [],
+        }
+        self.chunks = []
+        self.offset = 0
+
+    def add_accessor(self, data, accessor_type, target=None, min_max=False):
+        """adds data as buffer view and accessor, returns its index"""
+        data = np.ascontiguousarray(data)
+        raw = data.tobytes()
+        view = {
+            "buffer": 0,
+            "byteOffset": self.offset,
+            "byteLength": len(raw),
+        }
+        if target is not None:
+            view["target"] = target
+        self.gltf["bufferViews"].append(view)
+        # all accessors are 4 byte aligned
+        padding = (4 - len(raw) % 4) % 4
+        self.chunks.append(raw + b"\x00" * padding)
+        self.offset += len(raw) + padding
+
+        accessor = {
+            "bufferView": len(self.gltf["bufferViews"]) - 1,
+            "componentType": (
+                UNSIGNED_INT if data.dtype == np.uint32 else FLOAT
+            ),
+            "count": len(data),
+            "type": accessor_type,
+        }
+        if min_max:
+            accessor["min"] = data.min(axis=0).tolist()
+            accessor["max"] = data.max(axis=0).tolist()
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def add_mesh(self, name, points, triangles):
+        position = self.add_accessor(points, "VEC3", ARRAY_BUFFER, True)
+        normal = self.add_accessor(
+            get_normals(points, triangles), "VEC3", ARRAY_BUFFER
+        )
+        indices = self.add_accessor(
+            triangles.reshape(-1), "SCALAR", ELEMENT_ARRAY_BUFFER
+        )
+        self.gltf["meshes"].append({
+            "name": name,
+            "primitives": [{
+                "attributes": {"POSITION": position, "NORMAL": normal},
+                "indices": indices,
+                "material": 0,
+            }],
+        })
+        return len(self.gltf["meshes"]) - 1
+
+    def add_instanced_node(
+        self,
+        name,
+        mesh,
+        placement,
+        instances,
+        mark,
+        diameter
+    ):
+        translations, rotations = instances
+        count = len(translations)
+        attributes = {
+            "TRANSLATION": self.add_accessor(translations, "VEC3"),
+            "ROTATION": self.add_accessor(rotations, "VEC4"),
+            "_MARK": self.add_accessor(
+                np.full(count, mark, dtype=np.float32), "SCALAR"
+            ),
+            "_DIAMETER": self.add_accessor(
+                np.full(count, diameter, dtype=np.float32), "SCALAR"
+            ),
+        }
+        self.gltf["nodes"].append({
+            "name": name,
+            "mesh": mesh,
+            "translation": list(placement.Base),
+            "rotation": list(placement.Rotation.Q),
+            "extensions": {
+                "EXT_mesh_gpu_instancing": {"attributes": attributes}
+            },
+        })
+        return len(self.gltf["nodes"]) - 1
+
+    def add_root(self, children):
+        # z up in mm to y up in m
+        half = math.sqrt(0.5)
+        self.gltf["nodes"].append({
+            "name": "Reinforcement",
+            "children": children,
+            "rotation": [-half, 0.0, 0.0, half],
+            "scale": [0.001, 0.001, 0.001],
+        })
+        self.gltf["scenes"][0]["nodes"] = [len(self.gltf["nodes"]) - 1]
+
+    def write_glb(self, filename):
+        binary = b"".join(self.chunks)
+        self.gltf["buffers"] = [{"byteLength": len(binary)}]
+        text = json.dumps(self.gltf, separators=(",", ":")).encode("utf-8")
+        text += b" " * ((4 - len(text) % 4) % 4)
+        length = 12 + 8 + len(text) + 8 + len(binary)
+        with open(filename, "wb") as f:
+            f.write(struct.pack("<4sII", b"glTF", 2, length))
+            f.write(struct.pack("<I4s", len(text), b"JSON"))
+            f.write(text)
+            f.write(struct.pack("<I4s", len(binary), b"BIN\x00"))
+            f.write(binary)
+
+    def write_gltf(self, filename):
+        binary = b"".join(self.chunks)
+        self.gltf["buffers"] = [{
+            "byteLength": len(binary),
+            "uri": (
+                "data:application/octet-stream;base64,"
+                + base64.b64encode(binary).decode("ascii")
+            ),
+        }]
+        with open(filename, "w") as f:
+            json.dump(self.gltf, f)
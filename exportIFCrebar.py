@@ -0,0 +1,397 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+IFC export of reinforcements, the way Allplan exports them.
+
+Only the reinforcement objs are exported as IfcReinforcingBar, not the
+base rebar objs. Each base rebar is written once as an IfcSweptDiskSolid
+over its wire inside an IfcRepresentationMap. Each reinforcement has one
+IfcMappedItem per rebar placement. Thus the file size scales with the
+number of placements and not with the triangles of the rebars.
+Suppressed bars, see SuppressedBars, are not written.
+
+The mark number is written into the property set Allplan_ReinforcingBar
+as "Position number", the file can be imported with importIFCrebar.
+
+"""
+
+__title__ = "FreeCAD rebar IFC exporter"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import math
+import time
+import uuid
+
+import FreeCAD
+from FreeCAD import Vector as vec
+
+import Draft
+from DraftGeomUtils import filletWire
+
+from archobjects.base_rebar import get_rebar_wire
+from archobjects.reinforcement_generic import REINFORCEMENT_TYPES
+from archobjects.reinforcement_generic import get_active_bars
+
+
+def export(exportList, filename):
+    """export(exportList, filename):
+    exports the reinforcements in exportList into an IFC2X3 file"""
+    try:
+        import ifcopenshell
+    except:
+        FreeCAD.Console.PrintError(
+            "IfcOpenShell was not found on this system. "
+            "IFC support is disabled\n"
+        )
+        return
+
+    reinforcements = [
+        o for o in exportList if Draft.getType(o) in REINFORCEMENT_TYPES
+    ]
+    if not reinforcements:
+        FreeCAD.Console.PrintWarning("No reinforcement to export.\n")
+        return
+
+    writer = RebarIfcWriter(ifcopenshell)
+    for obj in reinforcements:
+        writer.add_reinforcement(obj)
+    writer.finish()
+    writer.ifcfile.write(filename)
+    print(
+        "{} reinforcements with {} base rebars written to {}"
+        .format(len(writer.bars), len(writer.maps), filename)
+    )
+
+
+def new_guid(ifcopenshell):
+    return ifcopenshell.guid.compress(uuid.uuid1().hex)
+
+
+class RebarIfcWriter(object):
+
+    """
+    Writes reinforcements into a new ifc file, the base rebars
+    are written once and shared by all reinforcements using them.
+    Points and directions are shared too.
+    """
+
+    def __init__(self, ifcopenshell):
+        self.ifcopenshell = ifcopenshell
+        self.ifcfile = ifcopenshell.file(schema="IFC2X3")
+        # {base rebar name, (diameter, length) of a straight bar
+        # or (reinforcement name, wire hash): IfcRepresentationMap}
+        self.maps = {}
+        self.bars = []  # IfcReinforcingBar
+        self.points = {}  # {coordinates: IfcCartesianPoint}
+        self.directions = {}  # {ratios: IfcDirection}
+        self.create_project()
+
+    # entities shared by coordinates
+    def point(self, v):
+        key = (round(v[0], 6) + 0.0, round(v[1], 6) + 0.0, round(v[2], 6) + 0.0)
+        if key not in self.points:
+            self.points[key] = self.ifcfile.createIfcCartesianPoint(key)
+        return self.points[key]
+
+    def direction(self, v):
+        key = (round(v[0], 9) + 0.0, round(v[1], 9) + 0.0, round(v[2], 9) + 0.0)
+        if key not in self.directions:
+            self.directions[key] = self.ifcfile.createIfcDirection(key)
+        return self.directions[key]
+
+    def axis2placement(self, placement=None):
+        if placement is None:
+            placement = FreeCAD.Placement()
+        rot = placement.Rotation
+        return self.ifcfile.createIfcAxis2Placement3D(
+            self.point(placement.Base),
+            self.direction(rot.multVec(vec(0, 0, 1))),
+            self.direction(rot.multVec(vec(1, 0, 0)))
+        )
+
+    def create_project(self):
+        f = self.ifcfile
+        person = f.createIfcPerson(None, None, "", None, None, None, None, None)
+        organization = f.createIfcOrganization(None, "", None, None, None)
+        person_org = f.createIfcPersonAndOrganization(person, organization, None)
+        application = f.createIfcApplication(
+            organization,
+            FreeCAD.Version()[0] + "." + FreeCAD.Version()[1],
+            "FreeCAD",
+            "FreeCAD rebar2"
+        )
+        self.owner_history = f.createIfcOwnerHistory(
+            person_org, application, None, "ADDED", None, None, None,
+            int(time.time())
+        )
+        # all lengths in mm, the unit of FreeCAD
+        units = f.createIfcUnitAssignment([
+            f.createIfcSIUnit(None, "LENGTHUNIT", "MILLI", "METRE"),
+            f.createIfcSIUnit(None, "AREAUNIT", None, "SQUARE_METRE"),
+            f.createIfcSIUnit(None, "VOLUMEUNIT", None, "CUBIC_METRE"),
+            f.createIfcSIUnit(None, "PLANEANGLEUNIT", None, "RADIAN"),
+        ])
+        self.context = f.createIfcGeometricRepresentationContext(
+            None, "Model", 3, 1.0E-05, self.axis2placement(), None
+        )
+        project = f.createIfcProject(
+            new_guid(self.ifcopenshell), self.owner_history,
+            FreeCAD.ActiveDocument.Label if FreeCAD.ActiveDocument else "",
+            None, None, None, None, [self.context], units
+        )
+        # spatial structure, the reinforcements are in the storey
+        origin = f.createIfcLocalPlacement(None, self.axis2placement())
+        site = f.createIfcSite(
+            new_guid(self.ifcopenshell), self.owner_history, "Site",
+            None, None, origin, None, None, "ELEMENT",
+            None, None, None, None, None
+        )
+        building = f.createIfcBuilding(
+            new_guid(self.ifcopenshell), self.owner_history, "Building",
+            None, None, origin, None, None, "ELEMENT", None, None, None
+        )
+        self.storey = f.createIfcBuildingStorey(
+            new_guid(self.ifcopenshell), self.owner_history, "Storey",
+            None, None, origin, None, None, "ELEMENT", 0.0
+        )
+        self.origin = origin
+        for relating, related in (
+            (project, site),
+            (site, building),
+            (building, self.storey)
+        ):
+            f.createIfcRelAggregates(
+                new_guid(self.ifcopenshell), self.owner_history,
+                None, None, relating, [related]
+            )
+
+    def finish(self):
+        if self.bars:
+            self.ifcfile.createIfcRelContainedInSpatialStructure(
+                new_guid(self.ifcopenshell), self.owner_history,
+                None, None, self.bars, self.storey
+            )
+
+    # base rebar
+    def get_representation_map(self, base):
+        """returns the IfcRepresentationMap of the base rebar obj base,
+        created on first use"""
+        # the reinforcement shape is built out of the base rebar shape
+        # with its placement replaced, see ReinforcementGeneric.build_shape
+        # thus the wire is taken as it is, the base rebar Placement
+        # is not part of the geometry
+        return self.get_wire_map(
+            base.Name,
+            get_rebar_wire(base.Base.Shape),
+            base.Diameter.Value,
+            getattr(base, "Rounding", 0.0)
+        )
+
+    def get_wire_map(self, key, wire, diameter, rounding=0.0):
+        """returns the IfcRepresentationMap of a circle of diameter swept
+        along wire, created on first use of key. The corners are filleted
+        with rounding times diameter like in make_rebar_shape, thus the
+        directrix has the fillet arcs of the FreeCAD shape"""
+        if key in self.maps:
+            return self.maps[key]
+        f = self.ifcfile
+        if rounding:
+            wire = filletWire(wire, rounding * diameter)
+        solid = f.createIfcSweptDiskSolid(
+            self.make_directrix(wire),
+            diameter / 2.0,
+            None,
+            None,
+            None
+        )
+        representation = f.createIfcShapeRepresentation(
+            self.context, "Body", "SweptSolid", [solid]
+        )
+        rep_map = f.createIfcRepresentationMap(
+            self.axis2placement(), representation
+        )
+        self.maps[key] = rep_map
+        return rep_map
+
+    def get_straight_map(self, diameter, length):
+        """returns the IfcRepresentationMap of a straight bar along
+        the x axis, shared by all bars of the same diameter and length"""
+        key = (round(diameter, 3), round(length, 3))
+        if key not in self.maps:
+            f = self.ifcfile
+            solid = f.createIfcSweptDiskSolid(
+                f.createIfcPolyline([
+                    self.point((0.0, 0.0, 0.0)),
+                    self.point((key[1], 0.0, 0.0))
+                ]),
+                diameter / 2.0,
+                None,
+                None,
+                None
+            )
+            representation = f.createIfcShapeRepresentation(
+                self.context, "Body", "SweptSolid", [solid]
+            )
+            self.maps[key] = f.createIfcRepresentationMap(
+                self.axis2placement(), representation
+            )
+        return self.maps[key]
+
+    def make_directrix(self, wire):
+        """returns an IfcPolyline for a wire of straight edges,
+        else an IfcCompositeCurve with IfcTrimmedCurve arcs"""
+        f = self.ifcfile
+        edges = wire.OrderedEdges
+        vertexes = wire.OrderedVertexes
+        if wire.isClosed():
+            vertexes = vertexes + [vertexes[0]]
+        if all(e.Curve.TypeId == "Part::GeomLine" for e in edges):
+            return f.createIfcPolyline([self.point(v.Point) for v in vertexes])
+        segments = []
+        for i, edge in enumerate(edges):
+            start = vertexes[i].Point
+            end = vertexes[i + 1].Point
+            if edge.Curve.TypeId == "Part::GeomCircle":
+                circle = edge.Curve
+                # the arc runs counterclockwise from start to end,
+                # if the edge runs against its curve the axis is flipped
+                axis = circle.Axis
+                first = edge.valueAt(edge.FirstParameter)
+                if (first - start).Length > (first - end).Length:
+                    axis = -axis
+                # the placement of the circle, x axis on the start point
+                placement = f.createIfcAxis2Placement3D(
+                    self.point(circle.Center),
+                    self.direction(axis),
+                    self.direction(start - circle.Center)
+                )
+                curve = f.createIfcTrimmedCurve(
+                    f.createIfcCircle(placement, circle.Radius),
+                    [self.point(start)],
+                    [self.point(end)],
+                    True,
+                    "CARTESIAN"
+                )
+            else:
+                # a straight edge, everything else is approximated by a line
+                curve = f.createIfcPolyline([self.point(start), self.point(end)])
+            segments.append(
+                f.createIfcCompositeCurveSegment("CONTINUOUS", True, curve)
+            )
+        return f.createIfcCompositeCurve(segments, False)
+
+    # reinforcement
+    def add_reinforcement(self, obj):
+        base = obj.BaseRebar
+        active = get_active_bars(obj)
+        if base is None or base.Base is None or not active:
+            FreeCAD.Console.PrintWarning(
+                "Reinforcement {} has no base rebar or no placements, "
+                "thus not exported.\n".format(obj.Label)
+            )
+            return
+        f = self.ifcfile
+        # grid reinforcements have straight bars of their own length
+        # variable reinforcements have a wire for each bar
+        bar_lengths = getattr(obj, "BarLengths", None)
+        bar_wires = None
+        if hasattr(obj.Proxy, "get_bar_wires"):
+            bar_wires = obj.Proxy.get_bar_wires(obj)
+        if not bar_lengths:
+            rep_map = self.get_representation_map(base)
+        items = []
+        placements = obj.RebarPlacements
+        for i in active:
+            pl = placements[i]
+            if bar_wires:
+                rep_map = self.get_wire_map(
+                    (obj.Name, bar_wires[i].hashCode()),
+                    bar_wires[i],
+                    base.Diameter.Value,
+                    getattr(base, "Rounding", 0.0)
+                )
+            elif bar_lengths:
+                rep_map = self.get_straight_map(
+                    base.Diameter.Value,
+                    bar_lengths[i]
+                )
+            else:
+                pl = pl.multiply(obj.BasePlacement)
+            rot = pl.Rotation
+            operator = f.createIfcCartesianTransformationOperator3D(
+                self.direction(rot.multVec(vec(1, 0, 0))),
+                self.direction(rot.multVec(vec(0, 1, 0))),
+                self.point(pl.Base),
+                1.0,
+                self.direction(rot.multVec(vec(0, 0, 1)))
+            )
+            items.append(f.createIfcMappedItem(rep_map, operator))
+        representation = f.createIfcShapeRepresentation(
+            self.context, "Body", "MappedRepresentation", items
+        )
+        product_shape = f.createIfcProductDefinitionShape(
+            None, None, [representation]
+        )
+        placement = f.createIfcLocalPlacement(
+            self.origin,
+            self.axis2placement(obj.Placement)
+        )
+
+        global_id = None
+        if hasattr(obj, "IfcData"):
+            global_id = obj.IfcData.get("IfcUID")
+        if not global_id:
+            global_id = new_guid(self.ifcopenshell)
+        diameter = base.Diameter.Value
+        bar_length = base.Length.Value
+        if bar_lengths:
+            # BarLength is optional, not set if the bars differ in length
+            lengths = set(round(bar_lengths[i], 3) for i in active)
+            bar_length = lengths.pop() if len(lengths) == 1 else None
+        bar = f.createIfcReinforcingBar(
+            global_id, self.owner_history, obj.Label, None, None,
+            placement, product_shape, None,
+            None,  # SteelGrade
+            diameter,
+            math.pi * (diameter / 1000.0) ** 2 / 4.0,  # m2
+            bar_length,
+            "NOTDEFINED",
+            None
+        )
+        self.bars.append(bar)
+        self.add_mark_property(bar, base.MarkNumber)
+        return bar
+
+    def add_mark_property(self, bar, mark):
+        f = self.ifcfile
+        prop = f.createIfcPropertySingleValue(
+            "Position number", None, f.create_entity("IfcInteger", mark), None
+        )
+        pset = f.createIfcPropertySet(
+            new_guid(self.ifcopenshell), self.owner_history,
+            "Allplan_ReinforcingBar", None, [prop]
+        )
+        f.createIfcRelDefinesByProperties(
+            new_guid(self.ifcopenshell), self.owner_history,
+            None, None, [bar], pset
+        )
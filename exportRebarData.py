@@ -0,0 +1,220 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Export one row per physical rebar of the reinforcements for analytics.
+
+Only the BaseRebar objects and the RebarPlacements of the reinforcements
+are read, no shape is built. The rows are written while they are
+generated, the Parquet file in row groups of chunk_size rows. Thus the
+memory used does not depend on the number of rebars. Suppressed bars,
+see SuppressedBars, have no row.
+
+Columns:
+reinforcement, mark, diameter (mm), length (mm), weight (kg),
+x, y, z (mm, start point of the rebar), host, global_id
+
+"""
+
+__title__ = "FreeCAD rebar data exporter"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import csv
+import math
+
+import FreeCAD
+
+import Draft
+
+from archobjects.base_rebar import get_rebar_wire
+from archobjects.reinforcement_generic import REINFORCEMENT_TYPES
+from archobjects.reinforcement_generic import get_active_bars
+
+COLUMNS = [
+    "reinforcement",
+    "mark",
+    "diameter",
+    "length",
+    "weight",
+    "x",
+    "y",
+    "z",
+    "host",
+    "global_id",
+]
+
+# kg/m3
+STEEL_DENSITY = 7850.0
+
+
+def export(exportList, filename, chunk_size=100000):
+    """export(exportList, filename, [chunk_size]):
+    writes one row per rebar of the reinforcements in exportList,
+    the format is taken from the extension, .csv or .parquet
+    returns the number of rows written"""
+    if filename.lower().endswith(".parquet"):
+        return write_parquet(exportList, filename, chunk_size)
+    return write_csv(exportList, filename)
+
+
+def write_csv(objects, filename):
+    rows = 0
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in iter_rows(objects):
+            writer.writerow(row)
+            rows += 1
+    print("{} rebars written to {}".format(rows, filename))
+    return rows
+
+
+def write_parquet(objects, filename, chunk_size=100000):
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        FreeCAD.Console.PrintError(
+            "pyarrow was not found on this system. "
+            "Parquet export is disabled\n"
+        )
+        return 0
+    schema = pyarrow.schema([
+        ("reinforcement", pyarrow.string()),
+        ("mark", pyarrow.int64()),
+        ("diameter", pyarrow.float64()),
+        ("length", pyarrow.float64()),
+        ("weight", pyarrow.float64()),
+        ("x", pyarrow.float64()),
+        ("y", pyarrow.float64()),
+        ("z", pyarrow.float64()),
+        ("host", pyarrow.string()),
+        ("global_id", pyarrow.string()),
+    ])
+    rows = 0
+    writer = pyarrow.parquet.ParquetWriter(filename, schema)
+    try:
+        chunk = []
+        for row in iter_rows(objects):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                writer.write_table(make_table(pyarrow, schema, chunk))
+                rows += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write_table(make_table(pyarrow, schema, chunk))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    print("{} rebars written to {}".format(rows, filename))
+    return rows
+
+
+def make_table(pyarrow, schema, chunk):
+    """returns a pyarrow table of a chunk of rows, one row group"""
+    columns = list(zip(*chunk))
+    return pyarrow.Table.from_arrays(
+        [pyarrow.array(col, type=schema.field(i).type)
+            for i, col in enumerate(columns)],
+        schema=schema
+    )
+
+
+def get_reinforcements(objects=None):
+    """returns the reinforcements out of objects,
+    all of the active document if objects is None"""
+    if objects is None:
+        objects = FreeCAD.ActiveDocument.Objects
+    return [o for o in objects if Draft.getType(o) in REINFORCEMENT_TYPES]
+
+
+def iter_rows(objects=None):
+    """yields one row per rebar of the reinforcements in objects,
+    see COLUMNS"""
+    base_data = {}  # {base rebar name: (mark, diameter, length, ...)}
+    for obj in get_reinforcements(objects):
+        base = obj.BaseRebar
+        if base is None or not obj.RebarPlacements:
+            continue
+        if base.Name not in base_data:
+            base_data[base.Name] = get_base_data(base)
+        mark, diameter, length, weight, start = base_data[base.Name]
+        host = obj.Host.Label if obj.Host else ""
+        global_id = ""
+        if hasattr(obj, "IfcData"):
+            global_id = obj.IfcData.get("IfcUID", "")
+        # grid and variable reinforcements have bars of their own length
+        # grid bars start in the placement, see ReinforcementGrid
+        # variable bars have their own wire, see ReinforcementVariable
+        bar_lengths = getattr(obj, "BarLengths", None)
+        bar_wires = None
+        if hasattr(obj.Proxy, "get_bar_wires"):
+            bar_wires = obj.Proxy.get_bar_wires(obj)
+        if bar_lengths:
+            start = FreeCAD.Vector()
+            base_placement = FreeCAD.Placement()
+        else:
+            # same as build_shape, placement of the reinforcement on top
+            base_placement = obj.BasePlacement
+        placements = obj.RebarPlacements
+        for i in get_active_bars(obj):
+            pl = placements[i]
+            pos = obj.Placement.multiply(pl).multiply(base_placement)
+            if bar_wires:
+                start = bar_wires[i].OrderedVertexes[0].Point
+            point = pos.multVec(start)
+            if bar_lengths:
+                length = bar_lengths[i]
+                weight = get_weight(diameter, length)
+            yield (
+                obj.Label,
+                mark,
+                diameter,
+                length,
+                weight,
+                point.x,
+                point.y,
+                point.z,
+                host,
+                global_id,
+            )
+
+
+def get_base_data(base):
+    """returns mark, diameter, length, weight of one rebar and its
+    start point relative to the base rebar shape of base"""
+    diameter = base.Diameter.Value
+    length = base.Length.Value
+    weight = get_weight(diameter, length)
+    start = FreeCAD.Vector()
+    if base.Base and base.Base.Shape.Edges:
+        # the shape of the reinforcement is built out of the base rebar
+        # shape with its placement replaced, the wire is taken as it is
+        start = get_rebar_wire(base.Base.Shape).OrderedVertexes[0].Point
+    return base.MarkNumber, diameter, length, weight, start
+
+
+def get_weight(diameter, length):
+    """returns the weight in kg of a rebar, diameter and length in mm"""
+    # mm to m
+    area = math.pi * (diameter / 1000.0) ** 2 / 4.0
+    return STEEL_DENSITY * area * length / 1000.0
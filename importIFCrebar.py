@@ -26,17 +26,30 @@ https://forum.freecadweb.org/viewtopic.php?f=39&t=35848
 
 Import:
 If a mark number (Position) exists, no new base rebar will be created.
-The existent base rebar which starts on 0, 0, 0 will be used.
+The existent base rebar which starts on 0, 0, 0 will be used. The bar is
+registered onto it by a least-squares fit of their points. If the bar
+does not match, it gets an own base rebar, a variant of the mark.
 It would make sense to create all base rebars in x-y-plain
 
+Re-Import:
+The reinforcements keep the GlobalId of their IfcReinforcingBar and a
+hash of their import data in IfcData. A revised ifc file can be
+re-imported into the document with reimport(). Only changed
+reinforcements and base rebars are created, deleted or updated.
+
 """
 
 __title__ = "FreeCAD rebar IFC importer based on Yorik van Havres IFC importer"
 __author__ = "Bernd Hahnebach"
 __url__ = "http://www.freecadweb.org"
 
+import gc
+import hashlib
+import json
 import os
 
+import numpy as np
+
 import FreeCAD
 from FreeCAD import Vector as vec
 
@@ -48,10 +61,12 @@ from importIFCHelper import getIfcProperties
 from importIFCHelper import getIfcPropertySets
 
 import archadd
+import importIFCrebarCache as rebarcache
+import importIFCrebarHelper as helper
+import importIFCrebarStep
 import lattice2Executer
-import lattice2JoinArrays
 import lattice2LinearArray
-import lattice2Placement
+from archobjects.reinforcement_generic import REINFORCEMENT_TYPES
 
 if FreeCAD.GuiUp:
     import FreeCADGui
@@ -75,25 +90,46 @@ def getPreferences():
     REINFORCEMENT_LATTICE = p.GetBool("ifcReinforcmentType", False)
     # REINFORCEMENT_LATTICE = True
 
+    # reuse the data read on a former import of the same file
+    global IMPORT_CACHE
+    IMPORT_CACHE = p.GetBool("ifcRebarImportCache", True)
+
+    # import the reinforcements in chunks to limit the memory, 0 means off
+    global CHUNK_SIZE, CHUNK_SAVE
+    CHUNK_SIZE = p.GetInt("ifcRebarImportChunkSize", 0)
+    CHUNK_SAVE = p.GetBool("ifcRebarImportChunkSave", False)
+
+    # max root mean square distance in mm between the points of a bar
+    # and the registered base rebar of its mark, else own base rebar
+    global REGISTRATION_TOLERANCE
+    REGISTRATION_TOLERANCE = p.GetFloat("ifcRebarRegistrationTolerance", 1.0)
 
-def open(filename, skip=[], only=[], root=None):
+    # read the ifc file with the memory-mapped STEP reader
+    # instead of parsing the whole file with ifcopenshell
+    global MMAP_READER
+    MMAP_READER = p.GetBool("ifcRebarMmapReader", False)
+
+
+def open(filename, skip=[], only=[], root=None, query=None):
     "opens an IFC file in a new document"
     docname = os.path.splitext(os.path.basename(filename))[0]
     docname = ifcdecode(docname, utf=True)
     doc = FreeCAD.newDocument(docname)
     doc.Label = docname
-    doc = insert(filename, doc.Name, skip, only, root)
+    doc = insert(filename, doc.Name, skip, only, root, query)
     return doc
 
 
-def insert(filename, docname, skip=[], only=[], root=None):
-    """insert(filename,docname,skip=[],only=[],root=None):
+def insert(filename, docname, skip=[], only=[], root=None, query=None):
+    """insert(filename,docname,skip=[],only=[],root=None,query=None):
     imports the contents of an IFC file.
     skip can contain a list of ids of objects to be skipped,
     only can restrict the import to certain object ids
     (will also get their children) and root can be used to
     import only the derivates of a certain element type
-    (default = ifcProduct)."""
+    (default = ifcProduct).
+    query can restrict the import to reinforcements matching filters,
+    see prescan_reinforcements."""
 
     getPreferences()
 
@@ -105,15 +141,6 @@ def insert(filename, docname, skip=[], only=[], root=None):
     # only = [679567]
     # add this modules to the modules to reload on my reload tool
 
-    try:
-        import ifcopenshell
-    except:
-        FreeCAD.Console.PrintError(
-            "IfcOpenShell was not found on this system. "
-            "IFC support is disabled\n"
-        )
-        return
-
     if DEBUG:
         print("Opening ", filename, "...", end="")
     try:
@@ -129,326 +156,1036 @@ def insert(filename, docname, skip=[], only=[], root=None):
     if root:
         ROOT_ELEMENT = root
 
-    from ifcopenshell import geom
-    settings = ifcopenshell.geom.settings()
-    settings.set(settings.USE_BREP_DATA, True)
-    settings.set(settings.SEW_SHELLS, True)
-    settings.set(settings.USE_WORLD_COORDS, True)
-    settings.set(settings.DISABLE_OPENING_SUBTRACTIONS, False)
-    settings.set(settings.INCLUDE_CURVES, True)
-    settings.set(settings.EXCLUDE_SOLIDS_AND_SURFACES, True)
+    filename = ifcdecode(filename, utf=True)
+    # a re-import of the document uses the same query
+    set_import_query(doc, query)
+
+    # on a cache hit ifcopenshell is not used at all
+    bars = None
+    if IMPORT_CACHE is True:
+        cache_key = rebarcache.get_cache_key(
+            filename,
+            get_cache_settings(skip, only, query)
+        )
+        bars = rebarcache.load(cache_key)
+        if bars is not None:
+            print("Import cache used, {} bars read.".format(len(bars)))
+    if bars is None and CHUNK_SIZE > 0:
+        # the cache needs all bars at once, thus not written in chunk mode
+        if import_chunked(doc, filename, skip, only, query) is None:
+            return
+    else:
+        if bars is None:
+            bars = read_reinforcements(filename, skip, only, query)
+            if bars is None:
+                return
+            if IMPORT_CACHE is True:
+                rebarcache.save(cache_key, bars)
+
+        create_reinforcements(doc, bars)
+
+        FreeCAD.ActiveDocument.recompute()
+
+    if FreeCAD.GuiUp:
+        FreeCADGui.activeDocument().activeView().viewAxometric()
+        FreeCADGui.SendMsgToActiveView("ViewFit")
+    return doc
+
+
+def import_chunked(
+    doc,
+    filename,
+    skip=[],
+    only=[],
+    query=None,
+    chunk_size=None,
+    save=None
+):
+    """imports the reinforcements in chunks of chunk_size bars.
+    Each chunk is read, created and recomputed, afterwards its bars and
+    the evaluated placements are released before the next chunk is
+    read. Thus the FreeCAD geometry does not grow with the size of the
+    file. If save is True and the document has a file name it is saved
+    after each chunk. Returns the base rebars or None if the file could
+    not be read.
+
+    With ifcopenshell the whole file stays loaded for the entire run,
+    only the FreeCAD side is bounded. With the memory-mapped reader
+    (MMAP_READER) the parsed entities are released after each chunk
+    too, only the offset index of the file is kept."""
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    if chunk_size < 1:
+        chunk_size = 1
+    if save is None:
+        save = CHUNK_SAVE
+    if save is True and not doc.FileName:
+        FreeCAD.Console.PrintWarning(
+            "Document has no file name, it will not be saved per chunk.\n"
+        )
+        save = False
+
+    ifcfile = open_ifc_file(filename)
+    if ifcfile is None:
+        return
+    length_scale = get_prj_unit_length_scale(ifcfile)
+    print("Length scale = {}\n".format(length_scale))
+    evaluator = helper.PlacementEvaluator(length_scale)
+    # only the ids are kept, the entities are taken chunk by chunk
+    reinforcement_ids = [
+        rebar.id() for rebar in select_reinforcements(
+            ifcfile,
+            skip,
+            only,
+            query,
+            length_scale,
+            evaluator
+        )
+    ]
+    is_step_file = isinstance(ifcfile, importIFCrebarStep.StepFile)
+
+    base_rebars = {}
+    count = len(reinforcement_ids)
+    for start in range(0, count, chunk_size):
+        chunk = reinforcement_ids[start:start + chunk_size]
+        print("Chunk {} to {} of {}".format(
+            start + 1,
+            start + len(chunk),
+            count
+        ))
+        if is_step_file:
+            ifcfile.release()
+        evaluator.clear()
+        bars = []
+        for pid in chunk:
+            rebar = ifcfile.by_id(pid)
+            print("Entity #{}: {}, ".format(
+                pid,
+                rebar.is_a()
+            ), end="", flush=True)
+            bar = read_reinforcement(ifcfile, rebar, length_scale, evaluator)
+            if bar is not None:
+                bars.append(bar)
+        create_reinforcements(doc, bars, base_rebars)
+        doc.recompute()
+        # release the read geometry of this chunk
+        del bars
+        gc.collect()
+        if save is True:
+            doc.save()
+    return base_rebars
+
+
+def get_cache_settings(skip=[], only=[], query=None):
+    """returns the preferences which change the result of an import,
+    together with the file content hash they are the import cache key.
+    The reader is part of it, the memory-mapped reader skips the bars
+    with a Directrix it can not decode."""
+    return {
+        "ifcReinforcmentType": REINFORCEMENT_LATTICE,
+        "ifcRebarMmapReader": MMAP_READER,
+        "skip": sorted(skip),
+        "only": sorted(only),
+        "query": query,
+    }
+
+
+# ************************************************************************
+# read the ifc file
+def read_reinforcements(filename, skip=[], only=[], query=None):
+    """returns a list with one dictionary for each IfcReinforcingBar
+    out of the ifc file, no document object is created
+    query see prescan_reinforcements
+
+    pid : entity id of the IfcReinforcingBar
+    global_id : GlobalId of the IfcReinforcingBar
+    mark : mark number (Allplan Position number)
+    radius : radius in mm
+    ifc_properties : properties as returned by getIfcProperties
+    sweep_path : Part.Shape of the Directrix in mm
+    only_lines : True if the Directrix has no arcs
+    matrices : numpy array (n, 4, 4) global placement of each rebar
+    """
 
     # global ifcfile # keeping global for debugging purposes
-    filename = ifcdecode(filename, utf=True)
-    ifcfile = ifcopenshell.open(filename)
+    ifcfile = open_ifc_file(filename)
+    if ifcfile is None:
+        return
 
     # get the length scale facter from of unit of the ifc file
     length_scale = get_prj_unit_length_scale(ifcfile)
     print("Length scale = {}\n".format(length_scale))
+    # placements are shared between the rebars, they are evaluated once
+    evaluator = helper.PlacementEvaluator(length_scale)
 
-    reinforcements = ifcfile.by_type("IfcReinforcingBar")
-    rebar_objs = []
-    base_rebars = {}  # {rebar_mark_number : rebar_obj}
-    reinforcement_counter = 1
+    reinforcements = select_reinforcements(
+        ifcfile,
+        skip,
+        only,
+        query,
+        length_scale,
+        evaluator
+    )
+    bars = []
 
     # reinforcements
     for pno, rebar in enumerate(reinforcements):
-        pid = rebar.id()
-        ptype = rebar.is_a()
         print("Product {} of {} is Entity #{}: {}, ".format(
             pno + 1,
             len(reinforcements),
-            pid,
-            ptype,
+            rebar.id(),
+            rebar.is_a(),
         ), end="", flush=True)
+        bar = read_reinforcement(ifcfile, rebar, length_scale, evaluator)
+        if bar is not None:
+            bars.append(bar)
+
+    return bars
+
+
+def open_ifc_file(filename):
+    """returns the ifcopenshell file or None,
+    with MMAP_READER a importIFCrebarStep.StepFile"""
+    if MMAP_READER is True:
+        return importIFCrebarStep.open_step_file(filename)
+    try:
+        import ifcopenshell
+    except:
+        FreeCAD.Console.PrintError(
+            "IfcOpenShell was not found on this system. "
+            "IFC support is disabled\n"
+        )
+        return
+    return ifcopenshell.open(filename)
+
+
+def get_geom_settings():
+    """returns the ifcopenshell.geom settings to convert a Directrix"""
+    import ifcopenshell
+    from ifcopenshell import geom
+    settings = ifcopenshell.geom.settings()
+    settings.set(settings.USE_BREP_DATA, True)
+    settings.set(settings.SEW_SHELLS, True)
+    settings.set(settings.USE_WORLD_COORDS, True)
+    settings.set(settings.DISABLE_OPENING_SUBTRACTIONS, False)
+    settings.set(settings.INCLUDE_CURVES, True)
+    settings.set(settings.EXCLUDE_SOLIDS_AND_SURFACES, True)
+    return settings
 
+
+def select_reinforcements(
+    ifcfile,
+    skip=[],
+    only=[],
+    query=None,
+    length_scale=1.0,
+    evaluator=None
+):
+    """returns the IfcReinforcingBar entities to import"""
+    reinforcements = []
+    for rebar in ifcfile.by_type("IfcReinforcingBar"):
+        pid = rebar.id()
         if pid in skip:
-            print(" --> is in skip list, thus skipped", end="\n")
+            print("Entity #{} is in skip list, thus skipped".format(pid))
             continue
         if only and pid not in only:
-            print(
-                " --> only list is no empty and pid "
-                "not in only list, thus skipped",
-                end="\n"
-            )
             continue
+        reinforcements.append(rebar)
+    if query:
+        # select the reinforcements before any geometry is built
+        if evaluator is None:
+            evaluator = helper.PlacementEvaluator(length_scale)
+        reinforcements = prescan_reinforcements(
+            ifcfile,
+            reinforcements,
+            query,
+            length_scale,
+            evaluator
+        )
+    return reinforcements
+
+
+def read_reinforcement(ifcfile, rebar, length_scale, evaluator):
+    """returns the dictionary of one IfcReinforcingBar,
+    see read_reinforcements, or None"""
+    pid = rebar.id()
 
-        # properties, get the mark number
-        # print("")
-        # build list of related property sets
-        psets = getIfcPropertySets(ifcfile, pid)
-        # print(psets)
-        # build dict of properties
-        ifc_properties = {}
-        rebar_mark_number = 0
-        ifc_properties = getIfcProperties(ifcfile, pid, psets, ifc_properties)
-        # print(ifc_properties)
-        # get the mark number (Position number)
-        for key, value in ifc_properties.items():
-            pset, pname, ptype, pvalue = getPropertyData(
-                key, value,
-                {"Debug": True}
+    # properties, get the mark number
+    # print("")
+    # build list of related property sets
+    psets = getIfcPropertySets(ifcfile, pid)
+    # print(psets)
+    # build dict of properties
+    ifc_properties = {}
+    rebar_mark_number = 0
+    ifc_properties = getIfcProperties(ifcfile, pid, psets, ifc_properties)
+    # print(ifc_properties)
+    # get the mark number (Position number)
+    for key, value in ifc_properties.items():
+        pset, pname, ptype, pvalue = getPropertyData(
+            key, value,
+            {"Debug": True}
+        )
+        if (
+            pset == "Allplan_ReinforcingBar"
+            and pname == "Position number"  # need to be Position not Mark!
+        ):
+            rebar_mark_number = pvalue
+    # print(rebar_mark_number)
+    # print("")
+    # to only import certain mark numbers use query, see prescan
+
+    # get the radius and the IfcCurve (Directrix) out of the ifc
+    ifc_shape_representation = rebar.Representation.Representations[0]
+    item_ifc_shape_representation = ifc_shape_representation.Items[0]
+    mapping_source = item_ifc_shape_representation.MappingSource
+    ifc_swept_disk_solid = mapping_source.MappedRepresentation.Items[0]
+    if (
+        not importIFCrebarStep.is_known(ifc_swept_disk_solid)
+        or not ifc_swept_disk_solid.is_a("IfcSweptDiskSolid")
+    ):
+        print(" --> no IfcSweptDiskSolid found, thus skipped", end="\n")
+        return None
+    radius = ifc_swept_disk_solid.Radius * length_scale
+    # print(radius)
+    entity_polyline = ifc_swept_disk_solid.Directrix
+
+    # sweep path
+    # decode the IfcCurve (Directrix) directly and create a Wire
+    # only for not supported curve types the geometry kernel is used
+    sweep_path = None
+    segments = helper.decode_directrix(entity_polyline, length_scale)
+    if segments is not None:
+        sweep_path = helper.make_wire(segments)
+    if sweep_path is None:
+        if isinstance(ifcfile, importIFCrebarStep.StepFile):
+            # the memory-mapped reader has no geometry kernel
+            FreeCAD.Console.PrintError(
+                "Directrix {} of entity #{} is not supported without "
+                "ifcopenshell, thus skipped\n"
+                .format(entity_polyline.is_a(), pid)
             )
-            if (
-                pset == "Allplan_ReinforcingBar"
-                and pname == "Position number"  # need to be Position not Mark!
-            ):
-                rebar_mark_number = pvalue
-        # print(rebar_mark_number)
-        # print("")
-        # for debugging, TODO some Parameter to only import certain mark numbers
-        # if rebar_mark_number != 3:
-        #     continue
-
-        # get the radius and the IfcCurve (Directrix) out of the ifc
-        ifc_shape_representation = rebar.Representation.Representations[0]
-        item_ifc_shape_representation = ifc_shape_representation.Items[0]
-        mapping_source = item_ifc_shape_representation.MappingSource
-        ifc_swept_disk_solid = mapping_source.MappedRepresentation.Items[0]
-        radius = ifc_swept_disk_solid.Radius * length_scale
-        # print(radius)
-        entity_polyline = ifc_swept_disk_solid.Directrix
-
-        # sweep path
-        # get the geometry out of the IfcCurve (Directrix) and create a Wire
-        cr = ifcopenshell.geom.create_shape(settings, entity_polyline)
+            return None
+        import ifcopenshell.geom
+        segments = None
+        cr = ifcopenshell.geom.create_shape(
+            get_geom_settings(),
+            entity_polyline
+        )
         brep = cr.brep_data
         sweep_path = Part.Shape()
         sweep_path.importBrepFromString(brep)
         sweep_path.scale(1000.0)  # IfcOpenShell always outputs in meters
 
-        # does it makes sense to check if the sweep_path and Radius
-        # really are the same if mark number equals (yes, thus TODO)
-        base_placement = FreeCAD.Placement()
-        if rebar_mark_number not in base_rebars:
-            # create a new rebar shape
-            wire = Draft.makeWire(sweep_path.Wires[0])
-            rebar_shape = archadd.BaseRebar(
-                wire,
-                diameter=2*radius,
-                mark=rebar_mark_number,
-                name="BaseRebar_Mark_"+str(rebar_mark_number)
+    # global placement of every rebar, the whole IfcLocalPlacement
+    # tree and the mapping target and origin are taken into account
+    bar_matrices = evaluator.get_mapped_item_matrices(
+        rebar,
+        ifc_shape_representation
+    )
+    if len(bar_matrices) == 0:
+        print(" --> no IfcMappedItem found, thus skipped", end="\n")
+        return None
+    print("read.")
+
+    return {
+        "pid": pid,
+        "global_id": rebar.GlobalId,
+        "mark": rebar_mark_number,
+        "radius": radius,
+        "ifc_properties": ifc_properties,
+        "sweep_path": sweep_path,
+        "only_lines": (
+            segments is None or helper.has_only_lines(segments)
+        ),
+        "matrices": bar_matrices,
+    }
+
+
+def prescan_reinforcements(
+    ifcfile,
+    reinforcements,
+    query,
+    length_scale,
+    evaluator
+):
+    """returns the IfcReinforcingBar out of reinforcements
+    which match all filters of the query dictionary:
+
+    marks : list of mark numbers (Allplan Position number)
+    diameter : (min, max) diameter range in mm, None for open end
+    container : list of Name or GlobalId of a storey or host element
+        the reinforcement is contained in or is a part of
+    region : ((xmin, ymin, zmin), (xmax, ymax, zmax)) axis aligned box
+        in mm, a reinforcement matches if one rebar intersects the box
+
+    Only attributes are read, no geometry is built. The mark numbers
+    and containers are collected in one pass over the relations.
+    """
+    marks = query.get("marks")
+    diameter = query.get("diameter")
+    container = query.get("container")
+    region = query.get("region")
+
+    mark_numbers = {}
+    if marks is not None:
+        mark_numbers = get_mark_numbers(ifcfile)
+    containers = {}
+    if container is not None:
+        containers = get_containers(ifcfile)
+        container = set(container)
+    if region is not None:
+        region = np.array(region, dtype=float)
+
+    selected = []
+    for rebar in reinforcements:
+        pid = rebar.id()
+        if marks is not None and mark_numbers.get(pid, 0) not in marks:
+            continue
+        try:
+            ifc_shape_representation = rebar.Representation.Representations[0]
+            mapping_source = ifc_shape_representation.Items[0].MappingSource
+            swept_disk = mapping_source.MappedRepresentation.Items[0]
+        except (AttributeError, IndexError):
+            continue
+        if (
+            not importIFCrebarStep.is_known(swept_disk)
+            or not swept_disk.is_a("IfcSweptDiskSolid")
+        ):
+            # the attributes of an unknown type would all be None
+            continue
+        if diameter is not None:
+            dia = 2 * swept_disk.Radius * length_scale
+            if (
+                (diameter[0] is not None and dia < diameter[0])
+                or (diameter[1] is not None and dia > diameter[1])
+            ):
+                continue
+        if container is not None:
+            if not container & containers.get(pid, set()):
+                continue
+        if region is not None:
+            matrices = evaluator.get_mapped_item_matrices(
+                rebar,
+                ifc_shape_representation
+            )
+            segments = helper.decode_directrix(
+                swept_disk.Directrix,
+                length_scale
             )
-            rebar_shape.IfcProperties = ifc_properties
-            print("based on: {}, ".format(wire.Name), end="")
-            rebar_objs.append(rebar_shape)
-            base_rebars[rebar_mark_number] = rebar_shape
+            if segments is not None:
+                pts = helper.get_points(segments)
+            else:
+                # not supported curve, only the rebar origins are checked
+                pts = np.zeros((1, 3))
+            if not helper.bars_intersect_box(matrices, pts, region):
+                continue
+        selected.append(rebar)
+
+    print(
+        "Query selected {} of {} reinforcements.\n"
+        .format(len(selected), len(reinforcements))
+    )
+    return selected
+
+
+def get_mark_numbers(ifcfile):
+    """returns {entity_id: mark_number} of all products
+    with an Allplan_ReinforcingBar property set, one pass over
+    all IfcRelDefinesByProperties"""
+    mark_numbers = {}
+    for rel in ifcfile.by_type("IfcRelDefinesByProperties"):
+        pset = rel.RelatingPropertyDefinition
+        if (
+            not pset.is_a("IfcPropertySet")
+            or pset.Name != "Allplan_ReinforcingBar"
+        ):
+            continue
+        mark = None
+        for prop in pset.HasProperties:
+            if (
+                prop.is_a("IfcPropertySingleValue")
+                and prop.Name == "Position number"
+                and prop.NominalValue is not None
+            ):
+                mark = prop.NominalValue.wrappedValue
+        if mark is None:
+            continue
+        for obj in rel.RelatedObjects:
+            mark_numbers[obj.id()] = mark
+    return mark_numbers
+
+
+def get_containers(ifcfile):
+    """returns {entity_id: set of Name and GlobalId} of all spatial
+    structures and elements an element is contained in or is part of"""
+    parents = {}  # {entity_id: [parent entities]}
+    # parents of a type the memory-mapped reader does not know have
+    # no GlobalId and no Name, they are left out
+    for rel in ifcfile.by_type("IfcRelContainedInSpatialStructure"):
+        if not importIFCrebarStep.is_known(rel.RelatingStructure):
+            continue
+        for obj in rel.RelatedElements:
+            parents.setdefault(obj.id(), []).append(rel.RelatingStructure)
+    for rel in ifcfile.by_type("IfcRelAggregates"):
+        if not importIFCrebarStep.is_known(rel.RelatingObject):
+            continue
+        for obj in rel.RelatedObjects:
+            parents.setdefault(obj.id(), []).append(rel.RelatingObject)
+
+    containers = {}
+
+    def collect(eid, seen):
+        # the relations build a tree, seen only guards broken files
+        if eid in containers:
+            return containers[eid]
+        found = set()
+        for parent in parents.get(eid, []):
+            if parent.id() in seen:
+                continue
+            found.add(parent.GlobalId)
+            if parent.Name:
+                found.add(parent.Name)
+            found |= collect(parent.id(), seen | {parent.id()})
+        containers[eid] = found
+        return found
+
+    for eid in list(parents.keys()):
+        collect(eid, {eid})
+    return containers
+
+
+# ************************************************************************
+# create the document objects
+def create_reinforcements(doc, bars, base_rebars=None):
+    """creates base rebars and reinforcements out of the bars
+    returned by read_reinforcements, returns the base_rebars
+    base_rebars : {rebar_mark_number : rebar_obj} already existing ones
+    """
+    if base_rebars is None:
+        base_rebars = {}
+    # the bars of one mark are registered to its base rebar at once
+    registrations = register_bars(bars, base_rebars)
+    for bno, bar in enumerate(bars):
+        print("Bar {} of {} is Entity #{}, ".format(
+            bno + 1,
+            len(bars),
+            bar["pid"],
+        ), end="", flush=True)
+        create_reinforcement(doc, bar, base_rebars, registrations[bno])
+    return base_rebars
+
+
+def create_reinforcement(doc, bar, base_rebars, registration=None):
+    """creates the reinforcement of one bar returned by
+    read_reinforcements, the base rebar is created if its mark
+    is not yet in base_rebars or the bar does not match the
+    base rebar of its mark, returns the reinforcement obj
+    registration : (matrix, residual) of the bar onto the base rebar
+    of its mark, see register_bars, computed if None"""
+
+    pid = bar["pid"]
+
+    rebar_shape, base_placement = find_base_rebar(
+        bar,
+        base_rebars,
+        registration
+    )
+    if rebar_shape is None:
+        rebar_shape = make_base_rebar(doc, bar, base_rebars)
+        base_placement = FreeCAD.Placement()
+    else:
+        print("based on: {}, ".format(rebar_shape.Base.Name), end="")
+
+    # reinforcement made out of the imported rebar
+    bar_matrices = bar["matrices"]
+    bar_placements = [
+        helper.matrix_to_placement(m) for m in bar_matrices
+    ]
+    vec_base_rebar = [pl.Base for pl in bar_placements]
+    # print("\n{}".format(vec_base_rebar))
+    has_common_rotation = helper.has_common_rotation(bar_matrices)
+
+    # check if we have a linear reinforcement
+    is_linear_reinforcement = False
+    space_one = 0
+    if len(vec_base_rebar) > 1 and has_common_rotation is True:
+        # edge from first point to last point
+        ed = Part.Edge(Part.LineSegment(
+            vec_base_rebar[0],
+            vec_base_rebar[-1])
+        )
+        # spacing between first and second point
+        space_one = vec_base_rebar[1] - vec_base_rebar[0]
+        for i, co_vec in enumerate(vec_base_rebar):
+            # check distance point to edge
+            dist = ed.distToShape(Part.Vertex(co_vec))[0]
+            if dist > 2:
+                # 2 mm, much better would be some dimensionless value
+                break
+            # check spaceing, if they are constant
+            if i > 0:
+                space_i = vec_base_rebar[i] - vec_base_rebar[i-1]
+                difference_length = (space_one - space_i).Length
+                if difference_length > 2:
+                    # 2 mm, much better would be some dimensionless value
+                    break
         else:
-            # get the relative placement between
-            # the base wire (the one in base_rebars already)
-            # the sweep_path
-            base_wire_obj = base_rebars[rebar_mark_number].Base
-            print("based on: {}, ".format(base_wire_obj.Name), end="")
-            base_placement = get_relative_placement(
-                base_wire_obj.Shape,
-                sweep_path
+            is_linear_reinforcement = True
+
+    # get placement for first reinforcement bar
+    firstbar_pl = bar_placements[0]
+    # rotation shared by all rebars if has_common_rotation
+    firstbar_rot = FreeCAD.Placement(vec(0, 0, 0), firstbar_pl.Rotation)
+
+    marker_size = 25
+    lattice_placement = None
+    reinforcement = None
+    if (
+        REINFORCEMENT_LATTICE is True
+        and is_linear_reinforcement is True
+    ):
+        # linear lattice reinforcement
+        print("reinforcement: linear lattice")
+        # print(len(vec_base_rebar))
+        # print(space_one)
+        space_length = space_one.Length
+        la = lattice2LinearArray.makeLinearArray(name="LinearArray")
+        # SpanN ... put in Count
+        # Step will be calculated
+        # SpanStep ... put in Step (space between rebars)
+        # Count will be calculated
+        la.GeneratorMode = "SpanStep"
+        # https://forum.freecadweb.org/viewtopic.php?f=22&t=37657#p320586
+        la.Alignment = "Justify"
+        la.SpanEnd = (len(vec_base_rebar) - 1) * space_length
+        la.Step = space_length
+        la.MarkerSize = marker_size
+        # direction of linear lattice2 placement
+        # in the coordinate system of the first bar
+        la.Dir = firstbar_pl.Rotation.inverted().multVec(space_one)
+        # do not change the orientation of the little planes
+        # https://forum.freecadweb.org/viewtopic.php?f=22&t=37893&p=322427#p322421
+        la.OrientMode = "None"
+        lattice2Executer.executeFeature(la)
+        la.Placement = firstbar_pl
+        if la.Count != len(vec_base_rebar):
+            print(
+                "Problem: {} != {}"
+                .format(la.Count, len(vec_base_rebar))
             )
-            # print(base_placement)
-
-        # reinforcement made out of the imported rebar
-        # coord placements
-        vec_base_rebar = []
-        for ifc_mapped_item in ifc_shape_representation.Items:
-            ifc_cartesian_point = ifc_mapped_item.MappingTarget.LocalOrigin
-            coord = ifc_cartesian_point.Coordinates
-            co_vec = vec(
-                coord[0] * length_scale,
-                coord[1] * length_scale,
-                coord[2] * length_scale
+        lattice_placement = la
+    elif (
+        REINFORCEMENT_LATTICE is True
+        and is_linear_reinforcement is False
+    ):
+        # one lattice placement array holding the placements of all
+        # rebars of this reinforcement, relative to the first rebar
+        print("reinforcement: custom lattice")
+        firstbar_inv = firstbar_pl.inverse()
+        cpa = archadd.PlacementArray(
+            [firstbar_inv.multiply(bar_pl) for bar_pl in bar_placements],
+            marker_size=marker_size,
+            name="CustomPlacementArray"
+        )
+        lattice2Executer.executeFeature(cpa)
+        cpa.Placement = firstbar_pl
+        lattice_placement = cpa
+
+    if lattice_placement is not None:
+        # lattice2 reinforcement
+        reinforcement = archadd.ReinforcementLattice(
+            rebar_shape,
+            lattice_placement,
+            base_placement,
+            name="ReinforcementLattice_"+str(pid)
+        )
+
+    if (
+        REINFORCEMENT_LATTICE is False
+        and is_linear_reinforcement is True
+    ):
+        # linear reinforcement
+        print("reinforcement: linear std")
+        if space_one == 0:
+            # TODO handle a reinforcement with one rebar
+            # this should not be a linear reinforcement
+            return None
+        amount = len(vec_base_rebar)
+        spacing = space_one.Length
+        # distance = (len(vec_base_rebar) - 1) * spacing
+
+        reinforcement = archadd.ReinforcementLinear(
+            rebar_shape,
+            amount=amount,
+            spacing=spacing,
+            direction=space_one,
+            base_placement=firstbar_pl.multiply(base_placement),
+            name="ReinforcementLinear_"+str(pid)
+        )
+    elif (
+        REINFORCEMENT_LATTICE is False
+        and is_linear_reinforcement is False
+        and has_common_rotation is False
+    ):
+        # the rebars are rotated against each other
+        # a vertex can not hold a rotation, thus generic reinforcement
+        print("reinforcement: generic std")
+        reinforcement = archadd.ReinforcementGeneric(
+            rebar_shape,
+            placements=bar_placements,
+            base_placement=base_placement,
+            name="ReinforcementGeneric_"+str(pid)
+        )
+    elif (
+        REINFORCEMENT_LATTICE is False
+        and is_linear_reinforcement is False
+    ):
+        # individual reinforcement
+        print("reinforcement: individual std")
+        individuals = []
+        for v_vec in vec_base_rebar:
+            v = doc.addObject("Part::Vertex", "Vertex1")
+            v.X, v.Y, v.Z = v_vec.x, v_vec.y, v_vec.z,
+            v.ViewObject.PointColor = (1.0, 0.7, 0.0, 0.0)
+            v.ViewObject.PointSize = 15
+            individuals.append(v)
+        reinforcement = archadd.ReinforcementIndividual(
+            rebar_shape,
+            individuals=individuals,
+            base_placement=firstbar_rot.multiply(base_placement),
+            name="ReinforcementIndividual_"+str(pid)
+        )
+
+    if reinforcement is not None:
+        # needed to find the reinforcement again on a re-import
+        set_ifc_data(reinforcement, "IfcUID", bar["global_id"])
+        set_ifc_data(reinforcement, "RebarImportHash", get_bar_fingerprint(bar))
+    return reinforcement
+
+
+def make_base_rebar(doc, bar, base_rebars):
+    """creates the base rebar of bar and adds it to base_rebars,
+    a bar which does not match the base rebar of its mark gets
+    a variant base rebar with the key (mark, variant number)"""
+    rebar_mark_number = bar["mark"]
+    sweep_path = bar["sweep_path"]
+    name = "BaseRebar_Mark_" + str(rebar_mark_number)
+    key = rebar_mark_number
+    variant = 0
+    if rebar_mark_number in base_rebars:
+        variant = 1
+        while (rebar_mark_number, variant) in base_rebars:
+            variant += 1
+        key = (rebar_mark_number, variant)
+        name += "_" + str(variant)
+        FreeCAD.Console.PrintWarning(
+            "Entity #{} does not match the base rebar of mark {}, "
+            "an own base rebar is created.\n"
+            .format(bar["pid"], rebar_mark_number)
+        )
+    if bar["only_lines"] is True:
+        wire = Draft.makeWire(sweep_path.Wires[0])
+    else:
+        # a Draft Wire would replace the arcs by straight lines
+        wire = doc.addObject("Part::Feature", "Wire")
+        wire.Shape = sweep_path
+    rebar_shape = archadd.BaseRebar(
+        wire,
+        diameter=2*bar["radius"],
+        mark=rebar_mark_number,
+        name=name
+    )
+    rebar_shape.IfcProperties = bar["ifc_properties"]
+    set_ifc_data(rebar_shape, "RebarImportHash", get_base_fingerprint(bar))
+    if variant > 0:
+        set_ifc_data(rebar_shape, "RebarImportVariant", variant)
+    print("based on: {}, ".format(wire.Name), end="")
+    base_rebars[key] = rebar_shape
+    return rebar_shape
+
+
+def find_base_rebar(bar, base_rebars, registration=None):
+    """returns the base rebar out of base_rebars bar matches and the
+    placement moving the base wire onto the sweep path of bar,
+    (None, None) if there is no matching one. The base rebar of the
+    mark is tried first, the variants afterwards."""
+    mark = bar["mark"]
+    candidates = []
+    if mark in base_rebars:
+        candidates.append((base_rebars[mark], registration))
+    variant = 1
+    while (mark, variant) in base_rebars:
+        candidates.append((base_rebars[(mark, variant)], None))
+        variant += 1
+    for base_obj, reg in candidates:
+        if abs(base_obj.Diameter.Value - 2 * bar["radius"]) > 1e-3:
+            continue
+        if reg is None:
+            matrices, residuals = helper.register_points(
+                helper.get_wire_points(base_obj.Base.Shape),
+                [helper.get_wire_points(bar["sweep_path"])]
             )
-            vec_base_rebar.append(co_vec)
-        # print("\n{}".format(vec_base_rebar))
-
-        # check if we have a linear reinforcement
-        is_linear_reinforcement = False
-        space_one = 0
-        if len(vec_base_rebar) > 1:
-            # edge from first point to last point
-            ed = Part.Edge(Part.LineSegment(
-                vec_base_rebar[0],
-                vec_base_rebar[-1])
+            reg = (matrices[0], residuals[0])
+        matrix, residual = reg
+        if residual <= REGISTRATION_TOLERANCE:
+            return base_obj, helper.matrix_to_placement(matrix)
+    return None, None
+
+
+def register_bars(bars, base_rebars):
+    """returns for each bar the registration (matrix, residual) of its
+    sweep path onto the base rebar of its mark, see
+    helper.register_points. All bars of a mark are registered at
+    once. Without a base rebar the first bar of the mark is used,
+    it will define the base rebar."""
+    marks = {}  # {rebar_mark_number: [bar index]}
+    for i, bar in enumerate(bars):
+        marks.setdefault(bar["mark"], []).append(i)
+    registrations = [None] * len(bars)
+    for mark, indices in marks.items():
+        if mark in base_rebars:
+            source = helper.get_wire_points(base_rebars[mark].Base.Shape)
+        else:
+            source = helper.get_wire_points(bars[indices[0]]["sweep_path"])
+        # bars with another point count can not match, they are
+        # grouped to have stackable point arrays
+        groups = {}
+        for i in indices:
+            points = helper.get_wire_points(bars[i]["sweep_path"])
+            groups.setdefault(len(points), []).append((i, points))
+        for group in groups.values():
+            matrices, residuals = helper.register_points(
+                source,
+                [points for i, points in group]
             )
-            # spacing between first and second point
-            space_one = vec_base_rebar[1] - vec_base_rebar[0]
-            for i, co_vec in enumerate(vec_base_rebar):
-                # check distance point to edge
-                dist = ed.distToShape(Part.Vertex(co_vec))[0]
-                if dist > 2:
-                    # 2 mm, much better would be some dimensionless value
-                    break
-                # check spaceing, if they are constant
-                if i > 0:
-                    space_i = vec_base_rebar[i] - vec_base_rebar[i-1]
-                    difference_length = (space_one - space_i).Length
-                    if difference_length > 2:
-                        # 2 mm, much better would be some dimensionless value
-                        break
-            else:
-                is_linear_reinforcement = True
-
-        # get placement for first reinforcement bar
-        relplacement_firstbar = rebar.ObjectPlacement.RelativePlacement
-        coord_firstbar = relplacement_firstbar.Location.Coordinates
-        vec_firstbar = vec(
-            coord_firstbar[0] * length_scale,
-            coord_firstbar[1] * length_scale,
-            coord_firstbar[2] * length_scale
+            for (i, points), matrix, residual in zip(
+                group,
+                matrices,
+                residuals
+            ):
+                registrations[i] = (matrix, residual)
+    return registrations
+
+
+# ************************************************************************
+# re-import of a revised ifc file
+def reimport(filename, docname, skip=[], only=[], query=None):
+    """reimport(filename, docname, [skip], [only], [query]):
+    updates a document made by a former import with a revised ifc file.
+    The reinforcements are identified by the GlobalId of their
+    IfcReinforcingBar, the base rebars by their mark number. Only
+    reinforcements and base rebars which have changed are created,
+    deleted or updated. All other objects are kept as they are, base
+    rebars made by the user are never updated or deleted.
+    Without query the query of the former import is used, thus the
+    bars left out by it are left out again."""
+
+    getPreferences()
+    try:
+        doc = FreeCAD.getDocument(docname)
+    except:
+        FreeCAD.Console.PrintError(
+            "Document {} not found. Aborting\n".format(docname)
         )
-        firstbar_pl = FreeCAD.Placement(
-            vec_firstbar,
-            FreeCAD.Rotation(vec(0, 0, 1), 0),
-            vec(0, 0, 0)
+        return
+    FreeCAD.ActiveDocument = doc
+    filename = ifcdecode(filename, utf=True)
+    if query is None:
+        query = get_import_query(doc)
+    set_import_query(doc, query)
+
+    bars = None
+    if IMPORT_CACHE is True:
+        cache_key = rebarcache.get_cache_key(
+            filename,
+            get_cache_settings(skip, only, query)
         )
+        bars = rebarcache.load(cache_key)
+    if bars is None:
+        bars = read_reinforcements(filename, skip, only, query)
+        if bars is None:
+            return
+        if IMPORT_CACHE is True:
+            rebarcache.save(cache_key, bars)
 
-        marker_size = 25
-        lattice_placement = None
-        if (
-            REINFORCEMENT_LATTICE is True
-            and is_linear_reinforcement is True
-        ):
-            # linear lattice reinforcement
-            print("reinforcement: linear lattice")
-            # print(len(vec_base_rebar))
-            # print(space_one)
-            space_length = space_one.Length
-            la = lattice2LinearArray.makeLinearArray(name="LinearArray")
-            # SpanN ... put in Count
-            # Step will be calculated
-            # SpanStep ... put in Step (space between rebars)
-            # Count will be calculated
-            la.GeneratorMode = "SpanStep"
-            # https://forum.freecadweb.org/viewtopic.php?f=22&t=37657#p320586
-            la.Alignment = "Justify"
-            la.SpanEnd = (len(vec_base_rebar) - 1) * space_length
-            la.Step = space_length
-            la.MarkerSize = marker_size
-            # direction of linear lattice2 placement
-            la.Dir = space_one
-            # do not change the orientation of the little planes
-            # https://forum.freecadweb.org/viewtopic.php?f=22&t=37893&p=322427#p322421
-            la.OrientMode = "None"
-            lattice2Executer.executeFeature(la)
-            la.Placement = firstbar_pl
-            if la.Count != len(vec_base_rebar):
-                print(
-                    "Problem: {} != {}"
-                    .format(la.Count, len(vec_base_rebar))
+    # objects of the former import
+    base_rebars = {}  # {rebar_mark_number : rebar_obj}
+    reinforcements = {}  # {global_id : reinforcement_obj}
+    for o in doc.Objects:
+        if Draft.getType(o) == "RebarShape":
+            if not hasattr(o, "IfcData") or "RebarImportHash" not in o.IfcData:
+                # made by the user, not by an import, keep it as it is
+                continue
+            if "RebarImportVariant" in o.IfcData:
+                # bars which did not match the base rebar of their mark
+                key = (o.MarkNumber, int(o.IfcData["RebarImportVariant"]))
+            else:
+                key = o.MarkNumber
+            if key in base_rebars:
+                FreeCAD.Console.PrintWarning(
+                    "Base rebars {} and {} have the same mark number {}, "
+                    "{} is not updated by the re-import.\n".format(
+                        base_rebars[key].Label, o.Label, o.MarkNumber, o.Label
+                    )
                 )
-            lattice_placement = la
+                continue
+            base_rebars[key] = o
         elif (
-            REINFORCEMENT_LATTICE is True
-            and is_linear_reinforcement is False
+            Draft.getType(o) in REINFORCEMENT_TYPES
+            and hasattr(o, "IfcData")
+            and "IfcUID" in o.IfcData
         ):
-            # custom lattice placement for every rebar of this reinforcement
-            print("reinforcement: custom lattice")
-            custom_pls = []
-            for co_vec in vec_base_rebar:
-                custom_pl = lattice2Placement.makeLatticePlacement(
-                    name=str(ifc_cartesian_point.id())
-                )
-                custom_pl.PlacementChoice = "Custom"
-                custom_pl.MarkerSize = marker_size
-                lattice2Executer.executeFeature(custom_pl)
-                custom_pl.Placement = FreeCAD.Placement(
-                    co_vec,
-                    FreeCAD.Rotation(vec(0, 0, 1), 0),
-                    vec(0, 0, 0)
-                )
-                custom_pls.append(custom_pl)
+            reinforcements[o.IfcData["IfcUID"]] = o
 
-                # lattice array placement from custom lattice placements
-                cpa = lattice2JoinArrays.makeJoinArrays(
-                    name="CustomPlacementArray"
-                )
-                cpa.Links = custom_pls
-                cpa.MarkerSize = marker_size
-                lattice2Executer.executeFeature(cpa)
-                cpa.Placement = firstbar_pl
-                lattice_placement = cpa
-                if FreeCAD.GuiUp:
-                    for child in cpa.ViewObject.Proxy.claimChildren():
-                        child.ViewObject.hide()
-
-        if lattice_placement is not None:
-            # lattice2 reinforcement
-            archadd.ReinforcementLattice(
-                rebar_shape,
-                lattice_placement,
-                base_placement,
-                # name="Reinforcement_"+str(reinforcement_counter)
-                name="ReinforcementLattice_"+str(pid)
-            )
-
-        if (
-            REINFORCEMENT_LATTICE is False
-            and is_linear_reinforcement is True
+    # base rebars, a base rebar is kept as long as one bar of its mark
+    # still matches it, the same registration create_reinforcement uses,
+    # thus the order of the bars in the file does not matter
+    changed_marks = set()
+    new_marks = {}  # {rebar_mark_number : [bar]}
+    for bar in bars:
+        new_marks.setdefault(bar["mark"], []).append(bar)
+    for mark, mark_bars in new_marks.items():
+        if mark not in base_rebars:
+            continue
+        base_obj = base_rebars[mark]
+        mark_base = {mark: base_obj}
+        registrations = register_bars(mark_bars, mark_base)
+        if any(
+            find_base_rebar(bar, mark_base, registration)[0] is not None
+            for bar, registration in zip(mark_bars, registrations)
         ):
-            # linear reinforcement
-            print("reinforcement: linear std")
-            if space_one == 0:
-                # TODO handle a reinforcement with one rebar
-                # this should not be a linear reinforcement
+            continue
+        # the base changed, all its reinforcements will be recreated
+        # because the BasePlacement is relative to the base wire
+        print("Base rebar of mark {} changed.".format(mark))
+        update_base_rebar(doc, base_obj, mark_bars[0])
+        changed_marks.add(mark)
+
+    # reinforcements
+    to_create = []
+    kept = 0
+    for bar in bars:
+        old = reinforcements.pop(bar["global_id"], None)
+        if old is not None:
+            if (
+                bar["mark"] not in changed_marks
+                and old.BaseRebar is not None
+                and old.BaseRebar.MarkNumber == bar["mark"]
+                and old.IfcData.get("RebarImportHash")
+                == get_bar_fingerprint(bar)
+            ):
+                kept += 1
                 continue
-            amount = len(vec_base_rebar)
-            spacing = space_one.Length
-            # distance = (len(vec_base_rebar) - 1) * spacing
-
-            archadd.ReinforcementLinear(
-                rebar_shape,
-                amount=amount,
-                spacing=spacing,
-                direction=space_one,
-                base_placement=firstbar_pl.multiply(base_placement),
-                # name="Reinforcement_"+str(reinforcement_counter)
-                name="ReinforcementLinear_"+str(pid)
-            )
-        elif (
-            REINFORCEMENT_LATTICE is False
-            and is_linear_reinforcement is False
-        ):
-            # individual reinforcement
-            print("reinforcement: individual std")
-            individuals = []
-            for co in vec_base_rebar:
-                v_placement_lok = FreeCAD.Placement(co, FreeCAD.Rotation())
-                v_placement_glob = v_placement_lok.multiply(firstbar_pl)
-                v = doc.addObject("Part::Vertex", "Vertex1")
-                v_vec = v_placement_glob.Base
-                v.X, v.Y, v.Z = v_vec.x, v_vec.y, v_vec.z,
-                v.ViewObject.PointColor = (1.0, 0.7, 0.0, 0.0)
-                v.ViewObject.PointSize = 15
-                individuals.append(v)
-            archadd.ReinforcementIndividual(
-                rebar_shape,
-                individuals=individuals,
-                base_placement=base_placement,
-                name="ReinforcementIndividual_"+str(pid)
-            )
+            remove_reinforcement(doc, old)
+        to_create.append(bar)
 
-        reinforcement_counter += 1
-        # print("")
+    # reinforcements not in the revised file anymore
+    for old in reinforcements.values():
+        remove_reinforcement(doc, old)
+    print(
+        "Re-import: {} kept, {} created or updated, {} deleted."
+        .format(kept, len(to_create), len(reinforcements))
+    )
 
-    FreeCAD.ActiveDocument.recompute()
-    # End reinforcements loop
+    create_reinforcements(doc, to_create, base_rebars)
 
-    if FreeCAD.GuiUp:
-        FreeCADGui.activeDocument().activeView().viewAxometric()
-        FreeCADGui.SendMsgToActiveView("ViewFit")
+    # imported base rebars without any reinforcement, base rebars
+    # still used by a reinforcement of the user are kept
+    used_marks = set(new_marks.keys())
+    for mark, base_obj in base_rebars.items():
+        if base_obj.InList:
+            continue
+        if isinstance(mark, tuple) or mark not in used_marks:
+            base_wire = base_obj.Base
+            doc.removeObject(base_obj.Name)
+            if base_wire is not None and not base_wire.InList:
+                doc.removeObject(base_wire.Name)
+
+    # only the touched objects are recomputed
+    doc.recompute()
     return doc
 
 
-# helper
-def get_relative_placement(shape1, shape2):
-    """returns the placement that must be
-    applied to shape1 to move it to shape_2"""
-    # https://forum.freecadweb.org/viewtopic.php?f=22&t=44880
-    # Assuming that the first 3 vertices of the shape
-    # correctly define a plane (not coincident, nor colinear)
-    plane1 = Part.Plane(*[v.Point for v in shape1.Vertexes[0:3]])
-    plane2 = Part.Plane(*[v.Point for v in shape2.Vertexes[0:3]])
-    pl1 = FreeCAD.Placement(plane1.Position, plane1.Rotation)
-    pl2 = FreeCAD.Placement(plane2.Position, plane2.Rotation)
-    return pl2.multiply(pl1.inverse())
+def update_base_rebar(doc, base_obj, bar):
+    """sets the wire and the diameter of bar on the base rebar base_obj"""
+    old_wire = base_obj.Base
+    if bar["only_lines"] is True:
+        wire = Draft.makeWire(bar["sweep_path"].Wires[0])
+    else:
+        wire = doc.addObject("Part::Feature", "Wire")
+        wire.Shape = bar["sweep_path"]
+    if FreeCAD.GuiUp:
+        wire.ViewObject.hide()
+    base_obj.Base = wire
+    base_obj.Diameter = 2 * bar["radius"]
+    base_obj.IfcProperties = bar["ifc_properties"]
+    set_ifc_data(base_obj, "RebarImportHash", get_base_fingerprint(bar))
+    if old_wire is not None and not old_wire.InList:
+        doc.removeObject(old_wire.Name)
+
+
+def remove_reinforcement(doc, obj):
+    """removes a reinforcement and the objects only it uses"""
+    children = []
+    if hasattr(obj, "Individuals"):
+        children += obj.Individuals
+    if hasattr(obj, "LatticePlacement") and obj.LatticePlacement:
+        children.append(obj.LatticePlacement)
+    base_rebar = obj.BaseRebar
+    doc.removeObject(obj.Name)
+    for child in children:
+        if not child.InList:
+            doc.removeObject(child.Name)
+    if base_rebar is not None:
+        # mark base_rebar obj to make it release its child
+        base_rebar.touch()
+
+
+def get_base_fingerprint(bar):
+    """returns a hash of what defines the base rebar of bar"""
+    sha = hashlib.sha1()
+    sha.update(repr(round(bar["radius"], 3)).encode("utf-8"))
+    for v in bar["sweep_path"].Vertexes:
+        sha.update(
+            (np.round([v.X, v.Y, v.Z], 3) + 0.0).tobytes()
+        )
+    return sha.hexdigest()
+
+
+def get_bar_fingerprint(bar):
+    """returns a hash of everything which defines the reinforcement of bar"""
+    sha = hashlib.sha1()
+    sha.update(repr(bar["mark"]).encode("utf-8"))
+    sha.update(get_base_fingerprint(bar).encode("utf-8"))
+    # rounding, a revised export may differ in the last digits
+    # + 0.0 makes -0.0 to 0.0
+    sha.update((np.round(bar["matrices"], 4) + 0.0).tobytes())
+    return sha.hexdigest()
+
+
+def set_import_query(doc, query):
+    """saves the query of an import in the document, see reimport"""
+    meta = doc.Meta
+    meta["RebarImportQuery"] = json.dumps(query, sort_keys=True)
+    doc.Meta = meta
+
+
+def get_import_query(doc):
+    """returns the query saved by set_import_query or None"""
+    query = doc.Meta.get("RebarImportQuery")
+    if not query:
+        return None
+    return json.loads(query)
+
+
+def set_ifc_data(obj, key, value):
+    """sets a value in the IfcData map of an ArchComponent obj"""
+    if not hasattr(obj, "IfcData"):
+        return
+    ifc_data = obj.IfcData
+    ifc_data[key] = str(value)
+    obj.IfcData = ifc_data
 
 
 def get_prj_unit_length_scale(ifcfile):
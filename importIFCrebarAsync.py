@@ -0,0 +1,286 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Non-blocking rebar IFC import.
+
+The ifc file is read on a worker thread. The bars are put into a queue
+and the document objects are created in batches from the Qt event loop.
+A progress dialog shows the bars per second and the estimated time left.
+On cancel the reading stops and the objects already created are kept.
+
+Start it with insert_async(filename, docname).
+
+"""
+
+__title__ = "FreeCAD rebar IFC importer, non-blocking GUI import"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import queue
+import threading
+import time
+
+import FreeCAD
+
+import importIFCrebar
+import importIFCrebarCache as rebarcache
+import importIFCrebarHelper as helper
+from importIFCHelper import decode as ifcdecode
+
+if FreeCAD.GuiUp:
+    import FreeCADGui
+    from PySide import QtCore
+    from PySide import QtGui
+
+
+# keep a reference of running imports, otherwise they are garbage collected
+_running_imports = []
+
+
+def insert_async(
+    filename,
+    docname,
+    skip=[],
+    only=[],
+    query=None,
+    batch_size=50
+):
+    """insert_async(filename, docname, [skip], [only], [query], [batch_size]):
+    imports the reinforcements of an IFC file without blocking the GUI.
+    Without GUI importIFCrebar.insert is used."""
+    if not FreeCAD.GuiUp:
+        return importIFCrebar.insert(
+            filename,
+            docname,
+            skip,
+            only,
+            query=query
+        )
+    imp = AsyncImport(filename, docname, skip, only, query, batch_size)
+    _running_imports.append(imp)
+    imp.start()
+    return imp
+
+
+class AsyncImport(object):
+    """
+    Reads the ifc file on a worker thread and creates the document
+    objects on the GUI thread, batch_size bars on each timer event.
+    """
+
+    def __init__(
+        self,
+        filename,
+        docname,
+        skip=[],
+        only=[],
+        query=None,
+        batch_size=50
+    ):
+        self.filename = ifcdecode(filename, utf=True)
+        self.docname = docname
+        self.skip = skip
+        self.only = only
+        self.query = query
+        self.batch_size = batch_size
+
+        self.bars = queue.Queue()
+        self.cancelled = threading.Event()
+        self.reading_done = threading.Event()
+        self.total = None  # known after the selection on the worker
+        self.created = 0
+        self.start_time = None
+        self.error = None
+        self.doc = None
+        self.base_rebars = {}
+
+    def start(self):
+        importIFCrebar.getPreferences()
+        try:
+            self.doc = FreeCAD.getDocument(self.docname)
+        except:
+            self.doc = FreeCAD.newDocument(self.docname)
+        FreeCAD.ActiveDocument = self.doc
+        # a re-import of the document uses the same query
+        importIFCrebar.set_import_query(self.doc, self.query)
+
+        self.dialog = QtGui.QProgressDialog(
+            "Reading {} ...".format(self.filename),
+            "Cancel",
+            0,
+            0,
+            FreeCADGui.getMainWindow()
+        )
+        self.dialog.setWindowTitle("Rebar IFC import")
+        self.dialog.setMinimumDuration(0)
+        self.dialog.canceled.connect(self.cancel)
+        self.dialog.show()
+
+        self.start_time = time.time()
+        self.worker = threading.Thread(target=self.read, name="RebarIfcRead")
+        self.worker.daemon = True
+        self.worker.start()
+
+        self.timer = QtCore.QTimer()
+        self.timer.timeout.connect(self.create_batch)
+        self.timer.start(20)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    # worker thread, no document access in here
+    def read(self):
+        try:
+            cache_key = None
+            if importIFCrebar.IMPORT_CACHE is True:
+                cache_key = rebarcache.get_cache_key(
+                    self.filename,
+                    importIFCrebar.get_cache_settings(
+                        self.skip,
+                        self.only,
+                        self.query
+                    )
+                )
+                cached = rebarcache.load(cache_key)
+                if cached is not None:
+                    self.total = len(cached)
+                    for bar in cached:
+                        self.bars.put(bar)
+                    return
+
+            ifcfile = importIFCrebar.open_ifc_file(self.filename)
+            if ifcfile is None:
+                self.error = "IfcOpenShell was not found."
+                return
+            length_scale = importIFCrebar.get_prj_unit_length_scale(ifcfile)
+            evaluator = helper.PlacementEvaluator(length_scale)
+            reinforcements = importIFCrebar.select_reinforcements(
+                ifcfile,
+                self.skip,
+                self.only,
+                self.query,
+                length_scale,
+                evaluator
+            )
+            self.total = len(reinforcements)
+            read_bars = []
+            for rebar in reinforcements:
+                if self.cancelled.is_set():
+                    return
+                bar = importIFCrebar.read_reinforcement(
+                    ifcfile,
+                    rebar,
+                    length_scale,
+                    evaluator
+                )
+                if bar is None:
+                    self.total -= 1
+                    continue
+                read_bars.append(bar)
+                self.bars.put(bar)
+            if cache_key is not None:
+                # only a complete read is cached
+                rebarcache.save(cache_key, read_bars)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.reading_done.set()
+
+    # GUI thread
+    def create_batch(self):
+        # the objects are recomputed once in finish, a recompute per
+        # batch would recompute all objects created so far again
+        try:
+            batch = []
+            while (
+                len(batch) < self.batch_size
+                and not self.cancelled.is_set()
+            ):
+                try:
+                    batch.append(self.bars.get_nowait())
+                except queue.Empty:
+                    break
+            # the bars of one mark are registered to its base rebar at once
+            registrations = importIFCrebar.register_bars(
+                batch,
+                self.base_rebars
+            )
+            for bar, registration in zip(batch, registrations):
+                importIFCrebar.create_reinforcement(
+                    self.doc,
+                    bar,
+                    self.base_rebars,
+                    registration
+                )
+                self.created += 1
+            self.update_progress()
+        except Exception as e:
+            # stop the worker and the timer, otherwise the failing
+            # batch would be called again on the next timer event
+            self.cancelled.set()
+            FreeCAD.Console.PrintError(
+                "Rebar IFC import error: {}\n".format(e)
+            )
+            self.finish("Import aborted, {} reinforcements kept.".format(
+                self.created
+            ))
+            return
+
+        if self.cancelled.is_set():
+            self.finish("Import cancelled, {} reinforcements kept.".format(
+                self.created
+            ))
+        elif self.reading_done.is_set() and self.bars.empty():
+            if self.error:
+                FreeCAD.Console.PrintError(
+                    "Rebar IFC import error: {}\n".format(self.error)
+                )
+            self.finish("Import done, {} reinforcements created.".format(
+                self.created
+            ))
+
+    def update_progress(self):
+        if self.total is None:
+            return
+        elapsed = time.time() - self.start_time
+        rate = self.created / elapsed if elapsed > 0 else 0.0
+        if rate > 0:
+            eta = (self.total - self.created) / rate
+        else:
+            eta = 0.0
+        self.dialog.setMaximum(max(self.total, 1))
+        self.dialog.setValue(min(self.created, self.total))
+        self.dialog.setLabelText(
+            "{} of {} bars, {:.1f} bars/s, {:.0f} s left"
+            .format(self.created, self.total, rate, eta)
+        )
+
+    def finish(self, message):
+        self.timer.stop()
+        self.dialog.close()
+        # the objects created so far are valid, even on cancel or error
+        self.doc.recompute()
+        print("{} ({:.1f} s)".format(message, time.time() - self.start_time))
+        FreeCADGui.activeDocument().activeView().viewAxometric()
+        FreeCADGui.SendMsgToActiveView("ViewFit")
+        if self in _running_imports:
+            _running_imports.remove(self)
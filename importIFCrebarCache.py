@@ -0,0 +1,196 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Persistent import cache for the rebar IFC importer.
+
+The bars read by importIFCrebar.read_reinforcements are saved
+per file content hash and import settings. On a second import of an
+unchanged file the bars are loaded from the cache and ifcopenshell
+is not used at all.
+
+A cache entry is one numpy .npz file:
+meta : json string with pid, global_id, mark, radius, only_lines,
+    ifc_properties and the count of rebars of every bar
+matrices : float array (sum of all rebars, 4, 4)
+brep_blob : uint8 array with all sweep path BREP strings
+brep_offsets : int array with the start of each BREP string in brep_blob
+
+"""
+
+__title__ = "FreeCAD rebar IFC importer cache"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import hashlib
+import json
+import os
+import zipfile
+
+import numpy as np
+
+import FreeCAD
+
+import Part
+
+
+# raise if the format of a cache entry changes, old entries are not used
+CACHE_VERSION = 1
+
+
+def get_cache_dir():
+    """returns the cache directory, it is created if it does not exist"""
+    p = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Arch")
+    cache_dir = p.GetString("ifcRebarCacheDir", "")
+    if not cache_dir:
+        cache_dir = os.path.join(
+            FreeCAD.getUserAppDataDir(),
+            "Rebar2ImportCache"
+        )
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    return cache_dir
+
+
+def get_file_hash(filename, chunk_size=1 << 20):
+    """returns the sha256 hex digest of the file content"""
+    sha = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def get_cache_key(filename, settings):
+    """returns the cache key for file content and import settings,
+    settings is a dictionary with json serializable values"""
+    key = {
+        "version": CACHE_VERSION,
+        "file": get_file_hash(filename),
+        "settings": settings,
+    }
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def get_cache_file(cache_key):
+    return os.path.join(get_cache_dir(), cache_key + ".npz")
+
+
+def save(cache_key, bars):
+    """saves the bars returned by importIFCrebar.read_reinforcements"""
+    meta = []
+    matrices = []
+    breps = []
+    for bar in bars:
+        meta.append({
+            "pid": bar["pid"],
+            "global_id": bar["global_id"],
+            "mark": bar["mark"],
+            "radius": bar["radius"],
+            "only_lines": bar["only_lines"],
+            "ifc_properties": bar["ifc_properties"],
+            "count": len(bar["matrices"]),
+        })
+        matrices.append(bar["matrices"])
+        breps.append(bar["sweep_path"].exportBrepToString().encode("utf-8"))
+    offsets = np.cumsum([0] + [len(b) for b in breps])
+    if matrices:
+        matrices = np.concatenate(matrices)
+    else:
+        matrices = np.zeros((0, 4, 4))
+
+    cache_file = get_cache_file(cache_key)
+    # write to a temporary file first, an interrupted save
+    # should never leave a broken cache entry
+    tmp_file = cache_file + ".tmp.npz"
+    try:
+        np.savez_compressed(
+            tmp_file,
+            meta=np.array(json.dumps(meta)),
+            matrices=matrices,
+            brep_blob=np.frombuffer(b"".join(breps), dtype=np.uint8),
+            brep_offsets=offsets,
+        )
+        os.replace(tmp_file, cache_file)
+    except (IOError, OSError) as e:
+        FreeCAD.Console.PrintWarning(
+            "Import cache could not be written: {}\n".format(e)
+        )
+
+
+def load(cache_key):
+    """returns the bars saved for cache_key
+    or None if there is no valid cache entry,
+    a broken cache entry is deleted"""
+    cache_file = get_cache_file(cache_key)
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with np.load(cache_file) as data:
+            meta = json.loads(str(data["meta"]))
+            matrices = data["matrices"]
+            blob = data["brep_blob"].tobytes()
+            offsets = data["brep_offsets"]
+    except (IOError, OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        remove_broken(cache_file, e)
+        return None
+
+    bars = []
+    start = 0
+    for i, m in enumerate(meta):
+        sweep_path = Part.Shape()
+        try:
+            sweep_path.importBrepFromString(
+                blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+            )
+        except Exception as e:
+            # Part.OCCError or a broken utf-8 string
+            remove_broken(cache_file, e)
+            return None
+        bar = dict(m)
+        del bar["count"]
+        bar["sweep_path"] = sweep_path
+        bar["matrices"] = matrices[start:start + m["count"]]
+        start += m["count"]
+        bars.append(bar)
+    return bars
+
+
+def remove_broken(cache_file, error):
+    """deletes a cache entry which could not be loaded"""
+    FreeCAD.Console.PrintWarning(
+        "Import cache entry {} not readable, deleted: {}\n"
+        .format(cache_file, error)
+    )
+    try:
+        os.remove(cache_file)
+    except OSError:
+        pass
+
+
+def clear():
+    """deletes all cache entries"""
+    cache_dir = get_cache_dir()
+    for f in os.listdir(cache_dir):
+        if f.endswith(".npz"):
+            os.remove(os.path.join(cache_dir, f))
@@ -0,0 +1,488 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Helper for the rebar IFC importer.
+
+Directrix:
+The Directrix of an IfcSweptDiskSolid is decoded straight from the
+IFC attributes into coordinate arrays. Supported are IfcPolyline,
+IfcIndexedPolyCurve, IfcCompositeCurve and IfcTrimmedCurve on IfcLine
+and IfcCircle. For any other curve None is returned and the importer
+falls back to ifcopenshell.geom.
+
+A decoded curve is a list of segments. A segment is a tuple
+("line", points) with points as numpy array of shape (n, 3) or
+("arc", points) with three points: start, some point on the arc, end.
+
+Placements:
+The whole IfcLocalPlacement tree of a product and the
+IfcCartesianTransformationOperator3D of each IfcMappedItem are evaluated
+into 4x4 matrices, see class PlacementEvaluator.
+
+"""
+
+__title__ = "FreeCAD rebar IFC importer helper"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import math
+
+import numpy as np
+
+import FreeCAD
+from FreeCAD import Vector as vec
+
+import Part
+
+
+# ************************************************************************
+# directrix
+def decode_directrix(ifc_curve, length_scale=1.0):
+    """returns the segments of an IfcCurve scaled by length_scale
+    or None if the curve type is not supported"""
+    segments = decode_curve(ifc_curve)
+    if not segments:
+        return None
+    return [(kind, pts * length_scale) for kind, pts in segments]
+
+
+def decode_curve(ifc_curve):
+    """returns the segments of an IfcCurve in file units
+    or None if the curve type is not supported"""
+    if ifc_curve.is_a("IfcPolyline"):
+        pts = _points_array([p.Coordinates for p in ifc_curve.Points])
+        return [("line", pts)]
+    elif ifc_curve.is_a("IfcIndexedPolyCurve"):
+        return _decode_indexed_poly_curve(ifc_curve)
+    elif ifc_curve.is_a("IfcCompositeCurve"):
+        # IfcCompositeCurveOnSurface is a IfcCompositeCurve too
+        # but its segments are not in 3D space
+        if ifc_curve.is_a("IfcCompositeCurveOnSurface"):
+            return None
+        return _decode_composite_curve(ifc_curve)
+    elif ifc_curve.is_a("IfcTrimmedCurve"):
+        return _decode_trimmed_curve(ifc_curve)
+    return None
+
+
+def make_wire(segments):
+    """returns a Part.Wire made out of the decoded segments"""
+    edges = []
+    for kind, pts in segments:
+        if kind == "line":
+            for i in range(len(pts) - 1):
+                p1 = vec(*pts[i])
+                p2 = vec(*pts[i + 1])
+                if p1.isEqual(p2, Part.Precision.confusion()):
+                    # duplicate points are allowed in IfcPolyline
+                    continue
+                edges.append(Part.LineSegment(p1, p2).toShape())
+        elif kind == "arc":
+            edges.append(Part.Arc(
+                vec(*pts[0]),
+                vec(*pts[1]),
+                vec(*pts[2])
+            ).toShape())
+    if not edges:
+        return None
+    return Part.Wire(edges)
+
+
+def has_only_lines(segments):
+    """True if the decoded segments could be represented as polyline"""
+    for kind, pts in segments:
+        if kind != "line":
+            return False
+    return True
+
+
+def get_points(segments):
+    """returns the corner points of the decoded segments
+    as numpy array of shape (n, 3) without consecutive duplicates"""
+    pts = np.concatenate([s[1] for s in segments])
+    if len(pts) < 2:
+        return pts
+    keep = np.ones(len(pts), dtype=bool)
+    keep[1:] = np.linalg.norm(np.diff(pts, axis=0), axis=1) > 1e-9
+    return pts[keep]
+
+
+def _points_array(coordinates):
+    # 2D points get z=0
+    pts = np.zeros((len(coordinates), 3))
+    for i, co in enumerate(coordinates):
+        pts[i, :len(co)] = co
+    return pts
+
+
+def _decode_indexed_poly_curve(ifc_curve):
+    pts = _points_array(ifc_curve.Points.CoordList)
+    if not ifc_curve.Segments:
+        return [("line", pts)]
+    segments = []
+    for seg in ifc_curve.Segments:
+        # IfcLineIndex and IfcArcIndex are 1-based
+        idx = [i - 1 for i in seg.wrappedValue]
+        if seg.is_a("IfcLineIndex"):
+            segments.append(("line", pts[idx]))
+        elif seg.is_a("IfcArcIndex"):
+            segments.append(("arc", pts[idx]))
+        else:
+            return None
+    return segments
+
+
+def _decode_composite_curve(ifc_curve):
+    segments = []
+    for comp_seg in ifc_curve.Segments:
+        parent = decode_curve(comp_seg.ParentCurve)
+        if parent is None:
+            return None
+        if not comp_seg.SameSense:
+            parent = _reverse_segments(parent)
+        segments += parent
+    return segments
+
+
+def _decode_trimmed_curve(ifc_curve):
+    basis = ifc_curve.BasisCurve
+    if basis.is_a("IfcLine"):
+        pnt = _points_array([basis.Pnt.Coordinates])[0]
+        direction = _direction_array(basis.Dir.Orientation)
+        direction = direction * basis.Dir.Magnitude
+        p1 = _line_trim_point(ifc_curve.Trim1, pnt, direction)
+        p2 = _line_trim_point(ifc_curve.Trim2, pnt, direction)
+        if p1 is None or p2 is None:
+            return None
+        # a trimmed curve always runs from Trim1 to Trim2,
+        # for a line SenseAgreement does not change anything
+        return [("line", np.array([p1, p2]))]
+    elif basis.is_a("IfcCircle"):
+        # only trimming by cartesian points, parameter
+        # values would need the plane angle unit of the project
+        p1 = _trim_cartesian_point(ifc_curve.Trim1)
+        p2 = _trim_cartesian_point(ifc_curve.Trim2)
+        if p1 is None or p2 is None:
+            return None
+        origin, xaxis, yaxis, zaxis = _axis2placement_frame(basis.Position)
+        a1 = _angle_in_frame(p1, origin, xaxis, yaxis)
+        a2 = _angle_in_frame(p2, origin, xaxis, yaxis)
+        if ifc_curve.SenseAgreement:
+            sweep = (a2 - a1) % (2 * math.pi)
+        else:
+            sweep = -((a1 - a2) % (2 * math.pi))
+        if abs(sweep) < 1e-12:
+            return None
+        am = a1 + 0.5 * sweep
+        pm = origin + basis.Radius * (
+            math.cos(am) * xaxis + math.sin(am) * yaxis
+        )
+        return [("arc", np.array([p1, pm, p2]))]
+    return None
+
+
+def _reverse_segments(segments):
+    return [(kind, pts[::-1]) for kind, pts in reversed(segments)]
+
+
+def _trim_cartesian_point(trim_select):
+    for t in trim_select:
+        if hasattr(t, "is_a") and t.is_a("IfcCartesianPoint"):
+            return _points_array([t.Coordinates])[0]
+    return None
+
+
+def _line_trim_point(trim_select, pnt, direction):
+    p = _trim_cartesian_point(trim_select)
+    if p is not None:
+        return p
+    for t in trim_select:
+        if hasattr(t, "is_a") and t.is_a("IfcParameterValue"):
+            return pnt + t.wrappedValue * direction
+    return None
+
+
+def _direction_array(ifc_direction):
+    d = np.zeros(3)
+    ratios = ifc_direction.DirectionRatios
+    d[:len(ratios)] = ratios
+    return d / np.linalg.norm(d)
+
+
+def _axis2placement_frame(position):
+    """origin, x, y and z axis of an IfcAxis2Placement2D or 3D"""
+    origin = _points_array([position.Location.Coordinates])[0]
+    zaxis = np.array([0.0, 0.0, 1.0])
+    if position.is_a("IfcAxis2Placement3D") and position.Axis:
+        zaxis = _direction_array(position.Axis)
+    xaxis = np.array([1.0, 0.0, 0.0])
+    if position.RefDirection:
+        xaxis = _direction_array(position.RefDirection)
+    # RefDirection is not necessarily orthogonal to Axis
+    xaxis = xaxis - np.dot(xaxis, zaxis) * zaxis
+    xaxis = xaxis / np.linalg.norm(xaxis)
+    yaxis = np.cross(zaxis, xaxis)
+    return origin, xaxis, yaxis, zaxis
+
+
+def _angle_in_frame(point, origin, xaxis, yaxis):
+    d = point - origin
+    return math.atan2(np.dot(d, yaxis), np.dot(d, xaxis))
+
+
+# ************************************************************************
+# placements
+class PlacementEvaluator(object):
+    """
+    Evaluates IfcLocalPlacement trees, IfcAxis2Placement and
+    IfcCartesianTransformationOperator3D into 4x4 numpy matrices.
+
+    The matrices are in FreeCAD units (mm), the translations are scaled
+    by length_scale. Placements are shared between products (a storey,
+    an element), thus evaluated placements are memoized by entity id.
+    """
+
+    def __init__(self, length_scale=1.0):
+        self.length_scale = length_scale
+        self._local_placements = {}  # {entity_id: matrix}
+        self._mapping_origins = {}  # {entity_id: matrix}
+
+    def clear(self):
+        """forgets the evaluated placements, see import_chunked"""
+        self._local_placements = {}
+        self._mapping_origins = {}
+
+    def get_object_placement(self, product):
+        """returns the global matrix of the ObjectPlacement of product"""
+        return self.local_placement_matrix(product.ObjectPlacement)
+
+    def local_placement_matrix(self, ifc_placement):
+        """returns the global matrix of an IfcLocalPlacement"""
+        if ifc_placement is None or not ifc_placement.is_a(
+            "IfcLocalPlacement"
+        ):
+            # IfcGridPlacement is not supported
+            return np.identity(4)
+        pid = ifc_placement.id()
+        if pid not in self._local_placements:
+            relative = self.axis2placement_matrix(
+                ifc_placement.RelativePlacement
+            )
+            if ifc_placement.PlacementRelTo:
+                parent = self.local_placement_matrix(
+                    ifc_placement.PlacementRelTo
+                )
+                relative = np.dot(parent, relative)
+            self._local_placements[pid] = relative
+        return self._local_placements[pid]
+
+    def axis2placement_matrix(self, ifc_axis2placement):
+        """returns the matrix of an IfcAxis2Placement2D or 3D"""
+        origin, xaxis, yaxis, zaxis = _axis2placement_frame(
+            ifc_axis2placement
+        )
+        return self._matrix(xaxis, yaxis, zaxis, origin)
+
+    def transformation_operator_matrix(self, ifc_operator):
+        """returns the matrix of an IfcCartesianTransformationOperator3D
+        including the scale, see IfcBaseAxis in the IFC specification"""
+        zaxis = np.array([0.0, 0.0, 1.0])
+        if getattr(ifc_operator, "Axis3", None):
+            zaxis = _direction_array(ifc_operator.Axis3)
+        if ifc_operator.Axis1:
+            xaxis = _direction_array(ifc_operator.Axis1)
+        elif not np.allclose(zaxis, [1.0, 0.0, 0.0]):
+            xaxis = np.array([1.0, 0.0, 0.0])
+        else:
+            xaxis = np.array([0.0, 1.0, 0.0])
+        xaxis = xaxis - np.dot(xaxis, zaxis) * zaxis
+        xaxis = xaxis / np.linalg.norm(xaxis)
+        if ifc_operator.Axis2:
+            yaxis = _direction_array(ifc_operator.Axis2)
+        else:
+            yaxis = np.array([0.0, 1.0, 0.0])
+        yaxis = yaxis - np.dot(yaxis, zaxis) * zaxis
+        yaxis = yaxis - np.dot(yaxis, xaxis) * xaxis
+        if np.linalg.norm(yaxis) < 1e-12:
+            yaxis = np.cross(zaxis, xaxis)
+        yaxis = yaxis / np.linalg.norm(yaxis)
+
+        scale = ifc_operator.Scale
+        if scale is None:
+            scale = 1.0
+        scale2 = scale3 = scale
+        if ifc_operator.is_a("IfcCartesianTransformationOperator3DnonUniform"):
+            if ifc_operator.Scale2 is not None:
+                scale2 = ifc_operator.Scale2
+            if ifc_operator.Scale3 is not None:
+                scale3 = ifc_operator.Scale3
+        origin = _points_array([ifc_operator.LocalOrigin.Coordinates])[0]
+        return self._matrix(
+            xaxis * scale,
+            yaxis * scale2,
+            zaxis * scale3,
+            origin
+        )
+
+    def mapping_origin_matrix(self, ifc_representation_map):
+        """returns the matrix of the MappingOrigin of an
+        IfcRepresentationMap, memoized because shared by all mapped items"""
+        mid = ifc_representation_map.id()
+        if mid not in self._mapping_origins:
+            self._mapping_origins[mid] = self.axis2placement_matrix(
+                ifc_representation_map.MappingOrigin
+            )
+        return self._mapping_origins[mid]
+
+    def get_mapped_item_matrices(self, product, ifc_shape_representation):
+        """returns the global matrices of all IfcMappedItem of the
+        representation of product as one array of shape (n, 4, 4)"""
+        world = self.get_object_placement(product)
+        items = [
+            item for item in ifc_shape_representation.Items
+            if item.is_a("IfcMappedItem")
+        ]
+        if not items:
+            return np.zeros((0, 4, 4))
+        targets = np.array([
+            self.transformation_operator_matrix(item.MappingTarget)
+            for item in items
+        ])
+        origins = np.array([
+            self.mapping_origin_matrix(item.MappingSource)
+            for item in items
+        ])
+        # geometry = ObjectPlacement * MappingTarget * MappingOrigin
+        return np.matmul(world, np.matmul(targets, origins))
+
+    def _matrix(self, xaxis, yaxis, zaxis, origin):
+        m = np.identity(4)
+        m[:3, 0] = xaxis
+        m[:3, 1] = yaxis
+        m[:3, 2] = zaxis
+        m[:3, 3] = origin * self.length_scale
+        return m
+
+
+def matrix_to_placement(matrix):
+    """returns a FreeCAD.Placement for a 4x4 numpy matrix,
+    a scale is removed because a Placement can not have one"""
+    m = np.array(matrix, dtype=float)
+    scale = np.linalg.norm(m[:3, :3], axis=0)
+    if not np.allclose(scale, 1.0):
+        FreeCAD.Console.PrintWarning(
+            "Scaled transformation {} found, scale is ignored.\n"
+            .format(scale)
+        )
+        m[:3, :3] = m[:3, :3] / scale
+    return FreeCAD.Placement(FreeCAD.Matrix(*m.flatten().tolist()))
+
+
+def has_common_rotation(matrices, tolerance=1e-6):
+    """True if all matrices have the same rotation part"""
+    if len(matrices) < 2:
+        return True
+    rotations = matrices[:, :3, :3]
+    return bool(np.all(np.abs(rotations - rotations[0]) < tolerance))
+
+
+def bars_intersect_box(matrices, points, box):
+    """True if the bounding box of points placed by one of the
+    matrices (n, 4, 4) intersects the axis aligned box
+    ((xmin, ymin, zmin), (xmax, ymax, zmax))"""
+    if len(matrices) == 0:
+        return False
+    # (n, m, 3) points of all rebars at once
+    placed = np.einsum(
+        "nij,mj->nmi",
+        matrices[:, :3, :3],
+        points
+    ) + matrices[:, None, :3, 3]
+    bar_min = placed.min(axis=1)
+    bar_max = placed.max(axis=1)
+    hit = np.all(bar_max >= box[0], axis=1) & np.all(bar_min <= box[1], axis=1)
+    return bool(np.any(hit))
+
+
+# ************************************************************************
+# rigid registration of a bar to its base rebar
+def get_wire_points(shape):
+    """returns the points (n, 3) along the first wire of shape,
+    the ordered vertices with the middle point of each edge between,
+    thus arcs are distinguished from straight edges"""
+    wire = shape.Wires[0]
+    edges = wire.OrderedEdges
+    vertexes = wire.OrderedVertexes
+    points = [vertexes[0].Point]
+    for i, edge in enumerate(edges):
+        first, last = edge.ParameterRange
+        points.append(edge.valueAt(0.5 * (first + last)))
+        points.append(vertexes[(i + 1) % len(vertexes)].Point)
+    return np.array([[p.x, p.y, p.z] for p in points], dtype=float)
+
+
+def register_points(source, targets):
+    """least-squares rigid registration (Kabsch) of the source points
+    (n, 3) onto each point set of targets (m, n, 3), all at once
+
+    returns the matrices (m, 4, 4) which move source onto the targets
+    and the root mean square residuals (m,). The targets are tried
+    in reversed point order too, the better fit is returned.
+    For collinear points, straight bars, the rotation around the
+    line is arbitrary but the residual is correct.
+    """
+    source = np.asarray(source, dtype=float)
+    targets = np.asarray(targets, dtype=float)
+    m = len(targets)
+    matrices = np.tile(np.eye(4), (m, 1, 1))
+    residuals = np.full(m, np.inf)
+    if m == 0 or targets.shape[1] != len(source):
+        return matrices, residuals
+
+    for candidates in (targets, targets[:, ::-1]):
+        rot, trans, res = _kabsch(source, candidates)
+        better = res < residuals
+        matrices[better, :3, :3] = rot[better]
+        matrices[better, :3, 3] = trans[better]
+        residuals[better] = res[better]
+    return matrices, residuals
+
+
+def _kabsch(source, targets):
+    source_center = source.mean(axis=0)
+    target_centers = targets.mean(axis=1)
+    p = source - source_center
+    q = targets - target_centers[:, None, :]
+    # (m, 3, 3) cross-covariance matrices
+    h = np.einsum("ni,mnj->mij", p, q)
+    u, s, vt = np.linalg.svd(h)
+    v = np.transpose(vt, (0, 2, 1))
+    ut = np.transpose(u, (0, 2, 1))
+    # no reflections
+    d = np.sign(np.linalg.det(v @ ut))
+    correction = np.tile(np.eye(3), (len(targets), 1, 1))
+    correction[:, 2, 2] = d
+    rot = v @ correction @ ut
+    trans = target_centers - np.einsum("mij,j->mi", rot, source_center)
+    moved = np.einsum("mij,nj->mni", rot, source) + trans[:, None, :]
+    residuals = np.sqrt(np.mean(np.sum((moved - targets) ** 2, axis=2), axis=1))
+    return rot, trans, residuals
@@ -0,0 +1,536 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Memory-mapped STEP reader for the rebar IFC importer.
+
+ifcopenshell.open parses the whole file, including all the concrete
+geometry. This reader memory-maps the file and builds an index with the
+offset of every "#id= TYPE(" record in one pass. Only entities which are
+accessed are parsed, thus only the ones reachable from the reinforcing
+bars: representations, directrices, placements, property sets and units.
+
+The entities mimic the part of the ifcopenshell API the importer uses:
+id(), is_a(), attribute access by name, wrappedValue of defined types,
+the inverse attribute IsDefinedBy, file[id] and file.by_type(type).
+Attribute names are only known for the entities in ENTITY_ATTRIBUTES,
+every attribute of any other entity is None, thus unknown entities, for
+example of a property type the reader does not model, are skipped like
+unset attributes instead of aborting the import. A warning is printed
+once for each unknown type. Where None is not a valid value, the
+importer leaves such entities out, see is_known.
+by_type does not return subtypes.
+
+The index pass uses a regular expression, a string attribute containing
+a complete record start like ";#1= IFCWALL(" would be indexed too.
+
+"""
+
+__title__ = "FreeCAD rebar IFC importer, memory-mapped STEP reader"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import mmap
+import re
+
+import FreeCAD
+
+
+ROOT = ["GlobalId", "OwnerHistory", "Name", "Description"]
+PRODUCT = ROOT + ["ObjectType", "ObjectPlacement", "Representation"]
+
+# attribute names of the entities the importer reads
+ENTITY_ATTRIBUTES = {
+    # units
+    "IfcProject": ROOT + [
+        "ObjectType", "LongName", "Phase",
+        "RepresentationContexts", "UnitsInContext"
+    ],
+    "IfcUnitAssignment": ["Units"],
+    "IfcSIUnit": ["Dimensions", "UnitType", "Prefix", "Name"],
+    "IfcConversionBasedUnit": [
+        "Dimensions", "UnitType", "Name", "ConversionFactor"
+    ],
+    # products, spatial structure and hosts need GlobalId and Name only
+    "IfcReinforcingBar": PRODUCT + [
+        "Tag", "SteelGrade", "NominalDiameter", "CrossSectionArea",
+        "BarLength", "BarRole", "BarSurface"
+    ],
+    "IfcSite": PRODUCT,
+    "IfcBuilding": PRODUCT,
+    "IfcBuildingStorey": PRODUCT,
+    "IfcSpace": PRODUCT,
+    "IfcBeam": PRODUCT,
+    "IfcBuildingElementProxy": PRODUCT,
+    "IfcColumn": PRODUCT,
+    "IfcElementAssembly": PRODUCT,
+    "IfcFooting": PRODUCT,
+    "IfcMember": PRODUCT,
+    "IfcPile": PRODUCT,
+    "IfcPlate": PRODUCT,
+    "IfcSlab": PRODUCT,
+    "IfcStair": PRODUCT,
+    "IfcWall": PRODUCT,
+    "IfcWallStandardCase": PRODUCT,
+    # representation
+    "IfcProductDefinitionShape": ["Name", "Description", "Representations"],
+    "IfcShapeRepresentation": [
+        "ContextOfItems", "RepresentationIdentifier",
+        "RepresentationType", "Items"
+    ],
+    "IfcMappedItem": ["MappingSource", "MappingTarget"],
+    "IfcRepresentationMap": ["MappingOrigin", "MappedRepresentation"],
+    "IfcSweptDiskSolid": [
+        "Directrix", "Radius", "InnerRadius", "StartParam", "EndParam"
+    ],
+    # curves
+    "IfcPolyline": ["Points"],
+    "IfcCartesianPoint": ["Coordinates"],
+    "IfcDirection": ["DirectionRatios"],
+    "IfcIndexedPolyCurve": ["Points", "Segments", "SelfIntersect"],
+    "IfcCartesianPointList2D": ["CoordList", "TagList"],
+    "IfcCartesianPointList3D": ["CoordList", "TagList"],
+    "IfcCompositeCurve": ["Segments", "SelfIntersect"],
+    "IfcCompositeCurveOnSurface": ["Segments", "SelfIntersect"],
+    "IfcCompositeCurveSegment": ["Transition", "SameSense", "ParentCurve"],
+    "IfcReparametrisedCompositeCurveSegment": [
+        "Transition", "SameSense", "ParentCurve", "ParamLength"
+    ],
+    "IfcTrimmedCurve": [
+        "BasisCurve", "Trim1", "Trim2",
+        "SenseAgreement", "MasterRepresentation"
+    ],
+    "IfcLine": ["Pnt", "Dir"],
+    "IfcVector": ["Orientation", "Magnitude"],
+    "IfcCircle": ["Position", "Radius"],
+    # placements
+    "IfcAxis2Placement2D": ["Location", "RefDirection"],
+    "IfcAxis2Placement3D": ["Location", "Axis", "RefDirection"],
+    "IfcLocalPlacement": ["PlacementRelTo", "RelativePlacement"],
+    "IfcCartesianTransformationOperator3D": [
+        "Axis1", "Axis2", "LocalOrigin", "Scale", "Axis3"
+    ],
+    "IfcCartesianTransformationOperator3DnonUniform": [
+        "Axis1", "Axis2", "LocalOrigin", "Scale", "Axis3",
+        "Scale2", "Scale3"
+    ],
+    # properties and relations
+    "IfcRelDefinesByProperties": ROOT + [
+        "RelatedObjects", "RelatingPropertyDefinition"
+    ],
+    "IfcPropertySet": ROOT + ["HasProperties"],
+    "IfcPropertySingleValue": [
+        "Name", "Description", "NominalValue", "Unit"
+    ],
+    # other properties, read by getIfcProperties, Name is enough
+    "IfcPropertyEnumeratedValue": [
+        "Name", "Description", "EnumerationValues", "EnumerationReference"
+    ],
+    "IfcPropertyBoundedValue": [
+        "Name", "Description", "UpperBoundValue", "LowerBoundValue", "Unit"
+    ],
+    "IfcPropertyListValue": [
+        "Name", "Description", "ListValues", "Unit"
+    ],
+    "IfcPropertyReferenceValue": [
+        "Name", "Description", "UsageName", "PropertyReference"
+    ],
+    "IfcPropertyTableValue": [
+        "Name", "Description", "DefiningValues", "DefinedValues",
+        "Expression", "DefiningUnit", "DefinedUnit"
+    ],
+    "IfcComplexProperty": [
+        "Name", "Description", "UsageName", "HasProperties"
+    ],
+    "IfcElementQuantity": ROOT + ["MethodOfMeasurement", "Quantities"],
+    "IfcRelContainedInSpatialStructure": ROOT + [
+        "RelatedElements", "RelatingStructure"
+    ],
+    "IfcRelAggregates": ROOT + ["RelatingObject", "RelatedObjects"],
+}
+
+# IFC4 renamed some attributes
+ENTITY_ATTRIBUTES_IFC4 = {
+    "IfcReinforcingBar": PRODUCT + [
+        "Tag", "SteelGrade", "NominalDiameter", "CrossSectionArea",
+        "BarLength", "PredefinedType", "BarSurface"
+    ],
+}
+
+# supertypes for is_a, only where the importer asks for the supertype
+SUPERTYPES = {
+    "IfcCompositeCurveOnSurface": "IfcCompositeCurve",
+    "IfcReparametrisedCompositeCurveSegment": "IfcCompositeCurveSegment",
+    "IfcCartesianTransformationOperator3DnonUniform":
+        "IfcCartesianTransformationOperator3D",
+    "IfcWallStandardCase": "IfcWall",
+}
+
+# defined types which could be used as typed value
+DEFINED_TYPES = [
+    "IfcAreaMeasure", "IfcArcIndex", "IfcBoolean", "IfcCountMeasure",
+    "IfcDescriptiveMeasure", "IfcIdentifier", "IfcInteger", "IfcLabel",
+    "IfcLengthMeasure", "IfcLineIndex", "IfcLogical", "IfcMassMeasure",
+    "IfcMassDensityMeasure", "IfcNormalisedRatioMeasure",
+    "IfcParameterValue", "IfcPlaneAngleMeasure", "IfcPositiveLengthMeasure",
+    "IfcPositiveRatioMeasure", "IfcRatioMeasure", "IfcReal", "IfcText",
+    "IfcVolumeMeasure",
+]
+
+TYPE_NAMES = {
+    t.upper(): t for t in list(ENTITY_ATTRIBUTES.keys()) + DEFINED_TYPES
+}
+
+RECORD_START = re.compile(rb"#(\d+)\s*=\s*([A-Za-z0-9_]+)\s*\(")
+
+
+def open_step_file(filename):
+    """returns a StepFile for filename"""
+    return StepFile(filename)
+
+
+def is_known(entity):
+    """returns False for an entity of a StepFile of a type the reader
+    does not know, all its attributes are None, and for None.
+    Entities of ifcopenshell are always known."""
+    if isinstance(entity, StepEntity):
+        return entity.is_known()
+    return entity is not None
+
+
+def type_name(step_type):
+    """returns the IFC type name for an upper case STEP type name"""
+    if step_type in TYPE_NAMES:
+        return TYPE_NAMES[step_type]
+    # not known, best guess
+    return step_type[:3].capitalize() + step_type[3:].lower()
+
+
+class StepFile(object):
+    """
+    A memory-mapped ifc STEP file with an offset index of all records.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.schema = self._read_schema()
+        self.attributes = dict(ENTITY_ATTRIBUTES)
+        if self.schema.startswith("IFC4"):
+            self.attributes.update(ENTITY_ATTRIBUTES_IFC4)
+        self._offsets = {}  # {entity_id: offset of the opening bracket}
+        self._by_type = {}  # {STEP type name: [entity_id]}
+        self._entities = {}  # {entity_id: StepEntity}, the parsed ones
+        self._is_defined_by = None  # inverse of IfcRelDefinesByProperties
+        self._unknown_types = set()  # reported entity types
+        self._build_index()
+
+    def report_unknown_type(self, ifc_type):
+        """warns once for each entity type the reader does not know"""
+        if ifc_type in self._unknown_types:
+            return
+        self._unknown_types.add(ifc_type)
+        FreeCAD.Console.PrintWarning(
+            "Entity type {} is not known by the memory-mapped reader, "
+            "its attributes are not read.\n".format(ifc_type)
+        )
+
+    def release(self):
+        """forgets the parsed entities, the offset index is kept,
+        thus they are parsed again on the next access"""
+        self._entities = {}
+
+    def close(self):
+        self._entities = {}
+        self._mm.close()
+        self._file.close()
+
+    def _read_schema(self):
+        head = self._mm[:65536]
+        found = re.search(rb"FILE_SCHEMA\s*\(\s*\(\s*'([^']*)'", head)
+        if found:
+            return found.group(1).decode("ascii").upper()
+        return "IFC2X3"
+
+    def _build_index(self):
+        data_start = self._mm.find(b"DATA;")
+        if data_start < 0:
+            data_start = 0
+        offsets = self._offsets
+        by_type = self._by_type
+        for found in RECORD_START.finditer(self._mm, data_start):
+            eid = int(found.group(1))
+            step_type = found.group(2).upper().decode("ascii")
+            offsets[eid] = found.end() - 1
+            by_type.setdefault(step_type, []).append(eid)
+
+    # ifcopenshell like API
+    def __getitem__(self, eid):
+        entity = self._entities.get(eid)
+        if entity is None:
+            if eid not in self._offsets:
+                raise RuntimeError("Instance #{} not found".format(eid))
+            entity = self._parse_entity(eid)
+            self._entities[eid] = entity
+        return entity
+
+    def by_type(self, ifc_type):
+        return [self[eid] for eid in self._by_type.get(ifc_type.upper(), [])]
+
+    def by_id(self, eid):
+        return self[eid]
+
+    def get_is_defined_by(self, eid):
+        """inverse attribute IsDefinedBy, the IfcRelDefinesByProperties
+        are only parsed on the first call"""
+        if self._is_defined_by is None:
+            self._is_defined_by = {}
+            for rel in self.by_type("IfcRelDefinesByProperties"):
+                for ref in rel.get_raw("RelatedObjects"):
+                    self._is_defined_by.setdefault(ref.eid, []).append(rel)
+        return tuple(self._is_defined_by.get(eid, []))
+
+    def _parse_entity(self, eid):
+        offset = self._offsets[eid]
+        # the type name is right before the bracket
+        start = self._mm.rfind(b"=", 0, offset) + 1
+        step_type = self._mm[start:offset].strip().upper().decode("ascii")
+        parser = _Parser(self._mm, offset)
+        values = parser.parse_list()
+        return StepEntity(self, eid, type_name(step_type), values)
+
+    def resolve(self, value):
+        """replaces references by entities, recursively in lists"""
+        if isinstance(value, _Ref):
+            return self[value.eid]
+        if isinstance(value, tuple):
+            return tuple(self.resolve(v) for v in value)
+        if isinstance(value, StepTypedValue):
+            value.wrappedValue = self.resolve(value.wrappedValue)
+        return value
+
+
+class StepEntity(object):
+    """an entity instance, attributes are resolved on access"""
+
+    def __init__(self, step_file, eid, ifc_type, values):
+        self._file = step_file
+        self._id = eid
+        self._type = ifc_type
+        self._values = values
+
+    def id(self):
+        return self._id
+
+    def is_a(self, ifc_type=None):
+        if ifc_type is None:
+            return self._type
+        ifc_type = ifc_type.upper()
+        t = self._type
+        while t is not None:
+            if t.upper() == ifc_type:
+                return True
+            t = SUPERTYPES.get(t)
+        return False
+
+    def is_known(self):
+        """returns False if the reader does not know the attributes
+        of the type of this entity"""
+        if self._type in self._file.attributes:
+            return True
+        self._file.report_unknown_type(self._type)
+        return False
+
+    def get_raw(self, name):
+        """attribute value without resolving the references"""
+        names = self._file.attributes.get(self._type)
+        if names is None:
+            # a type the reader does not know, the attribute is taken
+            # as not set, the importer skips it like an unset one
+            self._file.report_unknown_type(self._type)
+            return None
+        if name not in names:
+            raise AttributeError(
+                "entity instance of type '{}' has no attribute '{}'"
+                .format(self._type, name)
+            )
+        index = names.index(name)
+        if index >= len(self._values):
+            return None
+        return self._values[index]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name == "IsDefinedBy":
+            return self._file.get_is_defined_by(self._id)
+        return self._file.resolve(self.get_raw(name))
+
+    def __getitem__(self, index):
+        return self._file.resolve(self._values[index])
+
+    def __len__(self):
+        return len(self._values)
+
+    def __repr__(self):
+        return "#{}={}(...)".format(self._id, self._type.upper())
+
+
+class StepTypedValue(object):
+    """a typed value like IFCINTEGER(2) or IFCLINEINDEX((1,2))"""
+
+    def __init__(self, ifc_type, value):
+        self._type = ifc_type
+        self.wrappedValue = value
+
+    def is_a(self, ifc_type=None):
+        if ifc_type is None:
+            return self._type
+        return self._type.upper() == ifc_type.upper()
+
+    def __repr__(self):
+        return "{}({})".format(self._type, self.wrappedValue)
+
+
+class _Ref(object):
+    __slots__ = ["eid"]
+
+    def __init__(self, eid):
+        self.eid = eid
+
+
+class _Parser(object):
+    """parses a STEP parameter list, starting at an opening bracket"""
+
+    def __init__(self, data, pos):
+        self.data = data
+        self.pos = pos
+
+    def parse_list(self):
+        data = self.data
+        assert data[self.pos:self.pos + 1] == b"("
+        self.pos += 1
+        values = []
+        while True:
+            self._skip_space()
+            c = data[self.pos:self.pos + 1]
+            if c == b")":
+                self.pos += 1
+                return tuple(values)
+            if c == b",":
+                self.pos += 1
+                continue
+            values.append(self._parse_value())
+
+    def _skip_space(self):
+        data = self.data
+        while data[self.pos:self.pos + 1] in (b" ", b"\n", b"\r", b"\t"):
+            self.pos += 1
+
+    def _parse_value(self):
+        data = self.data
+        c = data[self.pos:self.pos + 1]
+        if c == b"(":
+            return self.parse_list()
+        if c == b"#":
+            end = self._token_end()
+            eid = int(data[self.pos + 1:end])
+            self.pos = end
+            return _Ref(eid)
+        if c == b"'":
+            return self._parse_string()
+        if c == b"$" or c == b"*":
+            self.pos += 1
+            return None
+        if c == b".":
+            end = data.find(b".", self.pos + 1)
+            enum = data[self.pos + 1:end].decode("ascii")
+            self.pos = end + 1
+            if enum == "T":
+                return True
+            if enum == "F":
+                return False
+            if enum == "U":
+                return None
+            return enum
+        if c.isalpha():
+            # typed value, IFCREAL(1.)
+            end = data.find(b"(", self.pos)
+            step_type = data[self.pos:end].strip().upper().decode("ascii")
+            self.pos = end
+            inner = self.parse_list()
+            value = inner[0] if len(inner) == 1 else inner
+            return StepTypedValue(type_name(step_type), value)
+        # number
+        end = self._token_end()
+        token = data[self.pos:end]
+        self.pos = end
+        if b"." in token or b"E" in token or b"e" in token:
+            return float(token)
+        return int(token)
+
+    def _token_end(self):
+        data = self.data
+        end = self.pos + 1
+        while data[end:end + 1] not in (b",", b")", b" ", b"\n", b"\r", b""):
+            end += 1
+        return end
+
+    def _parse_string(self):
+        data = self.data
+        pos = self.pos + 1
+        parts = []
+        while True:
+            end = data.find(b"'", pos)
+            if data[end + 1:end + 2] == b"'":
+                # escaped quote
+                parts.append(data[pos:end + 1])
+                pos = end + 2
+                continue
+            parts.append(data[pos:end])
+            self.pos = end + 1
+            return decode_step_string(b"".join(parts))
+
+
+def decode_step_string(raw):
+    """decodes the STEP string escapes \\X2\\ \\X\\ and \\S\\"""
+    text = raw.decode("latin-1")
+    if "\\" not in text:
+        return text
+
+    def x2(found):
+        hexstr = found.group(1)
+        return "".join(
+            chr(int(hexstr[i:i + 4], 16)) for i in range(0, len(hexstr), 4)
+        )
+    text = re.sub(r"\\X2\\([0-9A-Fa-f]*)\\X0\\", x2, text)
+    text = re.sub(
+        r"\\X\\([0-9A-Fa-f]{2})",
+        lambda f: chr(int(f.group(1), 16)),
+        text
+    )
+    text = re.sub(
+        r"\\S\\(.)",
+        lambda f: chr(ord(f.group(1)) + 128),
+        text
+    )
+    return text.replace("\\\\", "\\")
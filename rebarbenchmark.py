@@ -0,0 +1,348 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Synthetic large models and a scaling benchmark for the rebar objects.
+
+The models are built with archadd, like a user or the importer does:
+slab : bottom and top mats, straight bars in x and y, linear reinforcements
+wall : vertical bars and closed stirrups, linear reinforcements
+pile : longitudinal bars on a circle, generic reinforcements with
+    rotated placements, and ring stirrups, linear reinforcements
+
+For every model and scale recompute, save, load, memory and the tree
+refresh (claimChildren and Gui update, only with Gui) are measured.
+Without Gui every model is measured in its own forked process, the memory
+is the growth of the peak resident memory of that process. With Gui the
+models are measured one after the other in the Gui process. The
+scaling exponent between two scales is the slope in log-log, about 1.0
+is linear, clearly more shows super-linear behaviour.
+
+Usage:
+import rebarbenchmark
+results = rebarbenchmark.run(scales=[1000, 10000, 100000])
+rebarbenchmark.export_json(results, "/tmp/rebar_benchmark.json")
+
+"""
+
+__title__ = "FreeCAD rebar scaling benchmark"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+
+import FreeCAD
+from FreeCAD import Vector as vec
+
+import Draft
+
+import archadd
+
+if FreeCAD.GuiUp:
+    import FreeCADGui
+
+
+MODELS = ["slab", "wall", "pile"]
+METRICS = ["create", "recompute", "save", "load", "tree", "memory", "size"]
+
+
+# ************************************************************************
+# synthetic models
+def make_model(kind, bars, bars_per_reinforcement=100):
+    """returns a new document with a model of kind with about bars
+    rebars, a reinforcement has bars_per_reinforcement rebars"""
+    doc = FreeCAD.newDocument("RebarBenchmark_{}_{}".format(kind, bars))
+    groups = max(1, int(math.ceil(bars / float(bars_per_reinforcement))))
+    if kind == "slab":
+        make_slab(groups, bars_per_reinforcement)
+    elif kind == "wall":
+        make_wall(groups, bars_per_reinforcement)
+    elif kind == "pile":
+        make_pile(groups, bars_per_reinforcement)
+    else:
+        FreeCAD.Console.PrintError("Unknown model {}\n".format(kind))
+    return doc
+
+
+def make_slab(groups, amount, spacing=150.0, length=6000.0):
+    # one field per four groups: bottom x, bottom y, top x, top y
+    base_x = {}
+    base_y = {}
+    for z, mark in ((30.0, 1), (270.0, 3)):
+        base_x[z] = archadd.BaseRebar(
+            Draft.makeWire([vec(0, 0, z), vec(length, 0, z)]),
+            diameter=12, mark=mark, name="BaseRebar_Slab_X"
+        )
+        base_y[z] = archadd.BaseRebar(
+            Draft.makeWire([vec(0, 0, z + 12), vec(0, length, z + 12)]),
+            diameter=12, mark=mark + 1, name="BaseRebar_Slab_Y"
+        )
+    field = amount * spacing
+    for g in range(groups):
+        layer = (30.0, 270.0)[(g // 2) % 2]
+        fx = (g // 4) % 10 * field
+        fy = (g // 40) * field
+        if g % 2 == 0:
+            archadd.ReinforcementLinear(
+                base_x[layer], amount=amount, spacing=spacing,
+                direction=vec(0, 1, 0),
+                base_placement=FreeCAD.Placement(vec(fx, fy, 0), FreeCAD.Rotation()),
+                name="Slab_X_{}".format(g)
+            )
+        else:
+            archadd.ReinforcementLinear(
+                base_y[layer], amount=amount, spacing=spacing,
+                direction=vec(1, 0, 0),
+                base_placement=FreeCAD.Placement(vec(fx, fy, 0), FreeCAD.Rotation()),
+                name="Slab_Y_{}".format(g)
+            )
+
+
+def make_wall(groups, amount, spacing=200.0, height=3000.0, width=300.0):
+    vertical = archadd.BaseRebar(
+        Draft.makeWire([vec(0, 0, 0), vec(0, 0, height)]),
+        diameter=16, mark=1, name="BaseRebar_Wall_Vertical"
+    )
+    stirrup = archadd.BaseRebar(
+        Draft.makeWire(
+            [vec(0, 0, 0), vec(1000, 0, 0), vec(1000, width, 0), vec(0, width, 0)],
+            closed=True,
+            face=False
+        ),
+        diameter=10, mark=2, name="BaseRebar_Wall_Stirrup"
+    )
+    for g in range(groups):
+        offset = vec((g // 2) * amount * spacing, (g // 2) % 2 * 5000, 0)
+        if g % 2 == 0:
+            archadd.ReinforcementLinear(
+                vertical, amount=amount, spacing=spacing,
+                direction=vec(1, 0, 0),
+                base_placement=FreeCAD.Placement(offset, FreeCAD.Rotation()),
+                name="Wall_Vertical_{}".format(g)
+            )
+        else:
+            archadd.ReinforcementLinear(
+                stirrup, amount=amount, spacing=height / amount,
+                direction=vec(0, 0, 1),
+                base_placement=FreeCAD.Placement(offset, FreeCAD.Rotation()),
+                name="Wall_Stirrup_{}".format(g)
+            )
+
+
+def make_pile(groups, amount, radius=400.0, length=10000.0):
+    longitudinal = archadd.BaseRebar(
+        Draft.makeWire([vec(radius, 0, 0), vec(radius, 0, length)]),
+        diameter=20, mark=1, name="BaseRebar_Pile_Longitudinal"
+    )
+    ring = archadd.BaseRebar(
+        Draft.makeWire(
+            [
+                vec(radius * math.cos(a), radius * math.sin(a), 0)
+                for a in (2 * math.pi * i / 16 for i in range(16))
+            ],
+            closed=True,
+            face=False
+        ),
+        diameter=10, mark=2, name="BaseRebar_Pile_Ring"
+    )
+    for g in range(groups):
+        center = vec((g // 2) % 50 * 2000, (g // 100) * 2000, 0)
+        if g % 2 == 0:
+            # rotated placements, thus a generic reinforcement
+            placements = [
+                FreeCAD.Placement(
+                    center,
+                    FreeCAD.Rotation(vec(0, 0, 1), 360.0 * i / amount)
+                )
+                for i in range(amount)
+            ]
+            archadd.ReinforcementGeneric(
+                longitudinal, placements=placements,
+                name="Pile_Longitudinal_{}".format(g)
+            )
+        else:
+            archadd.ReinforcementLinear(
+                ring, amount=amount, spacing=length / amount,
+                direction=vec(0, 0, 1),
+                base_placement=FreeCAD.Placement(center, FreeCAD.Rotation()),
+                name="Pile_Ring_{}".format(g)
+            )
+
+
+# ************************************************************************
+# measurement
+def get_memory(peak=False):
+    """returns the resident memory of this process in MB,
+    with peak the highest resident memory since the process start"""
+    key = "VmHWM:" if peak else "VmRSS:"
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(key):
+                    return int(line.split()[1]) / 1024.0
+    except (IOError, OSError):
+        pass
+    try:
+        import resource
+        # peak, kB on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    except ImportError:
+        return 0.0
+
+
+def refresh_tree(doc):
+    """returns the time of claimChildren of all objects and a Gui
+    update, 0.0 without Gui"""
+    if not FreeCAD.GuiUp:
+        return 0.0
+    start = time.perf_counter()
+    for obj in doc.Objects:
+        proxy = getattr(obj.ViewObject, "Proxy", None)
+        if proxy is not None and hasattr(proxy, "claimChildren"):
+            proxy.claimChildren()
+    FreeCADGui.updateGui()
+    return time.perf_counter() - start
+
+
+def measure_isolated(kind, bars, bars_per_reinforcement=100):
+    """measures one model in a new forked process, thus memory freed
+    by the former models does not hide the memory of this one"""
+    if (
+        FreeCAD.GuiUp
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        # forking a process with Qt and Coin threads is not safe
+        FreeCAD.Console.PrintWarning(
+            "The model is measured in this process, memory of former "
+            "models is reused, the memory scaling is not reliable.\n"
+        )
+        return measure(kind, bars, bars_per_reinforcement)
+    context = multiprocessing.get_context("fork")
+    with context.Pool(1) as pool:
+        return pool.apply(measure, (kind, bars, bars_per_reinforcement))
+
+
+def measure(kind, bars, bars_per_reinforcement=100, directory=None):
+    """builds one model and returns its measurements, memory is the
+    growth of the peak resident memory up to the end of the recompute"""
+    if directory is None:
+        directory = tempfile.gettempdir()
+    result = {"model": kind, "bars": bars}
+    memory_start = get_memory()
+
+    start = time.perf_counter()
+    doc = make_model(kind, bars, bars_per_reinforcement)
+    result["create"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc.recompute()
+    result["recompute"] = time.perf_counter() - start
+    result["memory"] = get_memory(peak=True) - memory_start
+    result["tree"] = refresh_tree(doc)
+
+    filename = os.path.join(directory, doc.Name + ".FCStd")
+    start = time.perf_counter()
+    doc.saveAs(filename)
+    result["save"] = time.perf_counter() - start
+    result["size"] = os.path.getsize(filename) / 1024.0 / 1024.0
+    FreeCAD.closeDocument(doc.Name)
+
+    start = time.perf_counter()
+    doc = FreeCAD.openDocument(filename)
+    result["load"] = time.perf_counter() - start
+    FreeCAD.closeDocument(doc.Name)
+    os.remove(filename)
+    return result
+
+
+def run(
+    scales=(1000, 10000, 100000, 1000000),
+    models=MODELS,
+    bars_per_reinforcement=100
+):
+    """measures every model at every scale, prints the table and the
+    scaling exponents, returns the list of measurements"""
+    results = []
+    for kind in models:
+        for bars in scales:
+            print("Benchmark {} with {} bars ...".format(kind, bars))
+            results.append(
+                measure_isolated(kind, bars, bars_per_reinforcement)
+            )
+    report(results)
+    return results
+
+
+def get_scaling(results):
+    """returns {(model, metric): [(bars, exponent)]}, the log-log
+    slope of each metric between two following scales"""
+    scaling = {}
+    for kind in set(r["model"] for r in results):
+        rows = sorted(
+            (r for r in results if r["model"] == kind),
+            key=lambda r: r["bars"]
+        )
+        for metric in METRICS:
+            curve = []
+            for r1, r2 in zip(rows[:-1], rows[1:]):
+                if r1[metric] > 0 and r2[metric] > 0:
+                    curve.append((
+                        r2["bars"],
+                        math.log(r2[metric] / r1[metric])
+                        / math.log(float(r2["bars"]) / r1["bars"])
+                    ))
+            scaling[(kind, metric)] = curve
+    return scaling
+
+
+def report(results):
+    print(("{:<6} {:>9}" + " {:>10}" * len(METRICS)).format(
+        "model", "bars", *METRICS
+    ))
+    for r in results:
+        print(("{:<6} {:>9}" + " {:>10.3f}" * len(METRICS)).format(
+            r["model"], r["bars"], *[r[m] for m in METRICS]
+        ))
+    print("Scaling exponents, 1.0 is linear:")
+    for (kind, metric), curve in sorted(get_scaling(results).items()):
+        if curve:
+            print("{:<6} {:<10} {}".format(
+                kind,
+                metric,
+                " ".join("{}:{:.2f}".format(b, e) for b, e in curve)
+            ))
+
+
+def export_json(results, filename):
+    scaling = get_scaling(results)
+    with open(filename, "w") as f:
+        json.dump({
+            "results": results,
+            "scaling": {
+                "{};{}".format(kind, metric): curve
+                for (kind, metric), curve in scaling.items()
+            },
+        }, f, indent=2)
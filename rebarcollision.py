@@ -0,0 +1,330 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Bars colliding with the openings and voids of their Host.
+
+Each bar is a capsule, the center line (with the fillet arcs of the
+base rebar) and the bar radius. The voids of a host are its Subtractions
+and the windows hosted by it, for windows their subtraction volume.
+
+The test runs on all straight segments of all bars at once. First the
+bounding boxes of the segments, grown by the radius, are checked against
+the bounding box of each void. The remaining segments are clipped
+against the face planes of a convex void, each plane moved outward by
+the radius (Cyrus-Beck). Near the edges of a void this is a little
+conservative, a bar closer than radius times 0.41 to an edge counts as
+collision. Voids which are not convex polyhedrons are tested with
+distToShape, but only for the segments left by the bounding boxes.
+
+Usage:
+import rebarcollision
+collisions = rebarcollision.check(suppress=True)
+
+"""
+
+__title__ = "FreeCAD rebar host collision check"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import numpy as np
+
+import FreeCAD
+
+import Draft
+import Part
+
+import rebarmesh
+from archobjects.base_rebar import get_rebar_wire
+from archobjects.reinforcement_generic import REINFORCEMENT_TYPES
+from archobjects.reinforcement_generic import get_active_bars
+from archobjects.reinforcement_generic import suppress_bars
+
+
+def check(objects=None, suppress=False, margin=0.0):
+    """check([objects], [suppress], [margin]):
+    checks the bars of the reinforcements in objects (all of the active
+    document if None) against the voids of their Host, with suppress
+    the colliding bars are added to SuppressedBars. margin is added to
+    the bar radius. Returns {reinforcement name: [bar indices]}"""
+    if objects is None:
+        objects = FreeCAD.ActiveDocument.Objects
+    reinforcements = [
+        o for o in objects
+        if Draft.getType(o) in REINFORCEMENT_TYPES
+        and o.Host is not None
+        and o.BaseRebar is not None
+    ]
+    voids = {}  # {host name: [void records]}
+    collisions = {}
+    for obj in reinforcements:
+        if obj.Host.Name not in voids:
+            voids[obj.Host.Name] = [
+                get_void(shape) for shape in get_void_shapes(obj.Host)
+            ]
+        indices = find_collisions(obj, voids[obj.Host.Name], margin)
+        if indices:
+            collisions[obj.Name] = indices
+            if suppress is True:
+                suppress_bars(obj, indices)
+    report(collisions)
+    if suppress is True and collisions:
+        FreeCAD.ActiveDocument.recompute()
+    return collisions
+
+
+def report(collisions):
+    doc = FreeCAD.ActiveDocument
+    for name, indices in sorted(collisions.items()):
+        FreeCAD.Console.PrintWarning(
+            "{}: {} bars collide with the voids of the host: {}\n"
+            .format(doc.getObject(name).Label, len(indices), indices)
+        )
+    if not collisions:
+        print("No bar collides with the voids of its host.")
+
+
+def get_void_shapes(host):
+    """returns the solids of the subtractions of host and of the
+    windows hosted by host"""
+    subtractions = list(getattr(host, "Subtractions", []))
+    for o in host.InList:
+        if host in getattr(o, "Hosts", []) and o not in subtractions:
+            subtractions.append(o)
+    solids = []
+    for o in subtractions:
+        shape = None
+        if hasattr(o, "Proxy") and hasattr(o.Proxy, "getSubVolume"):
+            # windows and doors, the volume cut out of the host
+            shape = o.Proxy.getSubVolume(o)
+        elif hasattr(o, "Shape"):
+            shape = o.Shape
+        if shape is not None and not shape.isNull():
+            solids.extend(shape.Solids)
+    return solids
+
+
+def get_void(solid):
+    """returns a dict record of the void solid, its bounding box and
+    the face planes if it is a convex polyhedron"""
+    bb = solid.BoundBox
+    return {
+        "solid": solid,
+        "bbox": np.array([
+            bb.XMin, bb.YMin, bb.ZMin,
+            bb.XMax, bb.YMax, bb.ZMax
+        ]),
+        "planes": get_convex_planes(solid),
+    }
+
+
+def get_convex_planes(solid):
+    """returns the outward normals (f, 3) and the offsets (f,) of the
+    face planes of solid, n . x <= offset inside, or None if solid is
+    not a convex polyhedron"""
+    center = np.array(tuple(solid.CenterOfMass))
+    vertexes = np.array([tuple(v.Point) for v in solid.Vertexes])
+    normals = []
+    offsets = []
+    for face in solid.Faces:
+        if face.Surface.TypeId != "Part::GeomPlane":
+            return None
+        normal = np.array(tuple(face.Surface.Axis))
+        offset = normal @ np.array(tuple(face.Vertexes[0].Point))
+        if normal @ center > offset:
+            normal = -normal
+            offset = -offset
+        # convex if no vertex is outside of any face plane
+        if np.any(vertexes @ normal > offset + 1e-6):
+            return None
+        normals.append(normal)
+        offsets.append(offset)
+    return np.array(normals), np.array(offsets)
+
+
+def find_collisions(obj, voids, margin=0.0):
+    """returns the sorted indices of the not suppressed bars of the
+    reinforcement obj colliding with the void records voids"""
+    if not voids:
+        return []
+    bars, p0, p1 = get_bar_segments(obj)
+    # suppressed bars are not reported again
+    active = np.isin(bars, list(get_active_bars(obj)))
+    bars, p0, p1 = bars[active], p0[active], p1[active]
+    if not len(bars):
+        return []
+    radius = obj.BaseRebar.Diameter.Value / 2.0 + margin
+    hits = np.zeros(len(bars), dtype=bool)
+    seg_min = np.minimum(p0, p1) - radius
+    seg_max = np.maximum(p0, p1) + radius
+    for void in voids:
+        bb = void["bbox"]
+        candidates = np.flatnonzero(
+            ~hits
+            & np.all(seg_max >= bb[:3], axis=1)
+            & np.all(seg_min <= bb[3:], axis=1)
+        )
+        if not len(candidates):
+            continue
+        if void["planes"] is not None:
+            normals, offsets = void["planes"]
+            inside = clip_segments(
+                p0[candidates],
+                p1[candidates],
+                normals,
+                offsets + radius
+            )
+            hits[candidates[inside]] = True
+        else:
+            solid = void["solid"]
+            for k in candidates:
+                if (p1[k] - p0[k]).any():
+                    edge = Part.LineSegment(
+                        FreeCAD.Vector(*p0[k]),
+                        FreeCAD.Vector(*p1[k])
+                    ).toShape()
+                else:
+                    edge = Part.Vertex(FreeCAD.Vector(*p0[k]))
+                if edge.distToShape(solid)[0] <= radius:
+                    hits[k] = True
+    return sorted(set(bars[hits].tolist()))
+
+
+def clip_segments(p0, p1, normals, offsets):
+    """returns for each segment p0 p1 (m, 3) if a part of it is inside
+    of the convex polyhedron n . x <= offset, normals (f, 3), offsets (f,),
+    all segments and planes at once (Cyrus-Beck)"""
+    d = p1 - p0
+    denom = d @ normals.T  # (m, f)
+    num = offsets[None, :] - p0 @ normals.T
+    parallel = np.abs(denom) < 1e-12
+    t = num / np.where(parallel, 1.0, denom)
+    # entering where the segment runs against the normal
+    t_enter = np.max(np.where(denom < 0, t, 0.0), axis=1, initial=0.0)
+    t_exit = np.min(np.where(denom > 0, t, 1.0), axis=1, initial=1.0)
+    outside = np.any(parallel & (num < 0), axis=1)
+    return ~outside & (t_enter <= t_exit)
+
+
+def get_bar_segments(obj):
+    """returns the bar index (m,), start (m, 3) and end (m, 3) of all
+    straight segments of the center lines of all bars of the
+    reinforcement obj in global coordinates"""
+    groups = get_center_line_groups(obj)
+    bars = []
+    starts = []
+    ends = []
+    for line, indices in groups:
+        rotations, translations = get_bar_transforms(obj, indices)
+        points = (
+            np.einsum("nij,kj->nki", rotations, line)
+            + translations[:, None, :]
+        )  # (n, k, 3)
+        count = len(line) - 1
+        bars.append(np.repeat(indices, count))
+        starts.append(points[:, :-1].reshape(-1, 3))
+        ends.append(points[:, 1:].reshape(-1, 3))
+    if not bars:
+        return np.zeros(0, dtype=int), np.zeros((0, 3)), np.zeros((0, 3))
+    return np.concatenate(bars), np.concatenate(starts), np.concatenate(ends)
+
+
+def get_center_line_groups(obj):
+    """returns [(center line points (k, 3), bar indices (n,))] of the
+    bars of the reinforcement obj, bars with the same center line in
+    their own coordinates are in one group"""
+    base = obj.BaseRebar
+    diameter = base.Diameter.Value
+    fillet_radius = getattr(base, "Rounding", 0.0) * diameter
+    count = len(obj.RebarPlacements)
+    if hasattr(obj.Proxy, "get_bar_wires"):
+        # variable reinforcement, the bars share wires
+        groups = {}
+        for i, wire in enumerate(obj.Proxy.get_bar_wires(obj)):
+            groups.setdefault(wire.hashCode(), (wire, []))[1].append(i)
+        return [
+            (
+                rebarmesh.wire_center_line(wire, fillet_radius),
+                np.array(indices)
+            )
+            for wire, indices in groups.values()
+        ]
+    if getattr(obj, "BarLengths", None):
+        # grid reinforcement, straight bars along x
+        groups = {}
+        for i, length in enumerate(obj.BarLengths):
+            groups.setdefault(round(length, 3), []).append(i)
+        return [
+            (
+                np.array([[0.0, 0.0, 0.0], [length, 0.0, 0.0]]),
+                np.array(indices)
+            )
+            for length, indices in groups.items()
+        ]
+    if not base.Base or not base.Base.Shape.Edges or not count:
+        return []
+    line = rebarmesh.wire_center_line(
+        get_rebar_wire(base.Base.Shape),
+        fillet_radius
+    )
+    return [(line, np.arange(count))]
+
+
+def get_bar_transforms(obj, indices):
+    """returns the rotation matrices (n, 3, 3) and translations (n, 3)
+    of the bars indices of the reinforcement obj, from the coordinates
+    of the base rebar wire to global coordinates, see build_shape"""
+    # grid and variable reinforcements place their bars without
+    # the BasePlacement, see their build_shape
+    if Draft.getType(obj) in ("ReinforcementGrid", "ReinforcementVariable"):
+        base_placement = FreeCAD.Placement()
+    else:
+        base_placement = obj.BasePlacement
+    placements = obj.RebarPlacements
+    quaternions = []
+    translations = []
+    for i in indices:
+        pl = obj.Placement.multiply(placements[i]).multiply(base_placement)
+        quaternions.append(pl.Rotation.Q)
+        translations.append(tuple(pl.Base))
+    return quaternion_matrices(np.array(quaternions)), np.array(translations)
+
+
+def quaternion_matrices(q):
+    """returns the rotation matrices (n, 3, 3) of quaternions (n, 4) xyzw"""
+    x, y, z, w = q.T
+    return np.stack([
+        np.stack([
+            1 - 2 * (y * y + z * z),
+            2 * (x * y - z * w),
+            2 * (x * z + y * w)
+        ], axis=-1),
+        np.stack([
+            2 * (x * y + z * w),
+            1 - 2 * (x * x + z * z),
+            2 * (y * z - x * w)
+        ], axis=-1),
+        np.stack([
+            2 * (x * z - y * w),
+            2 * (y * z + x * w),
+            1 - 2 * (x * x + y * y)
+        ], axis=-1),
+    ], axis=1)
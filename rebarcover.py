@@ -0,0 +1,401 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Concrete cover of the bars against the faces of their Host.
+
+The center line of every bar is sampled, the same center lines the
+collision check uses, see rebarcollision.get_bar_segments. The faces of
+the host are tessellated once per host with outward triangle normals.
+The triangles are sorted into a uniform grid of cells of the search
+distance size, thus a sample point is only tested against the triangles
+of its own and the 26 neighbouring cells. The distances of all points of
+one cell to all its triangles are computed at once.
+
+The cover is the distance of the center line to the nearest face minus
+the bar radius. A point outside of the host gets a negative distance,
+the side is taken from the normal of the nearest triangle. Points
+farther than the search distance from all faces are tested with
+isInside, once per cell if no face is around the cell. Inside they get
+an infinite cover, outside a negative infinite cover, a violation.
+
+Usage:
+import rebarcover
+results = rebarcover.check(required=30)
+
+"""
+
+__title__ = "FreeCAD rebar concrete cover check"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import math
+
+import numpy as np
+
+import FreeCAD
+
+import Draft
+
+from archobjects.reinforcement_generic import REINFORCEMENT_TYPES
+from archobjects.reinforcement_generic import get_active_bars
+from rebarcollision import get_bar_segments
+
+
+def check(
+    objects=None,
+    required=None,
+    step=50.0,
+    tolerance=1.0,
+    search_distance=None
+):
+    """check([objects], [required], [step], [tolerance], [search_distance]):
+    checks the concrete cover of the bars of the reinforcements in
+    objects (all of the active document if None) against the faces of
+    their Host. required is the minimal cover in mm, the preference
+    RebarRequiredCover if None. The center lines are sampled every step
+    mm, the host is tessellated with tolerance mm. Returns
+    {reinforcement name: result record}, see get_cover"""
+    if objects is None:
+        objects = FreeCAD.ActiveDocument.Objects
+    if required is None:
+        p = FreeCAD.ParamGet("User parameter:BaseApp/Preferences/Mod/Arch")
+        required = p.GetFloat("RebarRequiredCover", 30.0)
+    if search_distance is None:
+        search_distance = max(2.0 * required, 100.0)
+    reinforcements = [
+        o for o in objects
+        if Draft.getType(o) in REINFORCEMENT_TYPES
+        and o.Host is not None
+        and o.BaseRebar is not None
+    ]
+    hosts = {}  # {host name: HostFaces}
+    results = {}
+    for obj in reinforcements:
+        if obj.Host.Name not in hosts:
+            hosts[obj.Host.Name] = HostFaces(
+                obj.Host.Shape,
+                search_distance,
+                tolerance
+            )
+        results[obj.Name] = get_cover(
+            obj,
+            hosts[obj.Host.Name],
+            required,
+            step
+        )
+    report(results, required)
+    highlight(results)
+    return results
+
+
+def get_cover(obj, host_faces, required, step=50.0):
+    """returns the result record of the reinforcement obj:
+    min_cover : the minimal cover of all bars
+    bar_cover : {bar index: minimal cover of the bar}
+    violations : bar indices with a cover smaller than required"""
+    bars, p0, p1 = get_bar_segments(obj)
+    active = np.isin(bars, list(get_active_bars(obj)))
+    bars, p0, p1 = bars[active], p0[active], p1[active]
+    radius = obj.BaseRebar.Diameter.Value / 2.0
+    points, point_bars = sample_segments(bars, p0, p1, step)
+    cover = host_faces.signed_distances(points) - radius
+    # minimum per bar
+    bar_ids, inverse = np.unique(point_bars, return_inverse=True)
+    bar_min = np.full(len(bar_ids), np.inf)
+    np.minimum.at(bar_min, inverse, cover)
+    bar_cover = dict(zip(bar_ids.tolist(), bar_min.tolist()))
+    return {
+        "min_cover": float(bar_min.min()) if len(bar_min) else math.inf,
+        "bar_cover": bar_cover,
+        "violations": bar_ids[bar_min < required].tolist(),
+    }
+
+
+def sample_segments(bars, p0, p1, step):
+    """returns points (n, 3) every step along the segments p0 p1 (m, 3)
+    including their ends and the bar index of each point"""
+    lengths = np.linalg.norm(p1 - p0, axis=1)
+    counts = np.maximum(1, np.ceil(lengths / step).astype(int)) + 1
+    segment = np.repeat(np.arange(len(bars)), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    t = (np.arange(counts.sum()) - first) / (counts[segment] - 1)
+    points = p0[segment] + t[:, None] * (p1 - p0)[segment]
+    return points, bars[segment]
+
+
+def report(results, required):
+    doc = FreeCAD.ActiveDocument
+    violated = 0
+    for name, result in sorted(results.items()):
+        if not result["violations"]:
+            continue
+        violated += 1
+        worst = sorted(
+            result["violations"],
+            key=lambda i: result["bar_cover"][i]
+        )
+        FreeCAD.Console.PrintWarning(
+            "{}: {} bars with a cover smaller than {} mm, "
+            "minimal cover {:.1f} mm, bars {}\n"
+            .format(
+                doc.getObject(name).Label,
+                len(worst),
+                required,
+                result["min_cover"],
+                worst
+            )
+        )
+    print(
+        "{} of {} reinforcements with a cover smaller than {} mm"
+        .format(violated, len(results), required)
+    )
+
+
+def highlight(results):
+    """selects the reinforcements with cover violations"""
+    if not FreeCAD.GuiUp:
+        return
+    import FreeCADGui
+    FreeCADGui.Selection.clearSelection()
+    doc = FreeCAD.ActiveDocument
+    for name, result in results.items():
+        if result["violations"]:
+            FreeCADGui.Selection.addSelection(doc.getObject(name))
+
+
+class HostFaces(object):
+
+    """
+    The tessellated faces of a host shape in a uniform grid of cells,
+    the triangle normals point out of the host
+    """
+
+    def __init__(self, shape, cell_size, tolerance=1.0):
+        self.host_shape = shape
+        self.cell_size = float(cell_size)
+        self.triangles, self.normals = tessellate_faces(shape, tolerance)
+        self.build_grid()
+
+    def build_grid(self):
+        """sorts the triangles into all cells their bounding box touches,
+        cell_triangles holds the triangle indices sorted by cell key"""
+        tri = self.triangles
+        if not len(tri):
+            self.origin = np.zeros(3)
+            self.shape = np.ones(3, dtype=np.int64)
+            self.keys = np.zeros(0, dtype=np.int64)
+            self.starts = np.zeros(0, dtype=np.int64)
+            self.ends = np.zeros(0, dtype=np.int64)
+            self.cell_triangles = np.zeros(0, dtype=np.int64)
+            return
+        self.origin = tri.reshape(-1, 3).min(axis=0)
+        low = self.cell_index(tri.min(axis=1))
+        high = self.cell_index(tri.max(axis=1))
+        self.shape = high.max(axis=0) + 1
+        span = high - low + 1
+        counts = span.prod(axis=1)
+        triangle = np.repeat(np.arange(len(tri)), counts)
+        local = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts,
+            counts
+        )
+        sx = span[triangle, 0]
+        sy = span[triangle, 1]
+        cells = low[triangle] + np.stack([
+            local % sx,
+            (local // sx) % sy,
+            local // (sx * sy)
+        ], axis=1)
+        keys = self.cell_key(cells)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self.cell_triangles = triangle[order]
+        self.keys, self.starts = np.unique(keys, return_index=True)
+        self.ends = np.append(self.starts[1:], len(keys))
+
+    def cell_index(self, points):
+        return np.floor((points - self.origin) / self.cell_size).astype(
+            np.int64
+        )
+
+    def cell_key(self, cells):
+        return (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] \
+            + cells[:, 2]
+
+    def get_candidates(self, cell):
+        """returns the triangle indices in the cell (3,) and in its
+        neighbour cells"""
+        offsets = np.stack(np.meshgrid(
+            [-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing="ij"
+        ), axis=-1).reshape(-1, 3)
+        cells = cell[None, :] + offsets
+        valid = np.all((cells >= 0) & (cells < self.shape), axis=1)
+        keys = self.cell_key(cells[valid])
+        pos = np.searchsorted(self.keys, keys)
+        pos = pos[pos < len(self.keys)]
+        pos = pos[np.isin(self.keys[pos], keys)]
+        if not len(pos):
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate([
+            self.cell_triangles[s:e]
+            for s, e in zip(self.starts[pos], self.ends[pos])
+        ]))
+
+    def signed_distances(self, points):
+        """returns the distance (n,) of each point to the nearest face,
+        negative outside of the host. Points with no face within the
+        cell size get inf inside and -inf outside of the host"""
+        result = np.full(len(points), np.inf)
+        if not len(points):
+            return result
+        cells = self.cell_index(points)
+        unique_cells, inverse = np.unique(cells, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(
+            inverse[order],
+            np.arange(len(unique_cells) + 1)
+        )
+        for c, cell in enumerate(unique_cells):
+            candidates = self.get_candidates(cell)
+            index = order[bounds[c]:bounds[c + 1]]
+            if not len(candidates):
+                # no face in and around the cell, all its points are
+                # on the same side of the host
+                result[index] = self.far_distance(points[index[0]])
+                continue
+            tri = self.triangles[candidates]
+            p = points[index]
+            closest = closest_points_on_triangles(
+                p, tri[:, 0], tri[:, 1], tri[:, 2]
+            )  # (p, t, 3)
+            delta = p[:, None, :] - closest
+            dist = np.linalg.norm(delta, axis=2)
+            side = np.einsum("ptk,tk->pt", delta, self.normals[candidates])
+            # nearest triangle, on an edge or a corner the one the point
+            # is most clearly in front of or behind decides the side
+            nearest = dist <= dist.min(axis=1, keepdims=True) + 1e-6
+            score = np.where(nearest, np.abs(side), -1.0)
+            best = score.argmax(axis=1)
+            rows = np.arange(len(index))
+            signed = dist[rows, best] * np.where(
+                side[rows, best] < 0, 1.0, -1.0
+            )
+            within = dist[rows, best] <= self.cell_size
+            result[index[within]] = signed[within]
+            for i in index[~within]:
+                result[i] = self.far_distance(points[i])
+        return result
+
+    def far_distance(self, point):
+        """returns inf if point is inside of the host, else -inf,
+        for points farther than the cell size from all faces"""
+        if self.host_shape.isInside(FreeCAD.Vector(*point), 1e-6, True):
+            return np.inf
+        return -np.inf
+
+
+def tessellate_faces(shape, tolerance=1.0):
+    """returns the triangles (t, 3, 3) of the faces of shape and their
+    unit normals (t, 3) pointing out of the shape"""
+    triangles = []
+    normals = []
+    for face in shape.Faces:
+        points, facets = face.tessellate(tolerance)
+        if not facets:
+            continue
+        points = np.array([tuple(p) for p in points])
+        tri = points[np.array(facets)]
+        normal = np.cross(tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0])
+        length = np.linalg.norm(normal, axis=1)
+        keep = length > 1e-12
+        tri, normal = tri[keep], normal[keep] / length[keep][:, None]
+        if not len(tri):
+            continue
+        # the face normal respects the orientation of the face
+        center = tri[0].mean(axis=0)
+        u, v = face.Surface.parameter(FreeCAD.Vector(*center))
+        if normal[0] @ np.array(tuple(face.normalAt(u, v))) < 0:
+            tri = tri[:, ::-1]
+            normal = -normal
+        triangles.append(tri)
+        normals.append(normal)
+    if not triangles:
+        return np.zeros((0, 3, 3)), np.zeros((0, 3))
+    return np.concatenate(triangles), np.concatenate(normals)
+
+
+def closest_points_on_triangles(points, a, b, c):
+    """returns the closest points (p, t, 3) on the triangles a b c (t, 3)
+    to the points (p, 3), all pairs at once (Ericson, Real-Time Collision
+    Detection, 5.1.5)"""
+    p = points[:, None, :]
+    ab = (b - a)[None, :, :]
+    ac = (c - a)[None, :, :]
+    ap = p - a[None, :, :]
+    bp = p - b[None, :, :]
+    cp = p - c[None, :, :]
+    d1 = np.sum(ab * ap, axis=2)
+    d2 = np.sum(ac * ap, axis=2)
+    d3 = np.sum(ab * bp, axis=2)
+    d4 = np.sum(ac * bp, axis=2)
+    d5 = np.sum(ab * cp, axis=2)
+    d6 = np.sum(ac * cp, axis=2)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # inside of the face
+        denom = va + vb + vc
+        v = vb / denom
+        w = vc / denom
+        result = a[None] + ab * v[..., None] + ac * w[..., None]
+        # the regions are tested in reverse order, the first one wins
+        w_bc = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        region = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        result = np.where(
+            region[..., None],
+            b[None] + (c - b)[None] * w_bc[..., None],
+            result
+        )
+        w_ac = d2 / (d2 - d6)
+        region = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        result = np.where(
+            region[..., None],
+            a[None] + ac * w_ac[..., None],
+            result
+        )
+    region = (d6 >= 0) & (d5 <= d6)
+    result = np.where(region[..., None], c[None], result)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        v_ab = d1 / (d1 - d3)
+        region = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        result = np.where(
+            region[..., None],
+            a[None] + ab * v_ab[..., None],
+            result
+        )
+    region = (d3 >= 0) & (d4 <= d3)
+    result = np.where(region[..., None], b[None], result)
+    region = (d1 <= 0) & (d2 <= 0)
+    result = np.where(region[..., None], a[None], result)
+    return result
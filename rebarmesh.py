@@ -0,0 +1,264 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Analytic tube mesh of a base rebar.
+
+A rebar is a circle swept along straight lines and fillet arcs. The
+triangulation is computed directly out of the wire, the Diameter and
+the Rounding of a base rebar, without makePipeShell and without the
+tessellation of OCC. The tube is closed by a cap on both ends and all
+triangles share their vertices, thus the mesh is watertight.
+
+The rings of the tube are oriented by a rotation minimizing frame along
+the center line. At sharp corners (no Rounding) the ring lies in the
+miter plane, thus the straight parts keep their exact circle.
+
+"""
+
+__title__ = "FreeCAD rebar tube mesh"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import math
+
+import numpy as np
+
+import Part
+
+
+def base_rebar_mesh(base, radial_segments=12, bend_segments=8):
+    """returns points (n, 3) and triangles (m, 3) of the tube of the
+    base rebar obj base, in the coordinates of its wire, like the
+    shape of the base rebar without its Placement
+
+    radial_segments : segments around the circle
+    bend_segments : segments of a bend of 90 degree, the segment count
+        of other bends is proportional to their angle
+    """
+    if not base.Base or not base.Base.Shape.Edges:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+    shape = base.Base.Shape
+    if not shape.Wires and len(shape.Edges) == 1:
+        wire = Part.Wire(shape.Edges[0])
+    else:
+        wire = shape.Wires[0]
+    diameter = base.Diameter.Value
+    fillet_radius = 0.0
+    if getattr(base, "Rounding", 0.0):
+        fillet_radius = base.Rounding * diameter
+    return tube_mesh(
+        wire_center_line(wire, fillet_radius, bend_segments),
+        diameter / 2.0,
+        radial_segments
+    )
+
+
+def to_mesh(points, triangles):
+    """returns a Mesh.Mesh out of points and triangles"""
+    import Mesh
+    # every three points are one facet
+    return Mesh.Mesh(points[triangles].reshape(-1, 3).tolist())
+
+
+def wire_center_line(wire, fillet_radius=0.0, bend_segments=8):
+    """returns the points (n, 3) of the center line of wire,
+    curved edges are discretized, the corners between two straight
+    edges get a fillet arc of fillet_radius like filletWire does"""
+    edges = wire.OrderedEdges
+    vertexes = [v.Point for v in wire.OrderedVertexes]
+    if wire.isClosed():
+        vertexes.append(vertexes[0])
+    points = [vertexes[0]]
+    corners = []  # indices of the points between two straight edges
+    for i, edge in enumerate(edges):
+        start = vertexes[i]
+        end = vertexes[i + 1]
+        if edge.Curve.TypeId == "Part::GeomLine":
+            if i > 0 and edges[i - 1].Curve.TypeId == "Part::GeomLine":
+                corners.append(len(points) - 1)
+            points.append(end)
+            continue
+        # the bigger the bend the more segments
+        radius = getattr(edge.Curve, "Radius", edge.Length)
+        count = segment_count(edge.Length / radius, bend_segments)
+        pts = edge.discretize(count + 1)
+        if (pts[0] - start).Length > (pts[-1] - start).Length:
+            pts.reverse()
+        points.extend(pts[1:-1])
+        points.append(end)
+    points = np.array([[p.x, p.y, p.z] for p in points], dtype=float)
+    if fillet_radius > 0 and corners:
+        points = fillet_corners(
+            points,
+            np.array(corners),
+            fillet_radius,
+            bend_segments
+        )
+    return points
+
+
+def segment_count(angle, bend_segments):
+    """segments of a bend of angle, bend_segments for 90 degree"""
+    return max(1, int(math.ceil(bend_segments * angle / (0.5 * math.pi))))
+
+
+def normalized(vectors):
+    length = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    length[length == 0] = 1.0
+    return vectors / length
+
+
+def fillet_corners(points, corners, radius, bend_segments=8):
+    """returns points with the corner points at the indices corners
+    replaced by arcs of radius, all corners are computed at once.
+    The radius is reduced if the neighbouring edges are too short."""
+    prev = points[corners - 1]
+    cur = points[corners]
+    nxt = points[corners + 1]
+    d1 = normalized(cur - prev)
+    d2 = normalized(nxt - cur)
+    # turn angle at the corners
+    theta = np.arccos(np.clip(np.sum(d1 * d2, axis=1), -1.0, 1.0))
+    valid = (theta > 1e-6) & (theta < math.pi - 1e-6)
+    if not np.any(valid):
+        return points
+    corners, prev, cur, nxt, d1, d2, theta = (
+        a[valid] for a in (corners, prev, cur, nxt, d1, d2, theta)
+    )
+    # distance corner to tangent points, at most half of the edges
+    tan_half = np.tan(0.5 * theta)
+    t = np.minimum(
+        radius * tan_half,
+        0.5 * np.minimum(
+            np.linalg.norm(cur - prev, axis=1),
+            np.linalg.norm(nxt - cur, axis=1)
+        )
+    )
+    r = t / tan_half
+    center = cur + normalized(d2 - d1) * (r / np.cos(0.5 * theta))[:, None]
+    a = cur - d1 * t[:, None] - center
+    b = cur + d2 * t[:, None] - center
+    # slerp between a and b, the same segment count for all corners
+    count = segment_count(theta.max(), bend_segments)
+    s = np.linspace(0.0, 1.0, count + 1)
+    sin_theta = np.sin(theta)[:, None]
+    wa = np.sin(np.outer(theta, 1.0 - s)) / sin_theta
+    wb = np.sin(np.outer(theta, s)) / sin_theta
+    arcs = (
+        wa[:, :, None] * a[:, None, :]
+        + wb[:, :, None] * b[:, None, :]
+        + center[:, None, :]
+    )
+    parts = []
+    last = 0
+    for corner, arc in zip(corners, arcs):
+        parts.append(points[last:corner])
+        parts.append(arc)
+        last = corner + 1
+    parts.append(points[last:])
+    return np.concatenate(parts)
+
+
+def tube_mesh(center_line, radius, radial_segments=12):
+    """returns points (n, 3) and triangles (m, 3) of a closed tube
+    of radius along the center_line points (k, 3)"""
+    center_line = np.asarray(center_line, dtype=float)
+    # no zero length segments
+    keep = np.ones(len(center_line), dtype=bool)
+    keep[1:] = np.linalg.norm(np.diff(center_line, axis=0), axis=1) > 1e-9
+    center_line = center_line[keep]
+    n = len(center_line)
+    m = radial_segments
+    if n < 2:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int64)
+    directions = normalized(np.diff(center_line, axis=0))
+
+    # rotation minimizing frame, u is carried along the segments
+    u = np.cross(directions[0], [0.0, 0.0, 1.0])
+    if np.linalg.norm(u) < 1e-6:
+        u = np.cross(directions[0], [1.0, 0.0, 0.0])
+    u = u / np.linalg.norm(u)
+    us = np.empty_like(directions)
+    us[0] = u
+    for k in range(1, len(directions)):
+        axis = np.cross(directions[k - 1], directions[k])
+        sin = np.linalg.norm(axis)
+        if sin > 1e-12:
+            axis = axis / sin
+            cos = np.dot(directions[k - 1], directions[k])
+            u = (
+                u * cos
+                + np.cross(axis, u) * sin
+                + axis * np.dot(axis, u) * (1.0 - cos)
+            )
+            u = u - directions[k] * np.dot(directions[k], u)
+            u = u / np.linalg.norm(u)
+        us[k] = u
+    vs = np.cross(directions, us)
+
+    # circle of each segment (n - 1, m, 3)
+    phi = np.linspace(0.0, 2.0 * math.pi, m, endpoint=False)
+    circles = (
+        np.cos(phi)[None, :, None] * us[:, None, :]
+        + np.sin(phi)[None, :, None] * vs[:, None, :]
+    )
+    rings = np.empty((n, m, 3))
+    rings[0] = circles[0]
+    rings[-1] = circles[-1]
+    if n > 2:
+        # the circle of the previous segment cut by the miter plane
+        d_prev = directions[:-1]
+        miter = normalized(d_prev + directions[1:])
+        c = circles[:-1]
+        shift = -np.einsum("kmi,ki->km", c, miter) / np.einsum(
+            "ki,ki->k", d_prev, miter
+        )[:, None]
+        rings[1:-1] = c + shift[:, :, None] * d_prev[:, None, :]
+    points = center_line[:, None, :] + radius * rings
+    points = np.concatenate([
+        points.reshape(-1, 3),
+        center_line[[0, -1]]
+    ])
+
+    # side quads, two triangles each, outward oriented
+    i = np.arange(n - 1)[:, None]
+    j = np.arange(m)[None, :]
+    a = i * m + j
+    b = i * m + (j + 1) % m
+    c = (i + 1) * m + (j + 1) % m
+    d = (i + 1) * m + j
+    sides = np.concatenate([
+        np.stack([a, b, c], axis=-1).reshape(-1, 3),
+        np.stack([a, c, d], axis=-1).reshape(-1, 3),
+    ])
+    # caps
+    start_center = n * m
+    end_center = n * m + 1
+    j = np.arange(m)
+    start_cap = np.stack([
+        np.full(m, start_center), (j + 1) % m, j
+    ], axis=-1)
+    end_cap = np.stack([
+        np.full(m, end_center), (n - 1) * m + j, (n - 1) * m + (j + 1) % m
+    ], axis=-1)
+    triangles = np.concatenate([sides, start_cap, end_cap]).astype(np.int64)
+    return points, triangles
@@ -0,0 +1,273 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Opt-in profiler for the recompute of rebar objects.
+
+enable() wraps the methods of the rebar classes which do the work,
+disable() restores them, thus there is no overhead if not profiled.
+Wall time and call count are recorded per object and per phase. The
+phases are nested, the execute of a reinforcement contains its
+build_shape, the rest of the execute is the placement generation.
+Every subclass of ReinforcementGeneric in archobjects is wrapped, thus
+new reinforcement types are profiled without changes here.
+
+Phases:
+execute : execute of base rebars and reinforcements
+length : get_rebar_length in BaseRebar.execute
+make_rebar_shape : fillet and sweep in BaseRebar.execute
+fillet : filletWire in make_rebar_shape
+build_shape : copies and compound in the reinforcements
+updateData : view provider updates, only with Gui
+
+Usage:
+import rebarprofiler
+rebarprofiler.enable()
+App.ActiveDocument.recompute()
+rebarprofiler.disable()
+rebarprofiler.report()
+rebarprofiler.export_json("/tmp/recompute.json")
+rebarprofiler.export_folded("/tmp/recompute.folded")
+
+The folded file is the input of flamegraph.pl or speedscope.
+
+"""
+
+__title__ = "FreeCAD rebar recompute profiler"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import functools
+import importlib
+import json
+import pkgutil
+import time
+
+import FreeCAD
+
+
+# {(object name, phase path): [wall time, calls]}
+_records = {}
+# {object name: {"label", "type", "bars", "faces"}}
+_objects = {}
+# the running phases, (object name, phase)
+_stack = []
+# (owner, attribute name, original)
+_patched = []
+
+
+def is_enabled():
+    return bool(_patched)
+
+
+def enable():
+    """wraps the rebar methods, the records are kept, see reset"""
+    if _patched:
+        return
+    import archobjects
+    from archobjects import base_rebar
+    from archobjects import reinforcement_generic
+    # the subclasses are known after their modules are imported
+    for module in pkgutil.iter_modules(archobjects.__path__):
+        importlib.import_module("archobjects." + module.name)
+
+    _patch_method(base_rebar.BaseRebar, "execute")
+    _patch_function(base_rebar, "get_rebar_length", "length")
+    _patch_function(base_rebar, "make_rebar_shape", "make_rebar_shape")
+    _patch_function(base_rebar, "filletWire", "fillet")
+    for cls in get_subclasses(reinforcement_generic.ReinforcementGeneric):
+        # only the methods the class defines itself are patched
+        _patch_method(cls, "execute")
+        _patch_method(cls, "build_shape")
+    if FreeCAD.GuiUp:
+        from archviewproviders import view_rebar_generic
+        _patch_method(
+            view_rebar_generic.ViewProviderRebarCommon,
+            "updateData"
+        )
+
+
+def get_subclasses(cls):
+    """returns cls and all its subclasses"""
+    classes = [cls]
+    for sub in cls.__subclasses__():
+        for c in get_subclasses(sub):
+            if c not in classes:
+                classes.append(c)
+    return classes
+
+
+def disable():
+    """restores the original methods"""
+    while _patched:
+        owner, name, original = _patched.pop()
+        setattr(owner, name, original)
+
+
+def reset():
+    _records.clear()
+    _objects.clear()
+
+
+def _patch_method(cls, name):
+    # only methods defined in the class itself
+    if name not in cls.__dict__:
+        return
+    original = cls.__dict__[name]
+
+    @functools.wraps(original)
+    def wrapper(self, obj, *args, **kwargs):
+        start = _enter(obj, name)
+        try:
+            return original(self, obj, *args, **kwargs)
+        finally:
+            _leave(start)
+            if name == "execute":
+                _set_shape_size(obj)
+
+    setattr(cls, name, wrapper)
+    _patched.append((cls, name, original))
+
+
+def _patch_function(module, name, phase):
+    original = getattr(module, name)
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        # the object is the one of the running phase
+        obj_name = _stack[-1][0] if _stack else None
+        start = _enter(obj_name, phase)
+        try:
+            return original(*args, **kwargs)
+        finally:
+            _leave(start)
+
+    setattr(module, name, wrapper)
+    _patched.append((module, name, original))
+
+
+def _enter(obj, phase):
+    if obj is not None and not isinstance(obj, str):
+        # view provider methods get the object too
+        if obj.Name not in _objects:
+            _objects[obj.Name] = {
+                "label": obj.Label,
+                "type": getattr(getattr(obj, "Proxy", None), "Type", ""),
+                "bars": 0,
+                "faces": 0,
+            }
+        obj = obj.Name
+    _stack.append((obj, phase))
+    return time.perf_counter()
+
+
+def _leave(start):
+    elapsed = time.perf_counter() - start
+    obj_name = _stack[-1][0]
+    path = tuple(phase for name, phase in _stack if name == obj_name)
+    _stack.pop()
+    record = _records.setdefault((obj_name, path), [0.0, 0])
+    record[0] += elapsed
+    record[1] += 1
+
+
+def _set_shape_size(obj):
+    info = _objects.get(obj.Name)
+    if info is None:
+        return
+    info["bars"] = getattr(obj, "Amount", 1) or 1
+    info["faces"] = len(obj.Shape.Faces) if hasattr(obj, "Shape") else 0
+
+
+def get_records():
+    """returns a list of dictionaries, one per object and phase path,
+    sorted by wall time, self_time is without the nested phases"""
+    child_times = {}
+    for (obj_name, path), (wall, calls) in _records.items():
+        if len(path) > 1:
+            parent = (obj_name, path[:-1])
+            child_times[parent] = child_times.get(parent, 0.0) + wall
+    records = []
+    for (obj_name, path), (wall, calls) in _records.items():
+        info = _objects.get(obj_name, {})
+        records.append({
+            "object": obj_name,
+            "label": info.get("label", ""),
+            "type": info.get("type", ""),
+            "phase": ";".join(path),
+            "time": wall,
+            "self_time": wall - child_times.get((obj_name, path), 0.0),
+            "calls": calls,
+            "bars": info.get("bars", 0),
+            "faces": info.get("faces", 0),
+        })
+    records.sort(key=lambda r: r["time"], reverse=True)
+    return records
+
+
+def get_object_times():
+    """returns {object name: wall time} of the outermost phases"""
+    times = {}
+    for (obj_name, path), (wall, calls) in _records.items():
+        if len(path) == 1:
+            times[obj_name] = times.get(obj_name, 0.0) + wall
+    return times
+
+
+def report(top=20):
+    """prints the top slowest object phases"""
+    print(
+        "{:<30} {:<20} {:>10} {:>10} {:>6} {:>8} {:>8}".format(
+            "object", "phase", "time s", "self s", "calls", "bars", "faces"
+        )
+    )
+    for r in get_records()[:top]:
+        print(
+            "{:<30} {:<20} {:>10.4f} {:>10.4f} {:>6} {:>8} {:>8}".format(
+                r["label"][:30], r["phase"][-20:], r["time"],
+                r["self_time"], r["calls"], r["bars"], r["faces"]
+            )
+        )
+
+
+def export_json(filename):
+    with open(filename, "w") as f:
+        json.dump(
+            {"records": get_records(), "objects": _objects},
+            f,
+            indent=2
+        )
+
+
+def export_folded(filename):
+    """writes the collapsed stack format of flame graphs, one line per
+    object and phase path with its self time in microseconds"""
+    with open(filename, "w") as f:
+        for r in get_records():
+            micro = int(round(r["self_time"] * 1e6))
+            if micro <= 0:
+                continue
+            stack = [r["type"] or "Object", r["label"] or r["object"]]
+            stack += r["phase"].split(";")
+            f.write("{} {}\n".format(
+                ";".join(s.replace(";", "_").replace(" ", "_") for s in stack),
+                micro
+            ))
@@ -0,0 +1,207 @@
+# ***************************************************************************
+# *   Copyright (c) 2020 Bernd Hahnebach <bernd@bimstatik.org>              *
+# *                                                                         *
+# *   This program is free software; you can redistribute it and/or modify  *
+# *   it under the terms of the GNU Lesser General Public License (LGPL)    *
+# *   as published by the Free Software Foundation; either version 2 of     *
+# *   the License, or (at your option) any later version.                   *
+# *   for detail see the LICENCE text file.                                 *
+# *                                                                         *
+# *   This program is distributed in the hope that it will be useful,       *
+# *   but WITHOUT ANY WARRANTY; without even the implied warranty of        *
+# *   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the         *
+# *   GNU Library General Public License for more details.                  *
+# *                                                                         *
+# *   You should have received a copy of the GNU Library General Public     *
+# *   License along with this program; if not, write to the Free Software   *
+# *   Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  *
+# *   USA                                                                   *
+# *                                                                         *
+# ***************************************************************************
+
+"""
+Parallel recompute of base rebars.
+
+The sweeps of the base rebars are independent of each other. They are
+made in a process pool: the wire is sent as BREP string together with
+the diameter and the rounding, the worker sweeps with the same code
+BaseRebar.execute uses and returns the shape as BREP string. The shapes
+are set on the main thread and the objects using the base rebars are
+touched, afterwards the document recompute builds the reinforcements in
+dependency order, their base rebars are up to date and not recomputed
+again.
+
+The worker processes are started with spawn, they are fresh Python
+interpreters which import FreeCAD and Part themselves. Nothing of the
+Qt and Coin threads of the GUI is copied, thus the parallel recompute
+works with the GUI too. Inside FreeCAD sys.executable is the FreeCAD
+application, the workers are started with the Python interpreter
+FreeCAD is built with (see get_python_executable). If it is not found
+the normal document recompute is used.
+
+The build_shape of the reinforcements is not sent to the workers. It
+only makes a compound of located copies of the swept base rebar, no
+geometry is computed, shipping the compounds as BREP strings would take
+longer than building them.
+
+Usage:
+import rebarrecompute
+rebarrecompute.recompute(App.ActiveDocument)
+
+"""
+
+__title__ = "FreeCAD rebar parallel recompute"
+__author__ = "Bernd Hahnebach"
+__url__ = "http://www.freecadweb.org"
+
+import multiprocessing
+import multiprocessing.spawn
+import os
+import sys
+import time
+
+import FreeCAD
+
+import Draft
+import Part
+
+from archobjects.base_rebar import get_rebar_length
+from archobjects.base_rebar import get_rebar_wire
+from archobjects.base_rebar import make_rebar_shape
+
+
+def recompute(doc=None, processes=None, force=False):
+    """recompute(doc, [processes], [force]):
+    recomputes the document with the base rebar sweeps in a process
+    pool of processes workers (cpu count if None), force sweeps all
+    base rebars, not only the touched ones"""
+    if doc is None:
+        doc = FreeCAD.ActiveDocument
+    start = time.time()
+    python = get_python_executable()
+    if python is None:
+        FreeCAD.Console.PrintWarning(
+            "No Python interpreter found for the worker processes, "
+            "normal recompute is used.\n"
+        )
+        doc.recompute()
+        return
+
+    bases = get_base_rebars(doc, force)
+    jobs = []
+    for obj in bases:
+        job = get_job(obj)
+        if job is not None:
+            jobs.append((obj, job))
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(jobs)))
+    print("Sweep {} base rebars in {} processes.".format(len(jobs), processes))
+
+    results = []
+    if jobs:
+        context = multiprocessing.get_context("spawn")
+        # the executable is global for spawn, it is reset afterwards
+        executable = multiprocessing.spawn.get_executable()
+        context.set_executable(python)
+        try:
+            with context.Pool(processes) as pool:
+                results = pool.map(
+                    sweep,
+                    [job for obj, job in jobs],
+                    chunksize=max(1, len(jobs) // (4 * processes))
+                )
+        finally:
+            context.set_executable(executable)
+
+    # the shapes are set on the main thread
+    for (obj, job), brep in zip(jobs, results):
+        if brep is None:
+            # the normal recompute reports the error
+            continue
+        shape = Part.Shape()
+        shape.importBrepFromString(brep)
+        # outside a recompute the Placement is taken from the shape
+        shape.Placement = obj.Placement
+        obj.Shape = shape
+        if hasattr(obj, "Length"):
+            length = get_rebar_length(obj)
+            if length:
+                obj.Length = length
+        obj.purgeTouched()
+        # the base rebar is not recomputed again, thus its dependents
+        # have to be touched, otherwise they keep the old geometry
+        for dependent in obj.InList:
+            dependent.touch()
+
+    print("Sweeps took {:.3f} s.".format(time.time() - start))
+
+    # reinforcements and everything else in dependency order
+    doc.recompute()
+    print("Parallel recompute took {:.3f} s.".format(time.time() - start))
+
+
+def get_python_executable():
+    """returns the Python interpreter for the worker processes or None,
+    inside FreeCAD sys.executable is FreeCAD itself, which would start
+    a new FreeCAD instead of a worker"""
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith("python"):
+        return sys.executable
+    if sys.platform == "win32":
+        names = ["python.exe"]
+    else:
+        names = [
+            "python{}.{}".format(*sys.version_info[:2]),
+            "python{}".format(sys.version_info[0]),
+            "python",
+        ]
+    dirs = [
+        os.path.join(sys.exec_prefix, "bin"),
+        sys.exec_prefix,
+        os.path.join(FreeCAD.getHomePath(), "bin"),
+    ]
+    for d in dirs:
+        for n in names:
+            python = os.path.join(d, n)
+            if os.path.isfile(python) and os.access(python, os.X_OK):
+                return python
+    return None
+
+
+def get_base_rebars(doc, force=False):
+    """returns the base rebars of doc which need a recompute"""
+    bases = []
+    for obj in doc.Objects:
+        if Draft.getType(obj) != "RebarShape":
+            continue
+        if force or obj.isTouched() or obj.mustExecute():
+            bases.append(obj)
+    return bases
+
+
+def get_job(obj):
+    """returns the input of a sweep of the base rebar obj, None if
+    BaseRebar.execute would not sweep, the normal recompute handles it"""
+    if obj.CloneOf or not obj.Base or not obj.Base.Shape.Edges:
+        return None
+    if obj.Base.Shape.Faces or not obj.Diameter.Value or not obj.MarkNumber:
+        return None
+    if obj.Base.isTouched():
+        # the base has to be recomputed first
+        return None
+    wire = get_rebar_wire(obj.Base.Shape)
+    rounding = obj.Rounding if hasattr(obj, "Rounding") else 0.0
+    return (wire.exportBrepToString(), obj.Diameter.Value, rounding)
+
+
+def sweep(job):
+    """worker, returns the BREP string of the swept rebar or None"""
+    brep, diameter, rounding = job
+    wire = Part.Shape()
+    wire.importBrepFromString(brep)
+    wire = get_rebar_wire(wire)
+    shape = make_rebar_shape(wire, diameter, rounding)
+    if shape is None:
+        return None
+    return shape.exportBrepToString()